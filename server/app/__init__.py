@@ -5,6 +5,8 @@ from .extensions import (
     migrate, cors, bcrypt, oauth, limiter
 )
 from .models import *
+from .cli import register_commands
+from .utils.deadlines import init_request_deadlines, DeadlineExceeded
 from .routes import auth, admin_routes, candidate_routes, ai_routes, mfa_routes, sso_routes, analytics_routes  # import sso_routes
 
 def create_app():
@@ -31,6 +33,19 @@ def create_app():
         supports_credentials=True,
     )
 
+    # ---------------- Analytics Rollups ----------------
+    from .services.analytics_rollup_service import AnalyticsRollupService
+    from .services.analytics_cache import analytics_cache
+    AnalyticsRollupService.register()
+    analytics_cache.register()
+
+    # ---------------- Request Deadlines ----------------
+    init_request_deadlines(app)
+
+    @app.errorhandler(DeadlineExceeded)
+    def deadline_exceeded(e):
+        return {"error": "Request took too long", "details": str(e)}, 504
+
     # ---------------- Register Blueprints ----------------
     auth.init_auth_routes(app)  # existing auth routes
     app.register_blueprint(admin_routes.admin_bp, url_prefix="/api/admin")
@@ -43,6 +58,12 @@ def create_app():
     sso_routes.register_sso_provider(app)      # initialize Auth0 / SSO provider
     app.register_blueprint(sso_routes.sso_bp)  # SSO routes
 
+    # ---------------- CLI Commands & Background Workers ----------------
+    register_commands(app)
+    if app.config.get("RESUME_WORKERS"):
+        from .services.resume_job_service import ResumeJobService
+        ResumeJobService.start_workers(app, app.config["RESUME_WORKERS"])
+
     # ---------------- Health Check Route ----------------
     @app.route("/api/health")
     def health():
@@ -0,0 +1,50 @@
+import click
+
+
+def register_commands(app):
+    """Attach the project's Flask CLI commands to ``app``."""
+
+    @app.cli.command("resume-worker")
+    @click.option("--concurrency", default=2, show_default=True, help="Number of worker threads.")
+    def resume_worker(concurrency):
+        """Process queued resume uploads until interrupted."""
+        from app.services.resume_job_service import ResumeJobService
+
+        stop_event = ResumeJobService.start_workers(app, concurrency)
+        click.echo(f"Resume worker started with {concurrency} thread(s)")
+        try:
+            stop_event.wait()
+        except KeyboardInterrupt:
+            stop_event.set()
+
+    @app.cli.command("rescore-job")
+    @click.argument("job_id", type=int)
+    @click.option("--concurrency", default=None, type=int, help="Parallel analyses (default RESCORE_CONCURRENCY).")
+    @click.option("--restart", is_flag=True, help="Ignore the checkpoint and score every application again.")
+    @click.option("--prescreen", is_flag=True, help="Only send the locally top-ranked applications to the LLM.")
+    @click.option("--top-k", default=None, type=int, help="Applications always sent to the LLM when pre-screening.")
+    @click.option("--threshold", default=None, type=float, help="Local score (0-100) that always goes to the LLM.")
+    def rescore_job(job_id, concurrency, restart, prescreen, top_k, threshold):
+        """Re-score every application of a requisition."""
+        from app.services.rescoring_service import RescoringService, RESCORE_CONCURRENCY
+
+        options = {"prescreen": prescreen}
+        if top_k is not None:
+            options["top_k"] = top_k
+        if threshold is not None:
+            options["threshold"] = threshold
+        result = RescoringService.run(
+            job_id, concurrency=concurrency or RESCORE_CONCURRENCY, restart=restart, **options
+        )
+        click.echo(
+            f"Job {job_id}: {result['status']} - {result['done']}/{result['total']} scored, "
+            f"{result['failed']} failed, {result['skipped']} skipped"
+        )
+
+    @app.cli.command("analytics-backfill")
+    def analytics_backfill():
+        """Rebuild the daily analytics rollups from the full history."""
+        from app.services.analytics_rollup_service import AnalyticsRollupService
+
+        written = AnalyticsRollupService.backfill()
+        click.echo(", ".join(f"{metric}: {rows} rollup rows" for metric, rows in written.items()))
@@ -50,6 +50,8 @@ class Config:
     # CV Uploads
     CV_UPLOAD_FOLDER = os.getenv('CV_UPLOAD_FOLDER', 'uploads/cvs')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Resume analysis worker threads started inside each web process (0 = use `flask resume-worker`)
+    RESUME_WORKERS = int(os.getenv('RESUME_WORKERS', 0))
     
     # Frontend URL
     FRONTEND_URL = os.getenv('FRONTEND_URL')
@@ -68,5 +68,8 @@ redis_client = redis.Redis.from_url(
     decode_responses=True
 )
 
+# Same server, raw bytes in and out (file payloads handed between processes)
+redis_binary_client = redis.Redis.from_url(REDIS_URL)
+
 
 
@@ -96,6 +96,8 @@ class Requisition(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     published_on = db.Column(db.DateTime, default=datetime.utcnow)
     vacancy = db.Column(db.Integer, default=1)
+    # Compiled job side of CV analysis (see RequisitionProfileService)
+    profile = db.Column(JSON, default={})
 
     applications = db.relationship('Application', back_populates='requisition', lazy=True)
 
@@ -214,6 +216,7 @@ class Application(db.Model):
     resume_url = db.Column(db.String(500))
     cv_score = db.Column(db.Float, default=0)
     cv_parser_result = db.Column(JSON, default={})
+    prescreen_score = db.Column(db.Float, nullable=True)  # local 0-100 lexical match; not an LLM cv_score
     assessment_score = db.Column(db.Float, default=0)
     overall_score = db.Column(db.Float, default=0)
     recommendation = db.Column(db.String(50))
@@ -227,6 +230,12 @@ class Application(db.Model):
     interviews = db.relationship('Interview', back_populates='application', lazy=True)
     assessment_results = db.relationship('AssessmentResult', back_populates='application', lazy=True)
 
+    __table_args__ = (
+        # Funnel and candidate analytics filter applications by requisition and date
+        db.Index('ix_applications_requisition_created', 'requisition_id', 'created_at'),
+        db.Index('ix_applications_candidate_requisition', 'candidate_id', 'requisition_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -238,6 +247,7 @@ class Application(db.Model):
             "resume_url": self.resume_url,
             "cv_score": self.cv_score,
             "cv_parser_result": self.cv_parser_result,
+            "prescreen_score": self.prescreen_score,
             "assessment_score": self.assessment_score,
             "overall_score": self.overall_score,
             "recommendation": self.recommendation,
@@ -265,6 +275,10 @@ class AssessmentResult(db.Model):
 
     application = db.relationship('Application', back_populates='assessment_results')
     candidate = db.relationship('Candidate', back_populates='assessments')
+
+    __table_args__ = (
+        db.Index('ix_assessment_results_application_created', 'application_id', 'created_at'),
+    )
     
     def to_dict(self):
         return {
@@ -297,6 +311,10 @@ class Interview(db.Model):
     application = db.relationship('Application', back_populates='interviews')
     hiring_manager = db.relationship('User', back_populates='managed_interviews')
 
+    __table_args__ = (
+        db.Index('ix_interviews_application_scheduled', 'application_id', 'scheduled_time'),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -499,3 +517,17 @@ class Meeting(db.Model):
             "cancelled_at": self.cancelled_at.isoformat() if self.cancelled_at else None,
             "cancelled_by": self.cancelled_by
         }
+
+
+# ------------------- ANALYTICS ROLLUPS -------------------
+class AnalyticsDailyRollup(db.Model):
+    """
+    Row counts per day x requisition x status for the analytics time series,
+    kept current by app.services.analytics_rollup_service.
+    """
+    __tablename__ = "analytics_daily_rollups"
+    metric = db.Column(db.String(30), primary_key=True)  # applications | assessments | interviews
+    day = db.Column(db.Date, primary_key=True)
+    requisition_id = db.Column(db.Integer, primary_key=True, default=0)  # 0 when unknown
+    status = db.Column(db.String(50), primary_key=True, default="")
+    count = db.Column(db.Integer, nullable=False, default=0)
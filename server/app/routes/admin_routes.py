@@ -3,10 +3,11 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.extensions import db
 from app.models import User, Requisition, Candidate, Application, AssessmentResult, Interview, Notification, AuditLog, Conversation, SharedNote, Meeting
 from datetime import datetime, timedelta
-from app.utils.decorators import role_required
+from app.utils.decorators import role_required, analytics_cached
 from app.services.email_service import EmailService
 from app.services.audit_service import AuditService
 from app.services.audit2 import AuditService
+from app.services.requisition_profile_service import RequisitionProfileService
 from flask_cors import cross_origin
 from sqlalchemy import func, and_, or_
 import bleach
@@ -18,6 +19,7 @@ admin_bp = Blueprint("admin_bp", __name__)
 # ----------------- ANALYTICS ROUTES -----------------
 @admin_bp.route('/analytics/dashboard', methods=['GET'])
 @role_required(["admin", "hiring_manager"])
+@analytics_cached("users", "candidates", "requisitions", "applications")
 def get_dashboard_stats():
     """Get overall dashboard statistics"""
     
@@ -65,6 +67,7 @@ def get_dashboard_stats():
 
 @admin_bp.route('/analytics/users-growth', methods=['GET'])
 @role_required(["admin", "hiring_manager"])
+@analytics_cached("users")
 def get_users_growth():
     """Get user growth data over time"""
     
@@ -99,6 +102,7 @@ def get_users_growth():
 
 @admin_bp.route('/analytics/applications-analysis', methods=['GET'])
 @role_required(["admin", "hiring_manager"])
+@analytics_cached("applications", "requisitions")
 def get_applications_analysis():
     """Get detailed applications analysis"""
     
@@ -155,6 +159,7 @@ def get_applications_analysis():
 
 @admin_bp.route('/analytics/interviews-analysis', methods=['GET'])
 @role_required(["admin", "hiring_manager"])
+@analytics_cached("interviews")
 def get_interviews_analysis():
     """Get interviews analysis"""
     
@@ -195,6 +200,7 @@ def get_interviews_analysis():
 
 @admin_bp.route('/analytics/assessments-analysis', methods=['GET'])
 @role_required(["admin", "hiring_manager"])
+@analytics_cached("assessment_results", "applications", "requisitions")
 def get_assessments_analysis():
     """Get assessments analysis"""
     
@@ -244,6 +250,79 @@ def get_assessments_analysis():
             for title, avg_score in avg_scores_by_req
         ]
     })
+
+@admin_bp.route("/analytics/cache", methods=["GET"])
+@role_required(["admin"])
+def get_analytics_cache_stats():
+    """Hit rate and data versions of the analytics response cache"""
+    from app.services.analytics_cache import analytics_cache
+    return jsonify(analytics_cache.stats()), 200
+
+# ----------------- AI CACHE -----------------
+@admin_bp.route("/ai/cache", methods=["GET"])
+@role_required(["admin"])
+def get_ai_cache_stats():
+    """Hit/miss counters for the CV analysis result cache"""
+    from app.services.ai_cache import cv_analysis_cache
+    return jsonify(cv_analysis_cache.stats()), 200
+
+@admin_bp.route("/ai/cache", methods=["DELETE"])
+@role_required(["admin"])
+def clear_ai_cache():
+    from app.services.ai_cache import cv_analysis_cache
+    removed = cv_analysis_cache.clear()
+    return jsonify({"message": "AI cache cleared", "removed": removed}), 200
+
+@admin_bp.route("/ai/http", methods=["GET"])
+@role_required(["admin"])
+def get_ai_http_stats():
+    """Connection reuse and queueing metrics for outbound LLM calls"""
+    from app.services.ai_service import get_http_stats
+    return jsonify(get_http_stats()), 200
+
+@admin_bp.route("/ai/chat-cache", methods=["GET"])
+@role_required(["admin"])
+def get_chat_cache_stats():
+    """Hit rate of the semantic chat answer cache"""
+    from app.services.semantic_cache import chat_semantic_cache
+    return jsonify(chat_semantic_cache.stats()), 200
+
+@admin_bp.route("/ai/chat-cache", methods=["DELETE"])
+@role_required(["admin"])
+def purge_chat_cache():
+    """Drop every cached chat answer, in all workers"""
+    from app.services.semantic_cache import chat_semantic_cache
+    removed = chat_semantic_cache.purge()
+    return jsonify({"message": "Chat cache purged", "removed": removed}), 200
+
+@admin_bp.route("/ai/admission", methods=["GET"])
+@role_required(["admin"])
+def get_ai_admission_stats():
+    """In-flight AI requests, recent latency and load-shedding counters"""
+    from app.services.admission_control import ai_admission
+    return jsonify(ai_admission.stats()), 200
+
+@admin_bp.route("/ai/routing", methods=["GET"])
+@role_required(["admin"])
+def get_ai_routing_stats():
+    """Per-tier latency and escalation rate for CV scoring model routing"""
+    from app.services.model_router import cv_scoring_router
+    return jsonify(cv_scoring_router.stats()), 200
+
+@admin_bp.route("/ai/metrics", methods=["GET"])
+@role_required(["admin"])
+def get_ai_metrics():
+    """Latency histograms, token usage, cost and parse rate per endpoint, analysis path and model"""
+    from app.services.ai_metrics import ai_metrics
+    return jsonify(ai_metrics.stats()), 200
+
+@admin_bp.route("/ai/metrics", methods=["DELETE"])
+@role_required(["admin"])
+def reset_ai_metrics():
+    from app.services.ai_metrics import ai_metrics
+    ai_metrics.reset()
+    return jsonify({"message": "AI metrics reset"}), 200
+
 # ----------------- JOB CRUD -----------------
 @admin_bp.route("/jobs", methods=["POST"])
 @role_required(["admin", "hiring_manager"])
@@ -272,8 +351,11 @@ def create_job():
             created_by=get_jwt_identity()
         )
 
+        profile = RequisitionProfileService.compile(job)
         db.session.add(job)
         db.session.commit()
+        RequisitionProfileService.publish(job.id, profile)
+        RequisitionProfileService.refresh_questions_async(job.id, profile["revision"])
 
         return jsonify({"message": "Job created", "job": job.to_dict()}), 201
 
@@ -290,9 +372,78 @@ def update_job(job_id):
     for field in ["title", "description", "required_skills", "min_experience", "knockout_rules", "weightings", "assessment_pack"]:
         if field in data:
             setattr(job, field, data[field])
+    profile = job.profile
+    recompiled = not RequisitionProfileService.is_current(job, profile)
+    if recompiled:
+        profile = RequisitionProfileService.compile(job)
     db.session.commit()
+    if recompiled:
+        RequisitionProfileService.publish(job.id, profile)
+        RequisitionProfileService.refresh_questions_async(job.id, profile["revision"])
     return jsonify({"message": "Job updated", "job": job.to_dict()}), 200
 
+@admin_bp.route("/jobs/<int:job_id>/rescore", methods=["POST"])
+@role_required(["admin", "hiring_manager"])
+def rescore_job(job_id):
+    """Re-score every application for a job in the background"""
+    from app.services.rescoring_service import RescoringService, RESCORE_CONCURRENCY
+    from app.services.prescreen_service import PRESCREEN_TOP_K, PRESCREEN_THRESHOLD
+
+    Requisition.query.get_or_404(job_id)
+    if RescoringService.is_running(job_id):
+        return jsonify({"error": "Re-scoring already in progress", "progress": RescoringService.get_status(job_id)}), 409
+
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    try:
+        concurrency = int(data.get("concurrency", RESCORE_CONCURRENCY))
+        top_k = int(data.get("top_k", PRESCREEN_TOP_K))
+        threshold = float(data.get("threshold", PRESCREEN_THRESHOLD))
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency and top_k must be integers, threshold a number"}), 400
+    if not 0 <= threshold <= 100:  # also rejects NaN
+        return jsonify({"error": "threshold must be between 0 and 100"}), 400
+
+    options = {"concurrency": max(1, min(concurrency, 32)), "restart": bool(data.get("restart", False))}
+    if data.get("prescreen"):
+        options.update({"prescreen": True, "top_k": max(0, min(top_k, 10000)), "threshold": threshold})
+    RescoringService.start_async(job_id, **options)
+    return jsonify({"message": "Re-scoring started", "job_id": job_id, **options}), 202
+
+@admin_bp.route("/jobs/<int:job_id>/rescore", methods=["GET"])
+@role_required(["admin", "hiring_manager"])
+def rescore_job_status(job_id):
+    from app.services.rescoring_service import RescoringService
+    return jsonify(RescoringService.get_status(job_id)), 200
+
+@admin_bp.route("/jobs/<int:job_id>/prescreen", methods=["GET"])
+@role_required(["admin", "hiring_manager"])
+def prescreen_job(job_id):
+    """Rank a job's applicants locally and flag which ones warrant an LLM analysis"""
+    from app.services.prescreen_service import PrescreenService, PRESCREEN_TOP_K, PRESCREEN_THRESHOLD
+
+    job = Requisition.query.get_or_404(job_id)
+    rows = (
+        db.session.query(Application.id, Candidate.cv_text)
+        .join(Candidate, Candidate.id == Application.candidate_id)
+        .filter(
+            Application.requisition_id == job.id,
+            Application.is_draft.isnot(True),
+            Candidate.cv_text.isnot(None),
+        )
+        .all()
+    )
+    ranked = PrescreenService.rank_requisition(
+        job,
+        rows,
+        top_k=request.args.get("top_k", PRESCREEN_TOP_K, type=int),
+        threshold=request.args.get("threshold", PRESCREEN_THRESHOLD, type=float),
+    )
+    return jsonify({"job_id": job.id, "total": len(ranked), "applications": ranked}), 200
+
 @admin_bp.route("/jobs/<int:job_id>", methods=["DELETE"])
 @role_required(["admin", "hiring_manager"])
 def delete_job(job_id):
@@ -1,23 +1,55 @@
 # app/routes/ai_routes.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import get_jwt_identity
-from app.utils.decorators import role_required
+from app.utils.decorators import role_required, ai_admission
 from app.services.ai_parser_service import analyse_resume_gemini
+from app.services.ai_scheduler import INTERACTIVE
+from app.services.semantic_cache import chat_semantic_cache
+from app.services.upload_dedupe_service import UploadDedupeService
 from app.extensions import db, cloudinary_client
 from app.models import CVAnalysis, Conversation, Candidate, User
-import cloudinary.uploader
 import datetime
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 ai_bp = Blueprint("ai_bp", __name__, url_prefix="/api/ai")
 
 
+def _flag(value):
+    """Read a JSON or query-string flag; only explicit true values count."""
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes")
+
+
+def _save_conversation(user_id, message, reply):
+    if not user_id:
+        return
+    try:
+        conv = Conversation(user_id=user_id, user_message=message, assistant_message=reply)
+        db.session.add(conv)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception("Failed to save conversation")
+
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
 @ai_bp.route("/chat", methods=["POST"])
+@ai_admission("chat")
 def chat():
     """
     Public chat endpoint (optionally require auth if desired).
-    body: {"message": "hello"}
+    body: {"message": "hello", "stream": false}
+
+    With "stream": true (or ?stream=1) the reply is sent as Server-Sent Events:
+    one `data: {"token": ...}` per chunk, then `event: done` with the full reply,
+    or `event: error` if the upstream call fails.
     """
     data = request.get_json(silent=True) or {}
     message = (data.get("message") or "").strip()
@@ -26,27 +58,60 @@ def chat():
 
     # Lazy import to avoid cycle
     from app.services.ai_service import AIService
-    ai = AIService()
+    ai = AIService(priority=INTERACTIVE)
 
+    # Optionally persist conversation if authenticated
+    user_id = None
     try:
-        reply = ai.chat(message)
-
-        # Optionally persist conversation if authenticated
+        user_id = get_jwt_identity()
+    except Exception:
         user_id = None
-        try:
-            user_id = get_jwt_identity()
-        except Exception:
-            user_id = None
 
-        if user_id:
+    stream = _flag(data["stream"]) if "stream" in data else _flag(request.args.get("stream", ""))
+
+    # Near-duplicate questions are answered from the semantic cache
+    cached = chat_semantic_cache.lookup(message)
+    if cached:
+        _save_conversation(user_id, message, cached["reply"])
+        if stream:
+            def replay():
+                yield _sse({"token": cached["reply"]})
+                yield _sse({"reply": cached["reply"], "cached": True}, event="done")
+
+            return Response(
+                stream_with_context(replay()),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        return jsonify({"reply": cached["reply"], "cached": True}), 200
+
+    if stream:
+        def generate():
+            chunks = []
             try:
-                conv = Conversation(user_id=user_id, user_message=message, assistant_message=reply)
-                db.session.add(conv)
-                db.session.commit()
-            except Exception:
-                db.session.rollback()
-                logger.exception("Failed to save conversation")
+                for token in ai.stream_chat(message):
+                    chunks.append(token)
+                    yield _sse({"token": token})
+            except Exception as e:
+                logger.exception("Chat stream error")
+                yield _sse({"error": "AI chat failed", "details": str(e)}, event="error")
+                return
+
+            reply = "".join(chunks)
+            _save_conversation(user_id, message, reply)
+            chat_semantic_cache.store(message, reply)
+            yield _sse({"reply": reply}, event="done")
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
+    try:
+        reply = ai.chat(message)
+        _save_conversation(user_id, message, reply)
+        chat_semantic_cache.store(message, reply)
         return jsonify({"reply": reply}), 200
 
     except Exception as e:
@@ -59,6 +124,7 @@ def chat():
 
 @ai_bp.route("/parse_cv", methods=["POST"])
 @role_required(["candidate"])
+@ai_admission("parse_cv")
 def parse_cv():
     """
     Accepts:
@@ -82,8 +148,7 @@ def parse_cv():
     if "resume" in request.files:
         file = request.files["resume"]
         try:
-            upload_result = cloudinary.uploader.upload(file, folder="resumes", resource_type="raw")
-            resume_url = upload_result.get("secure_url")
+            resume_url = UploadDedupeService.upload(file, folder="resumes")["url"]
             candidate.cv_url = resume_url
         except Exception:
             logger.exception("Cloudinary upload failed")
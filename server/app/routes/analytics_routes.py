@@ -1,10 +1,13 @@
-from flask import Blueprint, jsonify
-from sqlalchemy import func, cast, Date, text, case
+from datetime import datetime, timedelta
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func, cast, Date, text
 from app.extensions import db
 from app.models import (
     Application, Requisition, Interview,
     AssessmentResult, Candidate, CVAnalysis
 )
+from app.services.analytics_rollup_service import AnalyticsRollupService
+from app.utils.decorators import analytics_cached
 import json
 
 analytics_bp = Blueprint("analytics_bp", __name__)
@@ -13,6 +16,7 @@ analytics_bp = Blueprint("analytics_bp", __name__)
 # 1. APPLICATION VOLUME PER REQUISITION
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/applications-per-requisition")
+@analytics_cached("applications", "requisitions")
 def applications_per_requisition():
     results = (
         db.session.query(
@@ -31,19 +35,134 @@ def applications_per_requisition():
     ])
 
 
+# ------------------------------------------------------------
+# SHARED FILTERS
+# ------------------------------------------------------------
+class FilterError(ValueError):
+    pass
+
+
+def _analytics_filters():
+    """requisition_id, category, start_date and end_date (YYYY-MM-DD, inclusive) from the query string."""
+    filters = {
+        "requisition_id": request.args.get("requisition_id", type=int),
+        "category": request.args.get("category", type=str),
+        "start_date": request.args.get("start_date"),
+        "end_date": request.args.get("end_date"),
+    }
+    for key in ("start_date", "end_date"):
+        if filters[key]:
+            try:
+                datetime.fromisoformat(filters[key])
+            except ValueError:
+                raise FilterError(f"Invalid {key} format. Use YYYY-MM-DD")
+    return filters
+
+
+def _date_bounds(filters):
+    """(start, end, end_inclusive) datetimes; a bare end date covers the whole day."""
+    start = datetime.fromisoformat(filters["start_date"]) if filters.get("start_date") else None
+    end, inclusive = None, True
+    if filters.get("end_date"):
+        end = datetime.fromisoformat(filters["end_date"])
+        if len(filters["end_date"]) == 10:
+            end, inclusive = end + timedelta(days=1), False
+    return start, end, inclusive
+
+
+# ------------------------------------------------------------
+# HIRING FUNNEL (one scan; backs endpoints 2-4)
+# ------------------------------------------------------------
+def _funnel_counts(filters):
+    """
+    Every funnel stage in a single aggregate over applications:
+    total, reviewed, interviewed (at least one interview) and offered.
+    """
+    interviewed = (
+        db.session.query(Interview.application_id)
+        .filter(Interview.application_id.isnot(None))
+        .distinct()
+        .subquery()
+    )
+    query = (
+        db.session.query(
+            func.count(Application.id).label("total"),
+            func.count(Application.id).filter(Application.status == "reviewed").label("reviewed"),
+            func.count(Application.id).filter(interviewed.c.application_id.isnot(None)).label("interviewed"),
+            func.count(Application.id).filter(Application.status == "recommended").label("offered"),
+        )
+        .select_from(Application)
+        .outerjoin(interviewed, interviewed.c.application_id == Application.id)
+    )
+
+    if filters.get("requisition_id"):
+        query = query.filter(Application.requisition_id == filters["requisition_id"])
+    if filters.get("category"):
+        query = query.join(Requisition, Requisition.id == Application.requisition_id).filter(
+            Requisition.category == filters["category"]
+        )
+    start, end, inclusive = _date_bounds(filters)
+    if start:
+        query = query.filter(Application.created_at >= start)
+    if end:
+        query = query.filter(Application.created_at <= end if inclusive else Application.created_at < end)
+
+    row = query.one()
+    return {
+        "total_applications": row.total,
+        "reviewed": row.reviewed,
+        "interviewed": row.interviewed,
+        "offered": row.offered,
+    }
+
+
+def _percent(part, whole):
+    return round((part / whole * 100) if whole else 0, 2)
+
+
+def _funnel_or_400(shape):
+    try:
+        counts = _funnel_counts(_analytics_filters())
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(shape(counts))
+
+
+def _dropoff(c):
+    return {
+        "cv_screening_dropoff": c["total_applications"] - c["reviewed"],
+        "assessment_or_cv_fail_dropoff": c["reviewed"] - c["interviewed"],
+        "interview_dropoff": c["interviewed"] - c["offered"]
+    }
+
+
+def _full_funnel(c):
+    return {
+        **c,
+        "conversion": {
+            "application_to_interview_percent": _percent(c["interviewed"], c["total_applications"]),
+            "interview_to_offer_percent": _percent(c["offered"], c["interviewed"]),
+        },
+        "dropoff": _dropoff(c),
+    }
+
+
+@analytics_bp.route("/analytics/funnel")
+@analytics_cached("applications", "interviews", "requisitions")
+def hiring_funnel():
+    return _funnel_or_400(_full_funnel)
+
+
 # ------------------------------------------------------------
 # 2. APPLICATION → INTERVIEW CONVERSION RATE
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/conversion/application-to-interview")
+@analytics_cached("applications", "interviews", "requisitions")
 def application_to_interview():
-    total_apps = db.session.query(func.count(Application.id)).scalar()
-    interviewed = db.session.query(func.count(func.distinct(Interview.application_id))).scalar()
-    rate = (interviewed / total_apps * 100) if total_apps else 0
-
-    return jsonify({
-        "total_applications": total_apps,
-        "total_interviewed": interviewed,
-        "conversion_rate_percent": round(rate, 2)
+    return _funnel_or_400(lambda c: {
+        "total_applications": c["total_applications"],
+        "total_interviewed": c["interviewed"],
+        "conversion_rate_percent": _percent(c["interviewed"], c["total_applications"])
     })
 
 
@@ -51,15 +170,12 @@ def application_to_interview():
 # 3. INTERVIEW → OFFER CONVERSION RATE
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/conversion/interview-to-offer")
+@analytics_cached("applications", "interviews", "requisitions")
 def interview_to_offer():
-    interviewed = db.session.query(func.count(func.distinct(Interview.application_id))).scalar()
-    offered = db.session.query(func.count(Application.id)).filter(Application.status == "recommended").scalar()
-    rate = (offered / interviewed * 100) if interviewed else 0
-
-    return jsonify({
-        "interviewed": interviewed,
-        "offered": offered,
-        "conversion_rate_percent": round(rate, 2)
+    return _funnel_or_400(lambda c: {
+        "interviewed": c["interviewed"],
+        "offered": c["offered"],
+        "conversion_rate_percent": _percent(c["offered"], c["interviewed"])
     })
 
 
@@ -67,41 +183,102 @@ def interview_to_offer():
 # 4. STAGE DROP-OFF RATE
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/dropoff")
+@analytics_cached("applications", "interviews", "requisitions")
 def stage_dropoff():
-    total = db.session.query(func.count(Application.id)).scalar()
-    reviewed = db.session.query(func.count(Application.id)).filter(Application.status == "reviewed").scalar()
-    interviewed = db.session.query(func.count(func.distinct(Interview.application_id))).scalar()
-    offered = db.session.query(func.count(Application.id)).filter(Application.status == "recommended").scalar()
-
-    return jsonify({
-        "total_applications": total,
-        "reviewed": reviewed,
-        "interviewed": interviewed,
-        "offered": offered,
-        "dropoff": {
-            "cv_screening_dropoff": total - reviewed,
-            "assessment_or_cv_fail_dropoff": reviewed - interviewed,
-            "interview_dropoff": interviewed - offered
-        }
-    })
+    return _funnel_or_400(lambda c: {**c, "dropoff": _dropoff(c)})
 
 
 # ------------------------------------------------------------
-# 5. AVERAGE TIME SPENT PER STAGE
+# 5. TIME SPENT PER STAGE (percentiles per requisition and month)
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/time-per-stage")
+@analytics_cached("applications", "interviews", "assessment_results", "requisitions")
 def time_per_stage():
-    query = text("""
+    """
+    p50/p75/p90 days from application to first assessment and to first
+    interview, per requisition and application month, in one aggregate.
+    Per-application rows: /analytics/time-per-stage/applications.
+    """
+    try:
+        conditions, params = _application_conditions(_analytics_filters())
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    where = " AND ".join(["a.created_at IS NOT NULL"] + conditions)
+
+    rows = db.session.execute(text(f"""
+        WITH stages AS (
+            SELECT
+                a.requisition_id,
+                date_trunc('month', a.created_at) AS month,
+                EXTRACT(EPOCH FROM (fa.first_assessment - a.created_at))::float8 / 86400 AS assessment_days,
+                EXTRACT(EPOCH FROM (fi.first_interview - a.created_at))::float8 / 86400 AS interview_days
+            FROM applications a
+            LEFT JOIN (
+                SELECT application_id, MIN(created_at) AS first_assessment
+                FROM assessment_results GROUP BY application_id
+            ) fa ON fa.application_id = a.id
+            LEFT JOIN (
+                SELECT application_id, MIN(scheduled_time) AS first_interview
+                FROM interviews GROUP BY application_id
+            ) fi ON fi.application_id = a.id
+            WHERE {where}
+        )
+        SELECT
+            requisition_id,
+            month,
+            COUNT(*) AS applications,
+            COUNT(assessment_days) AS assessed,
+            percentile_cont(ARRAY[0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY assessment_days) AS assessment,
+            COUNT(interview_days) AS interviewed,
+            percentile_cont(ARRAY[0.5, 0.75, 0.9]) WITHIN GROUP (ORDER BY interview_days) AS interview
+        FROM stages
+        GROUP BY requisition_id, month
+        ORDER BY month, requisition_id
+    """), params).fetchall()
+
+    def percentiles(values):
+        if not values:
+            return {"p50": None, "p75": None, "p90": None}
+        return {key: round(float(v), 2) if v is not None else None for key, v in zip(("p50", "p75", "p90"), values)}
+
+    return jsonify([
+        {
+            "requisition_id": r.requisition_id,
+            "month": r.month.strftime("%Y-%m"),
+            "applications": r.applications,
+            "time_to_assessment_days": {"count": r.assessed, **percentiles(r.assessment)},
+            "time_to_interview_days": {"count": r.interviewed, **percentiles(r.interview)},
+        }
+        for r in rows
+    ])
+
+
+@analytics_bp.route("/analytics/time-per-stage/applications")
+@analytics_cached("applications", "interviews", "assessment_results", "requisitions")
+def time_per_stage_applications():
+    """
+    Per-application stage times, keyset-paginated by application id:
+    pass the returned ``next_cursor`` as ``?after=`` to get the next page.
+    """
+    try:
+        conditions, params = _application_conditions(_analytics_filters())
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    params["after"] = request.args.get("after", 0, type=int)
+    params["limit"] = max(1, min(request.args.get("limit", 100, type=int), 1000))
+    where = " AND ".join(["a.id > :after"] + conditions)
+
+    rows = db.session.execute(text(f"""
         SELECT
             a.id AS application_id,
             a.created_at,
-            MIN(i.scheduled_at) AS first_interview,
-            (SELECT ar.created_at FROM assessment_results ar WHERE ar.application_id = a.id ORDER BY ar.created_at LIMIT 1) AS first_assessment
+            (SELECT MIN(i.scheduled_time) FROM interviews i WHERE i.application_id = a.id) AS first_interview,
+            (SELECT MIN(ar.created_at) FROM assessment_results ar WHERE ar.application_id = a.id) AS first_assessment
         FROM applications a
-        LEFT JOIN interviews i ON i.application_id = a.id
-        GROUP BY a.id
-    """)
-    rows = db.session.execute(query).fetchall()
+        WHERE {where}
+        ORDER BY a.id
+        LIMIT :limit
+    """), params).fetchall()
 
     stage_times = []
     for r in rows:
@@ -111,30 +288,27 @@ def time_per_stage():
 
         stage_times.append({
             "application_id": r.application_id,
-            "time_to_assessment_days": (assessment - created).days if assessment else None,
-            "time_to_interview_days": (interview - created).days if interview else None
+            "time_to_assessment_days": (assessment - created).days if assessment and created else None,
+            "time_to_interview_days": (interview - created).days if interview and created else None
         })
 
-    return jsonify(stage_times)
+    return jsonify({
+        "items": stage_times,
+        "next_cursor": rows[-1].application_id if len(rows) == params["limit"] else None,
+    })
 
 
 # ------------------------------------------------------------
 # 6. APPLICATIONS PER MONTH
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/applications/monthly")
+@analytics_cached("applications")
 def monthly_applications():
-    results = (
-        db.session.query(
-            func.date_trunc("month", Application.created_at).label("month"),
-            func.count(Application.id)
-        )
-        .group_by(func.date_trunc("month", Application.created_at))
-        .order_by(func.date_trunc("month", Application.created_at))
-        .all()
-    )
+    # Read from the daily rollups (see AnalyticsRollupService), not the applications table
+    results = AnalyticsRollupService.monthly("applications")
 
     return jsonify([
-        {"month": r.month.strftime("%Y-%m"), "applications": r[1]}
+        {"month": r.month.strftime("%Y-%m"), "applications": int(r.total)}
         for r in results
     ])
 
@@ -144,28 +318,16 @@ def monthly_applications():
 # ------------------------------------------------------------
 # CV SCREENING DROP TREND
 @analytics_bp.route("/analytics/cv-screening-drop")
+@analytics_cached("applications")
 def cv_screening_drop():
-    results = (
-        db.session.query(
-            func.date_trunc("month", Application.created_at).label("month"),
-            func.count(Application.id).label("total"),
-            func.sum(
-                case(
-                    (Application.status == "rejected", 1),
-                    else_=0
-                )
-            ).label("rejected")
-        )
-        .group_by(func.date_trunc("month", Application.created_at))
-        .all()
-    )
+    results = AnalyticsRollupService.monthly("applications", flag_status="rejected")
 
     return jsonify([
         {
             "month": r.month.strftime("%Y-%m"),
-            "total_applications": r.total,
-            "rejected": r.rejected,
-            "drop_rate_percent": round((r.rejected / r.total * 100), 2) if r.total else 0
+            "total_applications": int(r.total),
+            "rejected": int(r.flagged),
+            "drop_rate_percent": round((r.flagged / r.total * 100), 2) if r.total else 0
         }
         for r in results
     ])
@@ -173,28 +335,16 @@ def cv_screening_drop():
 
 # ASSESSMENT PASS RATE TREND
 @analytics_bp.route("/analytics/assessments/pass-rate")
+@analytics_cached("assessment_results")
 def assessment_pass_rate():
-    results = (
-        db.session.query(
-            func.date_trunc("month", AssessmentResult.created_at).label("month"),
-            func.count(AssessmentResult.id).label("taken"),
-            func.sum(
-                case(
-                    (AssessmentResult.percentage_score >= 50, 1),
-                    else_=0
-                )
-            ).label("passed")
-        )
-        .group_by(func.date_trunc("month", AssessmentResult.created_at))
-        .all()
-    )
+    results = AnalyticsRollupService.monthly("assessments", flag_status="passed")
 
     return jsonify([
         {
             "month": r.month.strftime("%Y-%m") if r.month else None,
-            "taken": r.taken,
-            "passed": r.passed,
-            "pass_rate_percent": round((r.passed / r.taken * 100), 2) if r.taken else 0
+            "taken": int(r.total),
+            "passed": int(r.flagged),
+            "pass_rate_percent": round((r.flagged / r.total * 100), 2) if r.total else 0
         }
         for r in results
     ])
@@ -205,19 +355,12 @@ def assessment_pass_rate():
 # 9. INTERVIEW SCHEDULING RATE OVER TIME
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/interviews/scheduled")
+@analytics_cached("interviews")
 def interview_scheduling():
-    results = (
-        db.session.query(
-            func.date_trunc("month", Interview.created_at).label("month"),
-            func.count(Interview.id)
-        )
-        .group_by(func.date_trunc("month", Interview.created_at))
-        .order_by(func.date_trunc("month", Interview.created_at))
-        .all()
-    )
+    results = AnalyticsRollupService.monthly("interviews")
 
     return jsonify([
-        {"month": r.month.strftime("%Y-%m"), "interviews": r[1]}
+        {"month": r.month.strftime("%Y-%m"), "interviews": int(r.total)}
         for r in results
     ])
 
@@ -226,6 +369,7 @@ def interview_scheduling():
 # 10. OFFER TREND BY JOB CATEGORY
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/offers-by-category")
+@analytics_cached("applications", "requisitions")
 def offers_by_category():
     results = (
         db.session.query(
@@ -249,6 +393,7 @@ def offers_by_category():
 # 11. AVERAGE CV SCORE
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/candidate/avg-cv-score")
+@analytics_cached("candidates")
 def avg_cv_score():
     avg_score = db.session.query(func.avg(Candidate.cv_score)).scalar()
     return jsonify({"average_cv_score": round(avg_score, 2) if avg_score else 0})
@@ -258,6 +403,7 @@ def avg_cv_score():
 # 12. AVERAGE ASSESSMENT SCORE
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/candidate/avg-assessment-score")
+@analytics_cached("assessment_results")
 def avg_assessment_score():
     avg_score = db.session.query(func.avg(AssessmentResult.percentage_score)).scalar()
     return jsonify({"average_assessment_score": round(avg_score, 2) if avg_score else 0})
@@ -266,44 +412,100 @@ def avg_assessment_score():
 # ------------------------------------------------------------
 # 13. SKILL FREQUENCY FROM CANDIDATE.SKILLS
 # ------------------------------------------------------------
-@analytics_bp.route("/analytics/candidate/skills-frequency")
-def skill_frequency():
-    candidates = Candidate.query.with_entities(Candidate.skills).all()
-    freq = {}
+def _candidate_scope(filters):
+    """
+    SQL condition (and params) restricting candidates ``c`` to those with an
+    application matching the requisition/category/date filters.
+    """
+    conditions, params = _application_conditions(filters)
+    if not conditions:
+        return "TRUE", params
+    return (
+        "EXISTS (SELECT 1 FROM applications a WHERE a.candidate_id = c.id AND "
+        + " AND ".join(conditions) + ")"
+    ), params
+
+
+def _application_conditions(filters):
+    """SQL conditions on applications ``a`` for the requisition/category/date filters, and their params."""
+    conditions, params = [], {}
+    if filters.get("requisition_id"):
+        conditions.append("a.requisition_id = :requisition_id")
+        params["requisition_id"] = filters["requisition_id"]
+    if filters.get("category"):
+        conditions.append("a.requisition_id IN (SELECT id FROM requisitions WHERE category = :category)")
+        params["category"] = filters["category"]
+    start, end, inclusive = _date_bounds(filters)
+    if start:
+        conditions.append("a.created_at >= :start")
+        params["start"] = start
+    if end:
+        conditions.append(f"a.created_at {'<=' if inclusive else '<'} :end")
+        params["end"] = end
+    return conditions, params
+
+
+def _top_n(default):
+    top = request.args.get("top", default, type=int)
+    return max(1, min(top, 1000)) if top else None
+
+
+def _json_array(column):
+    # The JSON columns are cast per row; anything but an array counts as empty
+    return f"(CASE WHEN jsonb_typeof({column}::jsonb) = 'array' THEN {column}::jsonb ELSE '[]'::jsonb END)"
 
-    for c in candidates:
-        if not c.skills:
-            continue
-        for skill in c.skills:
-            freq[skill] = freq.get(skill, 0) + 1
 
-    return jsonify(freq)
+@analytics_bp.route("/analytics/candidate/skills-frequency")
+@analytics_cached("candidates", "applications", "requisitions")
+def skill_frequency():
+    """Skill -> occurrences, most frequent first. ?top= (default: all), requisition/category/date filters."""
+    try:
+        scope, params = _candidate_scope(_analytics_filters())
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    params["top"] = _top_n(None)
+
+    rows = db.session.execute(text(f"""
+        SELECT skill, COUNT(*) AS occurrences
+        FROM candidates c
+        CROSS JOIN LATERAL jsonb_array_elements_text({_json_array("c.skills")}) AS skill
+        WHERE c.skills IS NOT NULL AND {scope}
+        GROUP BY skill
+        ORDER BY occurrences DESC, skill
+        LIMIT :top
+    """), params).fetchall()
+
+    # jsonify would sort the keys; keep the ranking
+    return current_app.response_class(
+        json.dumps({r.skill: r.occurrences for r in rows}), mimetype="application/json"
+    )
 
 
 # ------------------------------------------------------------
 # 14. EXPERIENCE DISTRIBUTION (YEARS)
 # ------------------------------------------------------------
 @analytics_bp.route("/analytics/candidate/experience-distribution")
+@analytics_cached("candidates", "applications", "requisitions")
 def experience_distribution():
-    candidates = Candidate.query.all()
-    distribution = {}
-
-    for c in candidates:
-        if not c.work_experience:
-            continue
-
-        # Ensure we have a list of dicts
-        try:
-            jobs = c.work_experience
-            if isinstance(jobs, str):
-                jobs = json.loads(jobs)
-        except Exception:
-            continue
-
-        for j in jobs:
-            if isinstance(j, dict):
-                years = j.get("years", 0)
-                distribution[years] = distribution.get(years, 0) + 1
-
-    return jsonify(distribution)
-
+    """Years value of each work_experience entry -> entries. Supports ?top= and requisition/category/date filters."""
+    try:
+        scope, params = _candidate_scope(_analytics_filters())
+    except FilterError as e:
+        return jsonify({"error": str(e)}), 400
+    params["top"] = _top_n(None)
+
+    # Entries without "years" count as 0, like the dashboard always did
+    rows = db.session.execute(text(f"""
+        SELECT CASE WHEN job ? 'years' THEN COALESCE(job->>'years', 'null') ELSE '0' END AS years,
+               COUNT(*) AS entries
+        FROM candidates c
+        CROSS JOIN LATERAL jsonb_array_elements({_json_array("c.work_experience")}) AS job
+        WHERE c.work_experience IS NOT NULL AND jsonb_typeof(job) = 'object' AND {scope}
+        GROUP BY 1
+        ORDER BY entries DESC
+        LIMIT :top
+    """), params).fetchall()
+
+    return current_app.response_class(
+        json.dumps({r.years: r.entries for r in rows}), mimetype="application/json"
+    )
@@ -10,11 +10,12 @@ from app.models import (
 from datetime import datetime
 from werkzeug.utils import secure_filename
 
-from app.services.cv_parser_service import HybridResumeAnalyzer
-from app.utils.decorators import role_required
+from app.services.upload_dedupe_service import UploadDedupeService, CLOUDINARY_TIMEOUT
+from app.utils.deadlines import timeout_for
+from app.services.resume_job_service import ResumeJobService, ResumeJobError, ResumeJobPending
+from app.utils.decorators import role_required, ai_admission
 from app.utils.helper import get_current_candidate
 from app.services.audit2 import AuditService
-import fitz
 import json
 import re
 
@@ -128,11 +129,10 @@ def get_available_jobs():
 # ----------------- UPLOAD RESUME -----------------
 @candidate_bp.route("/upload_resume/<int:application_id>", methods=["POST"])
 @role_required(["candidate"])
+@ai_admission("upload_resume")
 def upload_resume(application_id):
     try:
         application = Application.query.get_or_404(application_id)
-        candidate = application.candidate
-        job = application.requisition
 
         if application.candidate.user.id != int(get_jwt_identity()):
             return jsonify({"error": "Unauthorized"}), 403
@@ -144,42 +144,29 @@ def upload_resume(application_id):
             return jsonify({"error": "No resume uploaded"}), 400
 
         file = request.files["resume"]
-
-        # --- Upload to Cloudinary ---
-        resume_url = HybridResumeAnalyzer.upload_cv(file)
-        if not resume_url:
-            return jsonify({"error": "Failed to upload resume"}), 500
-
-        # --- Extract PDF text if needed ---
         resume_text = request.form.get("resume_text", "")
-        if not resume_text and file.filename.lower().endswith(".pdf"):
-            file.stream.seek(0)
-            pdf_doc = fitz.open(stream=file.stream.read(), filetype="pdf")
-            resume_text = ""
-            for page in pdf_doc:
-                resume_text += page.get_text()
-
-        # --- Hybrid Resume Analysis ---
-        analyzer = HybridResumeAnalyzer()
-        parser_result = analyzer.analyse_resume(resume_text, job.id)
-
-
-        # --- Save results ---
-        application.resume_url = resume_url
-        application.cv_score = parser_result.get("match_score", 0)
-        application.cv_parser_result = parser_result
-        application.recommendation = parser_result.get("recommendation", "")
-        db.session.commit()
 
-        # --- Notify admins ---
-        admins = User.query.filter_by(role="admin").all()
-        for admin in admins:
-            notif = Notification(
-                user_id=admin.id,
-                message=f"{candidate.full_name} submitted resume for {job.title}."
-            )
-            db.session.add(notif)
-        db.session.commit()
+        # --- Job mode: queue the work and return immediately ---
+        if request.args.get("mode") == "async" or request.form.get("mode") == "async":
+            try:
+                job_id = ResumeJobService.enqueue(
+                    application, file, user_id=int(get_jwt_identity()), resume_text=resume_text
+                )
+            except ResumeJobPending as e:
+                return jsonify({"error": "Resume is already being processed", "job_id": e.job_id}), 409
+
+            return jsonify({
+                "message": "Resume queued for analysis",
+                "job_id": job_id,
+                "status_url": f"/api/candidate/upload_resume/jobs/{job_id}"
+            }), 202
+
+        # --- Upload, extract and analyse inline ---
+        try:
+            parser_result = ResumeJobService.process_resume(application, file, file.filename or "", resume_text)
+        except ResumeJobError as e:
+            return jsonify({"error": str(e)}), 500
+        resume_url = application.resume_url
 
         return jsonify({
             "message": "Resume uploaded and analyzed",
@@ -196,6 +183,22 @@ def upload_resume(application_id):
         return jsonify({"error": "Internal server error"}), 500
 
 
+@candidate_bp.route("/upload_resume/jobs/<job_id>", methods=["GET"])
+@role_required(["candidate"])
+def get_resume_job(job_id):
+    try:
+        job = ResumeJobService.get_status(job_id)
+        if not job or job["user_id"] != int(get_jwt_identity()):
+            return jsonify({"error": "Job not found"}), 404
+
+        job.pop("user_id")
+        return jsonify(job), 200
+
+    except Exception as e:
+        current_app.logger.error(f"Get resume job error: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+
 # ----------------- CANDIDATE APPLICATIONS -----------------
 @candidate_bp.route("/applications", methods=["GET"])
 @role_required(["candidate"])
@@ -439,11 +442,16 @@ def upload_document():
         if not ('.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_docs):
             return jsonify({"success": False, "message": "Invalid file type"}), 400
 
-        url = upload_cv_to_cloudinary(file)
+        upload = UploadDedupeService.upload(file, folder="candidate_cvs", extract_as=filename)
+        url = upload["url"]
         if not url:
             return jsonify({"success": False, "message": "Failed to upload document"}), 500
 
+        cv_text = upload["text"]
+
         candidate.cv_url = url
+        if cv_text:
+            candidate.cv_text = cv_text
         db.session.commit()
 
         return jsonify({
@@ -496,7 +504,8 @@ def upload_profile_picture():
             folder="profile_pics/",
             format="jpg",  # convert everything to jpg
             resource_type="image",
-            public_id=f"candidate_{candidate.id}"
+            public_id=f"candidate_{candidate.id}",
+            timeout=timeout_for(CLOUDINARY_TIMEOUT),
         )
         url = result.get("secure_url")
         if not url:
@@ -5,6 +5,7 @@ from app.extensions import db, oauth
 from app.models import User, OAuthConnection, Candidate
 from app.services.audit2 import AuditService
 from app.services.auth_service import AuthService
+from app.utils.deadlines import timeout_for
 import secrets
 import requests
 import urllib.parse
@@ -12,6 +13,8 @@ import traceback
 
 sso_bp = Blueprint("sso_bp", __name__)
 
+SSO_METADATA_TIMEOUT = 10  # seconds, capped by the request deadline
+
 ROLE_DASHBOARD_MAP = {
     "admin": "/admin-dashboard",
     "hiring_manager": "/hiring-manager-dashboard",
@@ -32,7 +35,7 @@ def validate_sso_config(app):
 
     metadata_url = app.config["SSO_METADATA_URL"]
     try:
-        resp = requests.get(metadata_url, timeout=10)
+        resp = requests.get(metadata_url, timeout=timeout_for(SSO_METADATA_TIMEOUT))
         if resp.status_code != 200:
             app.logger.error(f"SSO metadata URL not accessible: {metadata_url} - Status: {resp.status_code}")
             return False
@@ -230,7 +233,7 @@ def sso_status():
 
         if status["configured"]:
             try:
-                resp = requests.get(status["metadata_url"], timeout=5)
+                resp = requests.get(status["metadata_url"], timeout=timeout_for(5))
                 status["metadata_accessible"] = resp.status_code == 200
             except:
                 status["metadata_accessible"] = False
@@ -250,7 +253,7 @@ def sso_logout():
             return jsonify({"error": "Missing SSO metadata URL"}), 500
 
         # Fetch provider end_session_endpoint dynamically
-        metadata = requests.get(metadata_url).json()
+        metadata = requests.get(metadata_url, timeout=timeout_for(SSO_METADATA_TIMEOUT)).json()
         end_session_endpoint = metadata.get("end_session_endpoint")
 
         if not end_session_endpoint:
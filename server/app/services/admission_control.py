@@ -0,0 +1,218 @@
+import os
+import math
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import redis
+
+from app.extensions import redis_client
+from app.services.ai_service import queued_calls
+from app.services.resume_job_service import QUEUE_KEY as RESUME_QUEUE_KEY
+
+logger = logging.getLogger(__name__)
+
+AI_ADMISSION_MAX_PROCESS = int(os.environ.get("AI_ADMISSION_MAX_PROCESS", 16))  # in-flight AI requests
+AI_ADMISSION_MAX_CLUSTER = int(os.environ.get("AI_ADMISSION_MAX_CLUSTER", 64))
+AI_ADMISSION_MAX_QUEUED = int(os.environ.get("AI_ADMISSION_MAX_QUEUED", AI_ADMISSION_MAX_PROCESS))  # calls waiting for a slot
+AI_ADMISSION_MAX_BACKLOG = int(os.environ.get("AI_ADMISSION_MAX_BACKLOG", 500))  # queued resume jobs, cluster-wide
+# Chat is scheduled ahead of queued batch work, so the job backlog does not shed it
+BACKLOG_EXEMPT = ("chat",)
+AI_ADMISSION_LATENCY_SLO = float(os.environ.get("AI_ADMISSION_LATENCY_SLO", 30))  # p95 seconds
+AI_ADMISSION_WINDOW = 60  # seconds of recent latencies considered for the SLO
+AI_ADMISSION_MIN_SAMPLES = 10
+AI_ADMISSION_TICKET_TTL = 300  # seconds; tickets of crashed workers expire after this
+AI_ADMISSION_RETRY_AFTER = int(os.environ.get("AI_ADMISSION_RETRY_AFTER", 10))  # seconds, when shedding on SLO
+
+# Drop expired tickets, then add ours if the cluster is below the limit and
+# the resume job backlog is not too deep.
+# KEYS[1] = ticket zset, KEYS[2] = resume job queue
+# ARGV = now, expires_at, ticket, limit, max backlog (-1 = not checked)
+# Returns the number of tickets in flight after the attempt, -1 if full or
+# -2 if the backlog is too deep.
+_ADMIT_SCRIPT = """
+local max_backlog = tonumber(ARGV[5])
+if max_backlog >= 0 and redis.call('LLEN', KEYS[2]) >= max_backlog then
+    return -2
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[4]) then
+    return -1
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], 3600)
+return count + 1
+"""
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Decides up front whether an AI-backed request may run at all.
+
+    Requests are counted while in flight, per process and cluster-wide (a
+    Redis sorted set of expiring tickets); each check takes its slot in the
+    same step. New work is rejected immediately with 429 when either depth
+    limit is reached or work is already queued behind it (foreground AI
+    calls waiting for a scheduler slot here, or the resume job backlog), and with 503 while the p95
+    latency of recently finished AI requests exceeds the SLO, so workers stay
+    free for the rest of the API when the provider is degraded. One request
+    is always let through per process so recovery is noticed.
+    """
+
+    def __init__(
+        self,
+        max_process: int = AI_ADMISSION_MAX_PROCESS,
+        max_cluster: int = AI_ADMISSION_MAX_CLUSTER,
+        latency_slo: float = AI_ADMISSION_LATENCY_SLO,
+        max_queued: int = AI_ADMISSION_MAX_QUEUED,
+        max_backlog: int = AI_ADMISSION_MAX_BACKLOG,
+    ):
+        self.max_process = max_process
+        self.max_cluster = max_cluster
+        self.latency_slo = latency_slo
+        self.max_queued = max_queued
+        self.max_backlog = max_backlog
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._latencies: deque = deque(maxlen=500)  # (finished_at, seconds)
+        self._stats = {
+            "admitted": 0,
+            "rejected_depth": 0,
+            "rejected_queued": 0,
+            "rejected_backlog": 0,
+            "rejected_cluster": 0,
+            "rejected_slo": 0,
+        }
+        self._script = None
+
+    _tickets_key = "ai_admission:tickets"
+
+    def _record(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _recent_latencies(self):
+        cutoff = time.time() - AI_ADMISSION_WINDOW
+        return sorted(seconds for finished, seconds in self._latencies if finished >= cutoff)
+
+    def _p95(self) -> Tuple[Optional[float], Optional[float]]:
+        """(p50, p95) of recent latencies, or (None, None) with too few samples."""
+        with self._lock:
+            recent = self._recent_latencies()
+        if len(recent) < AI_ADMISSION_MIN_SAMPLES:
+            return None, None
+        return recent[len(recent) // 2], recent[min(len(recent) - 1, int(len(recent) * 0.95))]
+
+    def _retry_after(self) -> int:
+        p50, _ = self._p95()
+        return max(1, math.ceil(p50)) if p50 else 2
+
+    def _reject(self, stat: str, message: str, status: int, retry_after: int) -> AdmissionRejected:
+        self._record(stat)
+        return AdmissionRejected(message, status, retry_after)
+
+    def _unreserve(self, route_class: str) -> None:
+        with self._lock:
+            self._in_flight[route_class] = max(0, self._in_flight.get(route_class, 0) - 1)
+
+    # ---------------- Public API ----------------
+    def admit(self, route_class: str) -> Optional[str]:
+        """Reserve room for one request or raise ``AdmissionRejected``. Returns a ticket for ``release``."""
+        _, p95 = self._p95()
+        # Check and take the process slot together so concurrent requests cannot all pass
+        with self._lock:
+            in_flight = sum(self._in_flight.values())
+            if in_flight < self.max_process:
+                self._in_flight[route_class] = self._in_flight.get(route_class, 0) + 1
+        if in_flight >= self.max_process:
+            raise self._reject("rejected_depth", "AI service is busy, please retry shortly", 429, self._retry_after())
+
+        try:
+            if p95 is not None and p95 > self.latency_slo and in_flight > 0:
+                raise self._reject(
+                    "rejected_slo", "AI service is degraded, please retry later", 503, AI_ADMISSION_RETRY_AFTER
+                )
+            if queued_calls() >= self.max_queued:
+                raise self._reject("rejected_queued", "AI service is busy, please retry shortly", 429, self._retry_after())
+
+            ticket = None
+            try:
+                if self._script is None:
+                    self._script = redis_client.register_script(_ADMIT_SCRIPT)
+                now = time.time()
+                candidate = uuid.uuid4().hex
+                max_backlog = -1 if route_class in BACKLOG_EXEMPT else self.max_backlog
+                admitted = self._script(
+                    keys=[self._tickets_key, RESUME_QUEUE_KEY],
+                    args=[now, now + AI_ADMISSION_TICKET_TTL, candidate, self.max_cluster, max_backlog],
+                )
+                if admitted == -2:
+                    raise self._reject(
+                        "rejected_backlog", "AI service is busy, please retry later", 429, AI_ADMISSION_RETRY_AFTER
+                    )
+                if admitted == -1:
+                    raise self._reject(
+                        "rejected_cluster", "AI service is busy, please retry shortly", 429, self._retry_after()
+                    )
+                ticket = candidate
+            except redis.RedisError as e:
+                logger.warning("Cluster admission check unavailable: %s", e)
+        except AdmissionRejected:
+            self._unreserve(route_class)
+            raise
+
+        self._record("admitted")
+        return ticket
+
+    def observe(self, started: float) -> None:
+        """Add one latency sample (seconds since ``started``) to the SLO window."""
+        with self._lock:
+            self._latencies.append((time.time(), time.monotonic() - started))
+
+    def release(self, route_class: str, ticket: Optional[str], started: Optional[float]) -> None:
+        """Free the request's slot; ``started`` is None when its latency was already observed."""
+        self._unreserve(route_class)
+        if started is not None:
+            self.observe(started)
+        if ticket:
+            try:
+                redis_client.zrem(self._tickets_key, ticket)
+            except redis.RedisError as e:
+                logger.warning("Could not release admission ticket: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self._p95()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = dict(self._in_flight)
+        try:
+            stats["cluster_in_flight"] = redis_client.zcount(self._tickets_key, time.time(), "+inf")
+            stats["resume_backlog"] = redis_client.llen(RESUME_QUEUE_KEY)
+        except redis.RedisError:
+            stats["cluster_in_flight"] = None
+            stats["resume_backlog"] = None
+        stats["queued_calls"] = queued_calls()
+        stats.update({
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p95": round(p95, 3) if p95 is not None else None,
+            "latency_slo": self.latency_slo,
+            "max_process": self.max_process,
+            "max_cluster": self.max_cluster,
+            "max_queued": self.max_queued,
+            "max_backlog": self.max_backlog,
+        })
+        return stats
+
+
+ai_admission = AdmissionController()
@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+import redis
+
+from app.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+AI_CACHE_TTL = int(os.environ.get("AI_CACHE_TTL", 7 * 24 * 3600))  # seconds
+AI_CACHE_MAX_ENTRIES = int(os.environ.get("AI_CACHE_MAX_ENTRIES", 20000))
+AI_CACHE_LOCAL_SIZE = int(os.environ.get("AI_CACHE_LOCAL_SIZE", 256))
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so cosmetic differences do not change the cache key."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+class AIResultCache:
+    """
+    Content-addressed cache for AI analysis results.
+
+    Lookups go through a small in-process LRU first, then Redis. Redis entries
+    carry a TTL and are tracked in a sorted set so the oldest ones are evicted
+    once the namespace grows past ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int = AI_CACHE_TTL,
+        max_entries: int = AI_CACHE_MAX_ENTRIES,
+        local_size: int = AI_CACHE_LOCAL_SIZE,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.local_size = local_size
+
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "local_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "compute_seconds": 0.0,
+        }
+
+    # ---------------- Keys ----------------
+    @staticmethod
+    def make_key(
+        cv_text: str, job_description: str, model: str, prompt_version: str
+    ) -> str:
+        digest = hashlib.sha256()
+        for part in (prompt_version, model, normalize_text(job_description), normalize_text(cv_text)):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _redis_key(self, key: str) -> str:
+        return f"ai_cache:{self.namespace}:{key}"
+
+    @property
+    def _index_key(self) -> str:
+        return f"ai_cache:{self.namespace}:index"
+
+    @property
+    def _stats_key(self) -> str:
+        return f"ai_cache:{self.namespace}:stats"
+
+    # ---------------- Local LRU ----------------
+    def _local_get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._local.get(key)
+            if value is not None:
+                self._local.move_to_end(key)
+            return value
+
+    def _local_set(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def _incr(self, field: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[field] += amount
+        try:
+            if isinstance(amount, float):
+                redis_client.hincrbyfloat(self._stats_key, field, amount)
+            else:
+                redis_client.hincrby(self._stats_key, field, amount)
+        except redis.RedisError:
+            pass
+
+    # ---------------- Public API ----------------
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._local_get(key)
+        if value is not None:
+            self._incr("local_hits")
+            return dict(value)
+
+        try:
+            raw = redis_client.get(self._redis_key(key))
+        except redis.RedisError as e:
+            logger.warning("AI cache read failed: %s", e)
+            raw = None
+
+        if raw:
+            try:
+                value = json.loads(raw)
+            except ValueError:
+                value = None
+        if value is not None:
+            self._local_set(key, value)
+            self._incr("redis_hits")
+            return dict(value)
+
+        self._incr("misses")
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._local_set(key, value)
+        try:
+            pipe = redis_client.pipeline()
+            pipe.set(self._redis_key(key), json.dumps(value), ex=self.ttl)
+            pipe.zadd(self._index_key, {key: time.time()})
+            pipe.zcard(self._index_key)
+            size = pipe.execute()[-1]
+            self._incr("stores")
+            if size > self.max_entries:
+                self._evict(size - self.max_entries)
+        except redis.RedisError as e:
+            logger.warning("AI cache write failed: %s", e)
+
+    def _evict(self, count: int) -> None:
+        oldest = redis_client.zpopmin(self._index_key, count)
+        if not oldest:
+            return
+        redis_client.delete(*[self._redis_key(k) for k, _ in oldest])
+        self._incr("evictions", len(oldest))
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Dict[str, Any]],
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda result: True,
+    ) -> Dict[str, Any]:
+        """
+        Return the cached result for ``key`` or run ``compute`` and store it.
+        Results rejected by ``cacheable`` (e.g. fallbacks after an API error)
+        are returned but never stored.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        started = time.monotonic()
+        result = compute()
+        elapsed = time.monotonic() - started
+
+        if cacheable(result):
+            self._incr("compute_seconds", float(elapsed))
+            self.set(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for this process plus the cluster-wide totals kept in Redis."""
+        with self._lock:
+            local = dict(self._stats)
+            local["local_entries"] = len(self._local)
+
+        cluster: Dict[str, Any] = {}
+        try:
+            cluster = {k: float(v) for k, v in redis_client.hgetall(self._stats_key).items()}
+            cluster["entries"] = redis_client.zcard(self._index_key)
+        except redis.RedisError as e:
+            logger.warning("AI cache stats unavailable: %s", e)
+
+        def summarize(counters: Dict[str, Any]) -> Dict[str, Any]:
+            hits = counters.get("local_hits", 0) + counters.get("redis_hits", 0)
+            lookups = hits + counters.get("misses", 0)
+            stores = counters.get("stores", 0)
+            avg_compute = counters.get("compute_seconds", 0) / stores if stores else 0
+            counters["hit_rate"] = round(hits / lookups, 4) if lookups else 0
+            counters["avg_compute_seconds"] = round(avg_compute, 3)
+            counters["estimated_seconds_saved"] = round(hits * avg_compute, 1)
+            return counters
+
+        return {
+            "namespace": self.namespace,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "process": summarize(local),
+            "cluster": summarize(cluster) if cluster else {},
+        }
+
+    def clear(self) -> int:
+        with self._lock:
+            self._local.clear()
+        try:
+            keys = redis_client.zrange(self._index_key, 0, -1)
+            if keys:
+                redis_client.delete(*[self._redis_key(k) for k in keys])
+            redis_client.delete(self._index_key, self._stats_key)
+            return len(keys)
+        except redis.RedisError as e:
+            logger.warning("AI cache clear failed: %s", e)
+            return 0
+
+
+# Shared by AIService.analyze_cv_vs_job and HybridResumeAnalyzer.analyse_resume;
+# the prompt version in the key keeps their results apart.
+cv_analysis_cache = AIResultCache("cv_analysis")
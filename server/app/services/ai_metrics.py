@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+import redis
+from flask import has_request_context, request
+
+from app.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)  # seconds; plus +Inf
+GROUPS = ("endpoint", "operation", "model")
+METRICS_TTL = int(os.environ.get("AI_METRICS_TTL", 30 * 24 * 3600))  # seconds since last update
+
+# USD per 1M (prompt, completion) tokens, used when the API does not report
+# a cost itself. Override or extend with AI_MODEL_PRICES='{"model": [in, out]}'.
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "openai/gpt-4o-mini": (0.15, 0.60),
+    "openai/gpt-4o": (2.50, 10.00),
+    "openai/gpt-4.1-mini": (0.40, 1.60),
+    "openai/gpt-4.1": (2.00, 8.00),
+    "anthropic/claude-3.5-haiku": (0.80, 4.00),
+    "anthropic/claude-3.5-sonnet": (3.00, 15.00),
+    "google/gemini-2.0-flash-001": (0.10, 0.40),
+}
+try:
+    MODEL_PRICES.update({k: tuple(v) for k, v in json.loads(os.environ.get("AI_MODEL_PRICES", "{}")).items()})
+except (ValueError, TypeError, AttributeError):
+    logger.warning("Ignoring malformed AI_MODEL_PRICES")
+
+_current_operation: ContextVar[Optional[str]] = ContextVar("ai_operation", default=None)
+
+
+def current_operation() -> str:
+    return _current_operation.get() or "other"
+
+
+def current_endpoint() -> str:
+    if has_request_context():
+        return request.endpoint or request.path
+    return "background"
+
+
+def _bucket(seconds: float) -> str:
+    for bound in LATENCY_BUCKETS:
+        if seconds <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+class AIMetrics:
+    """
+    Per-call instrumentation for outbound LLM calls.
+
+    Every call is recorded under the Flask endpoint that triggered it
+    ("background" outside a request), the analysis path it belongs to (see
+    ``ai_operation``) and the model that answered: latency histogram, token
+    usage from the API ``usage`` block, retries, cost and how often the
+    output could be parsed. Counters are kept per process and mirrored into
+    Redis hashes so the admin endpoint can show the whole cluster.
+    """
+
+    def __init__(self, namespace: str = "ai_metrics"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.namespace}:keys"
+
+    def _add(self, labels: Dict[str, str], fields: Dict[str, float]) -> None:
+        keys = [f"{group}:{name}" for group, name in labels.items()]
+        with self._lock:
+            for key in keys:
+                counters = self._counters.setdefault(key, {})
+                for field, value in fields.items():
+                    counters[field] = counters.get(field, 0) + value
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for key in keys:
+                redis_key = f"{self.namespace}:{key}"
+                for field, value in fields.items():
+                    if isinstance(value, float):
+                        pipe.hincrbyfloat(redis_key, field, value)
+                    else:
+                        pipe.hincrby(redis_key, field, value)
+                pipe.expire(redis_key, METRICS_TTL)
+                pipe.sadd(self._index_key, key)
+            pipe.expire(self._index_key, METRICS_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.debug("AI metrics not mirrored to Redis: %s", e)
+
+    # ---------------- Recording ----------------
+    def record_call(
+        self,
+        model: str,
+        latency: float,
+        attempts: int,
+        ok: bool,
+        usage: Optional[Dict[str, Any]] = None,
+        estimated_tokens: Tuple[int, int] = (0, 0),
+        operation: Optional[str] = None,
+    ) -> None:
+        """
+        One logical call (all attempts). ``usage`` is the API's usage block;
+        without it ``estimated_tokens`` (prompt, completion) is counted instead.
+        ``operation`` overrides the label set with ``ai_operation``.
+        """
+        usage = usage or {}
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        estimated = not usage
+        if estimated:
+            prompt_tokens, completion_tokens = estimated_tokens
+
+        cost = usage.get("cost")
+        if cost is None:
+            cost = estimate_cost(model, prompt_tokens, completion_tokens)
+
+        fields = {
+            "calls": 1,
+            "failures": 0 if ok else 1,
+            "retries": max(0, attempts - 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "estimated_usage": 1 if estimated else 0,
+            "cost_usd": float(cost or 0.0),
+            "unpriced": 1 if cost is None else 0,
+            "latency_sum": float(latency),
+            f"latency:{_bucket(latency)}": 1,
+        }
+        endpoint, operation = current_endpoint(), operation or current_operation()
+        self._add({"endpoint": endpoint, "operation": operation, "model": model}, fields)
+        logger.info(
+            "AI call endpoint=%s operation=%s model=%s ok=%s latency=%.2fs attempts=%d "
+            "prompt_tokens=%d completion_tokens=%d cost=%s",
+            endpoint, operation, model, ok, latency, attempts, prompt_tokens, completion_tokens,
+            f"{cost:.6f}" if cost is not None else "unknown",
+        )
+
+    def record_parse(self, ok: bool, model: Optional[str] = None) -> None:
+        """Whether a model answer could be parsed into the expected structure."""
+        labels = {"endpoint": current_endpoint(), "operation": current_operation()}
+        if model:
+            labels["model"] = model
+        self._add(labels, {"parse_ok": 1 if ok else 0, "parse_failed": 0 if ok else 1})
+
+    def record_run(self, operation: str, seconds: float, ok: bool) -> None:
+        """End-to-end time of one analysis path, cache lookups and parsing included."""
+        self._add(
+            {"endpoint": current_endpoint(), "operation": operation},
+            {
+                "runs": 1,
+                "run_failures": 0 if ok else 1,
+                "run_latency_sum": float(seconds),
+                f"run_latency:{_bucket(seconds)}": 1,
+            },
+        )
+
+    # ---------------- Reporting ----------------
+    @staticmethod
+    def _histogram(counters: Dict[str, float], prefix: str) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS] + ["le_inf"]
+        counts = {label: int(counters.get(f"{prefix}:{label}", 0)) for label in labels}
+        total = sum(counts.values())
+
+        def quantile(q: float):
+            if not total:
+                return None
+            seen = 0
+            for bound, label in zip(list(LATENCY_BUCKETS) + [None], labels):
+                seen += counts[label]
+                if seen >= q * total:
+                    return bound  # bucket upper bound; None means above the last bucket
+            return None
+
+        return {
+            "count": total,
+            "avg_seconds": round(counters.get(f"{prefix}_sum", 0) / total, 3) if total else 0,
+            "p50_le": quantile(0.5),
+            "p90_le": quantile(0.9),
+            "p99_le": quantile(0.99),
+            "buckets": counts,
+        }
+
+    @staticmethod
+    def summarize(counters: Dict[str, float]) -> Dict[str, Any]:
+        calls = int(counters.get("calls", 0))
+        parsed = int(counters.get("parse_ok", 0))
+        parse_total = parsed + int(counters.get("parse_failed", 0))
+        cost = counters.get("cost_usd", 0.0)
+        summary = {
+            "calls": calls,
+            "failures": int(counters.get("failures", 0)),
+            "retries": int(counters.get("retries", 0)),
+            "prompt_tokens": int(counters.get("prompt_tokens", 0)),
+            "completion_tokens": int(counters.get("completion_tokens", 0)),
+            "estimated_usage_calls": int(counters.get("estimated_usage", 0)),
+            "cost_usd": round(cost, 6),
+            "avg_cost_usd": round(cost / calls, 6) if calls else 0,
+            "unpriced_calls": int(counters.get("unpriced", 0)),
+            "latency": AIMetrics._histogram(counters, "latency"),
+            "parse": {
+                "ok": parsed,
+                "failed": parse_total - parsed,
+                "success_rate": round(parsed / parse_total, 4) if parse_total else None,
+            },
+        }
+        if counters.get("runs"):
+            summary["runs"] = {
+                "count": int(counters["runs"]),
+                "failures": int(counters.get("run_failures", 0)),
+                "latency": AIMetrics._histogram(counters, "run_latency"),
+            }
+        return summary
+
+    def _group(self, counters_by_key: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+        grouped: Dict[str, Dict[str, Any]] = {group: {} for group in GROUPS}
+        for key, counters in counters_by_key.items():
+            group, _, name = key.partition(":")
+            if group in grouped:
+                grouped[group][name] = self.summarize(counters)
+        return grouped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            process = {key: dict(counters) for key, counters in self._counters.items()}
+        result = {"buckets": list(LATENCY_BUCKETS), "process": self._group(process)}
+        try:
+            keys = sorted(redis_client.smembers(self._index_key))
+            pipe = redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.hgetall(f"{self.namespace}:{key}")
+            cluster = {
+                key: {field: float(value) for field, value in counters.items()}
+                for key, counters in zip(keys, pipe.execute())
+                if counters
+            }
+            result["cluster"] = self._group(cluster)
+        except redis.RedisError:
+            result["cluster"] = None
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters = {}
+        try:
+            keys = redis_client.smembers(self._index_key)
+            redis_client.delete(self._index_key, *[f"{self.namespace}:{key}" for key in keys])
+        except redis.RedisError as e:
+            logger.warning("Could not reset AI metrics in Redis: %s", e)
+
+
+ai_metrics = AIMetrics()
+
+
+@contextmanager
+def ai_operation(operation: str):
+    """
+    Label AI calls made inside the block with ``operation`` and record the
+    block's own duration as one run of that analysis path.
+    """
+    token = _current_operation.set(operation)
+    started = time.monotonic()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        _current_operation.reset(token)
+        ai_metrics.record_run(operation, time.monotonic() - started, ok)
@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"  # /api/ai/chat
+CANDIDATE = "candidate"  # candidate-triggered CV analysis
+BATCH = "batch"  # re-scoring, queue workers, background jobs
+PRIORITY_CLASSES = (INTERACTIVE, CANDIDATE, BATCH)
+
+AI_PRIORITY_WEIGHTS = {
+    INTERACTIVE: float(os.environ.get("AI_WEIGHT_INTERACTIVE", 8)),
+    CANDIDATE: float(os.environ.get("AI_WEIGHT_CANDIDATE", 4)),
+    BATCH: float(os.environ.get("AI_WEIGHT_BATCH", 1)),
+}
+AI_INTERACTIVE_RESERVED = int(os.environ.get("AI_INTERACTIVE_RESERVED", 2))  # slots only chat may use
+AI_BATCH_MAX_SHARE = float(os.environ.get("AI_BATCH_MAX_SHARE", 0.5))  # of all slots
+
+_current_priority: ContextVar[str] = ContextVar("ai_priority", default=CANDIDATE)
+
+
+@contextmanager
+def ai_priority(priority: str):
+    """Run AI calls made inside the block (in this thread/context) under ``priority``."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+
+class _Ticket:
+    __slots__ = ("priority", "granted")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.granted = False
+
+
+class AIScheduler:
+    """
+    Hands out the process's outbound AI call slots by priority class.
+
+    Waiting calls are queued per class and dispatched by weighted fair
+    queuing: every grant advances the class's virtual time by 1/weight and
+    the non-empty class with the smallest virtual time goes next, so chat
+    gets most slots under contention but batch work is never starved.
+    ``reserved`` slots are only ever given to interactive calls, and batch
+    calls may hold at most ``batch_share`` of all slots, so a large re-scoring
+    run is delayed rather than allowed to crowd out chat.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        reserved: int = AI_INTERACTIVE_RESERVED,
+        weights: Optional[Dict[str, float]] = None,
+        batch_share: float = AI_BATCH_MAX_SHARE,
+    ):
+        self.capacity = max(1, capacity)
+        self.reserved = max(0, min(reserved, self.capacity - 1))
+        self.weights = weights or dict(AI_PRIORITY_WEIGHTS)
+        self.batch_limit = max(1, int(self.capacity * batch_share))
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[_Ticket]] = {p: deque() for p in PRIORITY_CLASSES}
+        self._vtime = {p: 0.0 for p in PRIORITY_CLASSES}
+        self._global_vtime = 0.0
+        self._in_use = {p: 0 for p in PRIORITY_CLASSES}
+        self._stats = {
+            p: {"granted": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+            for p in PRIORITY_CLASSES
+        }
+
+    # ---------------- Dispatch ----------------
+    def _can_run(self, priority: str) -> bool:
+        used = sum(self._in_use.values())
+        if used >= self.capacity:
+            return False
+        if priority == INTERACTIVE:
+            return True
+        shared_used = used - min(self._in_use[INTERACTIVE], self.reserved)
+        if shared_used >= self.capacity - self.reserved:
+            return False
+        return priority != BATCH or self._in_use[BATCH] < self.batch_limit
+
+    def _dispatch(self) -> None:
+        """Grant free slots to queued tickets; caller holds ``_cond``."""
+        granted = False
+        while True:
+            candidates = [p for p in PRIORITY_CLASSES if self._queues[p] and self._can_run(p)]
+            if not candidates:
+                break
+            priority = min(candidates, key=lambda p: (self._vtime[p], PRIORITY_CLASSES.index(p)))
+            ticket = self._queues[priority].popleft()
+            ticket.granted = True
+            self._grant(priority)
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _grant(self, priority: str) -> None:
+        self._in_use[priority] += 1
+        self._global_vtime = max(self._global_vtime, self._vtime[priority])
+        self._vtime[priority] += 1.0 / self.weights.get(priority, 1.0)
+
+    # ---------------- Public API ----------------
+    def acquire(self, priority: str, timeout: float) -> float:
+        """Wait up to ``timeout`` seconds for a slot. Returns the seconds queued."""
+        priority = priority if priority in self._queues else CANDIDATE
+        started = time.monotonic()
+        with self._cond:
+            # A class that was idle restarts at the current virtual time
+            # instead of cashing in credit it built up while idle.
+            if not self._queues[priority] and not self._in_use[priority]:
+                self._vtime[priority] = max(self._vtime[priority], self._global_vtime)
+
+            if not any(self._queues.values()) and self._can_run(priority):
+                self._grant(priority)
+            else:
+                ticket = _Ticket(priority)
+                self._queues[priority].append(ticket)
+                self._dispatch()
+                give_up = started + max(0.0, timeout)
+                while not ticket.granted:
+                    remaining = give_up - time.monotonic()
+                    if remaining <= 0:
+                        self._queues[priority].remove(ticket)
+                        self._stats[priority]["timeouts"] += 1
+                        raise TimeoutError(f"Timed out waiting for a free {priority} AI call slot")
+                    self._cond.wait(remaining)
+
+            waited = time.monotonic() - started
+            stats = self._stats[priority]
+            stats["granted"] += 1
+            stats["wait_seconds_total"] += waited
+            stats["wait_seconds_max"] = max(stats["wait_seconds_max"], waited)
+            return waited
+
+    def release(self, priority: str) -> None:
+        priority = priority if priority in self._queues else CANDIDATE
+        with self._cond:
+            self._in_use[priority] -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, priority: str, timeout: float):
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def queued(self, classes=PRIORITY_CLASSES) -> int:
+        """Calls of ``classes`` currently waiting for a slot."""
+        with self._cond:
+            return sum(len(self._queues[p]) for p in classes)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            classes = {
+                p: {
+                    **self._stats[p],
+                    "weight": self.weights.get(p, 1.0),
+                    "in_flight": self._in_use[p],
+                    "queued": len(self._queues[p]),
+                    "avg_wait_seconds": round(
+                        self._stats[p]["wait_seconds_total"] / self._stats[p]["granted"], 4
+                    ) if self._stats[p]["granted"] else 0,
+                }
+                for p in PRIORITY_CLASSES
+            }
+        return {
+            "capacity": self.capacity,
+            "reserved_interactive": self.reserved,
+            "batch_limit": self.batch_limit,
+            "classes": classes,
+        }
@@ -1,9 +1,26 @@
 import os
+import copy
+import random
 import requests
 import json
 import logging
+import threading
 import time
-from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from app.services.ai_cache import cv_analysis_cache
+from app.services.ai_metrics import ai_metrics, ai_operation
+from app.services.ai_scheduler import AIScheduler, CANDIDATE, INTERACTIVE, current_priority
+from app.services.model_router import cv_scoring_router
+from app.services.llm_rate_limiter import openrouter_limiter, RateLimitExceeded
+from app.services.prompt_compactor import PromptCompactor, CHARS_PER_TOKEN
+from app.services.single_flight import ai_flight, fingerprint
+from app.utils.deadlines import deadline_after
+
+load_dotenv()
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +30,83 @@ OPENROUTER_URL = os.environ.get(
 )
 DEFAULT_MODEL = os.environ.get("OPENROUTER_MODEL", "openai/gpt-4o-mini")
 
+# Outbound call limits (per process)
+AI_MAX_CONCURRENCY = int(os.environ.get("AI_MAX_CONCURRENCY", 8))
+AI_POOL_SIZE = int(os.environ.get("AI_POOL_SIZE", AI_MAX_CONCURRENCY))
+AI_CALL_DEADLINE = float(os.environ.get("AI_CALL_DEADLINE", 90))  # seconds, all attempts
+AI_MAX_BACKOFF = float(os.environ.get("AI_MAX_BACKOFF", 20))  # seconds
+
+SYSTEM_PROMPT = "You are an expert recruitment assistant."
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Bump whenever the analysis prompt changes so cached results are not reused.
+CV_JOB_PROMPT_VERSION = "cv-job-v3"
+
+# ------------------- Shared HTTP Pool -------------------
+# One keep-alive session per process so calls reuse TCP/TLS connections,
+# and a priority scheduler so a burst cannot open unbounded concurrent LLM
+# calls and batch work cannot starve interactive chat.
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=AI_POOL_SIZE)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+_scheduler = AIScheduler(AI_MAX_CONCURRENCY)
+
+_stats_lock = threading.Lock()
+_http_stats = {
+    "calls": 0,
+    "attempts": 0,
+    "retries": 0,
+    "failures": 0,
+    "queue_timeouts": 0,
+    "in_flight": 0,
+    "queued_seconds_total": 0.0,
+    "queued_seconds_max": 0.0,
+}
+
+
+def _record(**deltas) -> None:
+    with _stats_lock:
+        for key, value in deltas.items():
+            if key == "queued_seconds_max":
+                _http_stats[key] = max(_http_stats[key], value)
+            else:
+                _http_stats[key] += value
+
+
+def get_http_stats() -> Dict[str, Any]:
+    """Connection reuse and queueing counters for this process."""
+    with _stats_lock:
+        stats = dict(_http_stats)
+
+    connections = requests_sent = 0
+    pools = _adapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+
+    stats["connections_opened"] = connections
+    stats["requests_sent"] = requests_sent
+    stats["connection_reuse_rate"] = (
+        round(1 - connections / requests_sent, 4) if requests_sent else 0
+    )
+    stats["avg_queued_seconds"] = (
+        round(stats["queued_seconds_total"] / stats["attempts"], 4) if stats["attempts"] else 0
+    )
+    stats["max_concurrency"] = AI_MAX_CONCURRENCY
+    stats["pool_size"] = AI_POOL_SIZE
+    stats["coalescing"] = ai_flight.stats()
+    stats["rate_limit"] = openrouter_limiter.stats()
+    stats["scheduler"] = _scheduler.stats()
+    return stats
+
+
+def queued_calls() -> int:
+    """Interactive and candidate AI calls in this process waiting for the scheduler."""
+    return _scheduler.queued((INTERACTIVE, CANDIDATE))
+
 
 class AIService:
     def __init__(
@@ -21,82 +115,416 @@ class AIService:
         model: Optional[str] = None,
         timeout: int = 60,
         retries: int = 3,
-        backoff: int = 5,
+        backoff: int = 2,
+        deadline: float = AI_CALL_DEADLINE,
+        priority: Optional[str] = None,
+        operation: Optional[str] = None,
     ):
         self.api_key = api_key or OPENROUTER_API_KEY
         self.model = model or DEFAULT_MODEL
         self.timeout = timeout
         self.retries = retries
         self.backoff = backoff
+        self.deadline = deadline
+        # None: inherit the class set with ``ai_priority`` (default "candidate")
+        self.priority = priority
+        # None: inherit the label set with ``ai_operation`` (see AIMetrics)
+        self.operation = operation
 
         if not self.api_key:
             logger.warning(
                 "No OPENROUTER_API_KEY found in environment. AI calls will fail without a key."
             )
 
-    def _call_generation(
-        self, prompt: str, temperature: float = 0.7, max_output_tokens: int = 512
-    ) -> str:
+    # ---------------- Request Helpers ----------------
+    def _headers(self) -> Dict[str, str]:
         if not self.api_key:
             raise RuntimeError("OPENROUTER_API_KEY not set")
-
-        headers = {
+        return {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}",
         }
 
-        payload = {
+    def _payload(
+        self,
+        prompt: str,
+        temperature: float,
+        max_output_tokens: int,
+        system_prompt: str = SYSTEM_PROMPT,
+        **extra,
+    ) -> Dict[str, Any]:
+        return {
             "model": self.model,
             "messages": [
-                {"role": "system", "content": "You are an expert recruitment assistant."},
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt},
             ],
             "temperature": temperature,
             "max_tokens": max_output_tokens,
+            # Ask OpenRouter to report token counts and cost on every response
+            "usage": {"include": True},
+            **extra,
         }
 
-        for attempt in range(1, self.retries + 1):
-            try:
-                resp = requests.post(
-                    OPENROUTER_URL, headers=headers, json=payload, timeout=self.timeout
-                )
-                if resp.status_code != 200:
-                    logger.error(
-                        "OpenRouter API error [%s]: %s", resp.status_code, resp.text
-                    )
-                    raise RuntimeError(
-                        f"OpenRouter API error: {resp.status_code} {resp.text}"
-                    )
-                data = resp.json()
-                return data["choices"][0]["message"]["content"]
-            except requests.exceptions.Timeout:
-                logger.warning(
-                    "Timeout on attempt %d/%d, retrying in %d seconds...",
-                    attempt,
-                    self.retries,
-                    self.backoff,
-                )
-                time.sleep(self.backoff)
-            except requests.exceptions.RequestException as e:
-                logger.error(
-                    "RequestException on attempt %d/%d: %s", attempt, self.retries, e
-                )
-                time.sleep(self.backoff)
-            except Exception as e:
-                logger.exception(
-                    "Unexpected error on attempt %d/%d: %s", attempt, self.retries, e
-                )
-                time.sleep(self.backoff)
-
-        raise RuntimeError("Failed to call OpenRouter API after multiple retries")
+    def _priority(self) -> str:
+        return self.priority or current_priority()
+
+    @contextmanager
+    def _call_slot(self, deadline: float):
+        """Hold one of the process-wide in-flight slots for the duration of a call."""
+        priority = self._priority()
+        try:
+            queued = _scheduler.acquire(priority, timeout=deadline - time.monotonic())
+        except TimeoutError as e:
+            _record(queue_timeouts=1, failures=1)
+            raise RuntimeError(str(e))
+        _record(attempts=1, in_flight=1, queued_seconds_total=queued, queued_seconds_max=queued)
+        try:
+            yield
+        finally:
+            _scheduler.release(priority)
+            _record(in_flight=-1)
+
+    def _backoff(self, attempt: int, deadline: float) -> bool:
+        """Sleep before the next attempt; False when retries or the deadline are used up."""
+        if attempt >= self.retries:
+            return False
+        delay = random.uniform(0, min(AI_MAX_BACKOFF, self.backoff * 2 ** (attempt - 1)))
+        if time.monotonic() + delay >= deadline:
+            return False
+        _record(retries=1)
+        time.sleep(delay)
+        return True
+
+    @staticmethod
+    def _estimate_tokens(payload: Dict[str, Any]) -> int:
+        prompt_chars = sum(len(m.get("content") or "") for m in payload.get("messages", []))
+        return -(-prompt_chars // CHARS_PER_TOKEN) + int(payload.get("max_tokens") or 0)
+
+    def _acquire_budget(self, payload: Dict[str, Any], deadline: float) -> None:
+        """
+        Wait for room in the cluster-wide request/token budget (see
+        LLMRateLimiter). Called while holding a call slot, so the scheduler's
+        priority order also decides who gets the budget first.
+        """
+        try:
+            openrouter_limiter.acquire(
+                self._estimate_tokens(payload), deadline=deadline, priority=self._priority()
+            )
+        except RateLimitExceeded:
+            _record(failures=1)
+            raise
+
+    def _request_timeout(self, deadline: float) -> float:
+        return max(1.0, min(self.timeout, deadline - time.monotonic()))
+
+    def _record_call(
+        self, payload: Dict[str, Any], started: float, attempts: int, ok: bool,
+        model: Optional[str], usage: Optional[Dict[str, Any]], output_chars: int,
+    ) -> None:
+        prompt_chars = sum(len(m.get("content") or "") for m in payload.get("messages", []))
+        ai_metrics.record_call(
+            model or payload["model"],
+            time.monotonic() - started,
+            attempts,
+            ok,
+            usage=usage,
+            estimated_tokens=(-(-prompt_chars // CHARS_PER_TOKEN), -(-output_chars // CHARS_PER_TOKEN)),
+            operation=self.operation,
+        )
+
+    @staticmethod
+    def _api_error(resp: requests.Response) -> RuntimeError:
+        logger.error("OpenRouter API error [%s]: %s", resp.status_code, resp.text)
+        return RuntimeError(f"OpenRouter API error: {resp.status_code} {resp.text}")
+
+    # ---------------- Generation ----------------
+    def _call_generation(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_output_tokens: int = 512,
+        system_prompt: str = SYSTEM_PROMPT,
+        **extra,
+    ) -> str:
+        """
+        POST a chat completion through the shared pool and return the text.
+        Transient failures are retried with full-jitter exponential backoff
+        until ``retries`` attempts or ``deadline`` seconds are used up.
+        Identical concurrent requests (same payload) share one upstream call.
+        """
+        headers = self._headers()
+        payload = self._payload(prompt, temperature, max_output_tokens, system_prompt, **extra)
+        return ai_flight.do(
+            fingerprint(payload),
+            lambda: self._post_generation(headers, payload),
+            timeout=max(0.0, deadline_after(self.deadline) - time.monotonic()),
+        )
+
+    def _post_generation(self, headers: Dict[str, str], payload: Dict[str, Any]) -> str:
+        # Capped by the current request's deadline, if any
+        deadline = deadline_after(self.deadline)
+        started = time.monotonic()
+        last_error = None
+        attempt = 0
+        data = None
+        _record(calls=1)
+
+        try:
+            while attempt < self.retries and time.monotonic() < deadline:
+                attempt += 1
+                resp = None
+                with self._call_slot(deadline):
+                    self._acquire_budget(payload, deadline)
+                    try:
+                        resp = _session.post(
+                            OPENROUTER_URL,
+                            headers=headers,
+                            json=payload,
+                            timeout=self._request_timeout(deadline),
+                        )
+                    except requests.exceptions.Timeout as e:
+                        last_error = e
+                        logger.warning("Timeout on attempt %d/%d", attempt, self.retries)
+                    except requests.exceptions.RequestException as e:
+                        last_error = e
+                        logger.error(
+                            "RequestException on attempt %d/%d: %s", attempt, self.retries, e
+                        )
+
+                if resp is not None:
+                    if resp.status_code == 200:
+                        try:
+                            data = resp.json()
+                            return data["choices"][0]["message"]["content"]
+                        except (ValueError, KeyError, IndexError) as e:
+                            data = None
+                            last_error = e
+                            logger.exception(
+                                "Malformed response on attempt %d/%d", attempt, self.retries
+                            )
+                    else:
+                        last_error = self._api_error(resp)
+                        if resp.status_code not in RETRYABLE_STATUS:
+                            _record(failures=1)
+                            raise last_error
+
+                if not self._backoff(attempt, deadline):
+                    break
+
+            _record(failures=1)
+            raise RuntimeError(
+                f"Failed to call OpenRouter API after {attempt} attempt(s): {last_error}"
+            )
+        finally:
+            text = (data["choices"][0]["message"].get("content") or "") if data else ""
+            self._record_call(
+                payload, started, attempt, data is not None,
+                model=data.get("model") if data else None,
+                usage=data.get("usage") if data else None,
+                output_chars=len(text),
+            )
+
+    def _stream_generation(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_output_tokens: int = 512,
+        system_prompt: str = SYSTEM_PROMPT,
+        **extra,
+    ) -> Iterator[str]:
+        """
+        Stream a chat completion (``stream: true``) and yield text deltas as
+        they arrive. Connection failures are retried only until the first
+        token has been yielded; after that an error is raised to the caller.
+        """
+        headers = self._headers()
+        payload = self._payload(
+            prompt, temperature, max_output_tokens, system_prompt, stream=True, **extra
+        )
+
+        # Capped by the current request's deadline, if any
+        deadline = deadline_after(self.deadline)
+        started = time.monotonic()
+        last_error = None
+        attempt = 0
+        # Usage and the answering model arrive on the final chunk
+        outcome = {"ok": False, "model": None, "usage": None, "chars": 0}
+        _record(calls=1)
+
+        try:
+            while attempt < self.retries and time.monotonic() < deadline:
+                attempt += 1
+                with self._call_slot(deadline):
+                    self._acquire_budget(payload, deadline)
+                    try:
+                        resp = _session.post(
+                            OPENROUTER_URL,
+                            headers=headers,
+                            json=payload,
+                            stream=True,
+                            timeout=self._request_timeout(deadline),
+                        )
+                    except requests.exceptions.RequestException as e:
+                        last_error = e
+                        logger.warning("Stream connect failed on attempt %d/%d: %s", attempt, self.retries, e)
+                        resp = None
+
+                    if resp is not None:
+                        with resp:
+                            if resp.status_code != 200:
+                                last_error = self._api_error(resp)
+                                if resp.status_code not in RETRYABLE_STATUS:
+                                    _record(failures=1)
+                                    raise last_error
+                            else:
+                                for line in resp.iter_lines(decode_unicode=True):
+                                    # Blank keep-alives and ": comment" lines carry no data
+                                    if not line or not line.startswith("data:"):
+                                        continue
+                                    data = line[len("data:"):].strip()
+                                    if data == "[DONE]":
+                                        break
+                                    try:
+                                        chunk = json.loads(data)
+                                    except ValueError:
+                                        continue
+                                    if "error" in chunk:
+                                        _record(failures=1)
+                                        raise RuntimeError(f"OpenRouter stream error: {chunk['error']}")
+                                    outcome["model"] = chunk.get("model") or outcome["model"]
+                                    outcome["usage"] = chunk.get("usage") or outcome["usage"]
+                                    choices = chunk.get("choices") or [{}]
+                                    token = (choices[0].get("delta") or {}).get("content")
+                                    if token:
+                                        outcome["chars"] += len(token)
+                                        yield token
+                                outcome["ok"] = True
+                                return
+
+                if not self._backoff(attempt, deadline):
+                    break
+
+            _record(failures=1)
+            raise RuntimeError(
+                f"Failed to call OpenRouter API after {attempt} attempt(s): {last_error}"
+            )
+        finally:
+            self._record_call(
+                payload, started, attempt, outcome["ok"],
+                model=outcome["model"], usage=outcome["usage"], output_chars=outcome["chars"],
+            )
 
     def chat(self, message: str, temperature: float = 0.2) -> str:
         prompt = f"User:\n{message}\n\nAssistant:"
-        return self._call_generation(prompt, temperature=temperature, max_output_tokens=400)
+        return self._labelled("chat")._call_generation(prompt, temperature=temperature, max_output_tokens=400)
+
+    def stream_chat(self, message: str, temperature: float = 0.2) -> Iterator[str]:
+        prompt = f"User:\n{message}\n\nAssistant:"
+        return self._labelled("chat")._stream_generation(prompt, temperature=temperature, max_output_tokens=400)
 
     def analyze_cv_vs_job(
         self, cv_text: str, job_description: str, want_json: bool = True
     ) -> Dict[str, Any]:
+        """
+        Score a CV against a job description. With model routing enabled the
+        fast tier answers first and the strong tier only re-scores doubtful
+        results (see ``ModelRouter``).
+        """
+        key = cv_analysis_cache.make_key(
+            cv_text=cv_text,
+            job_description=job_description,
+            model=cv_scoring_router.cache_tag(self.model),
+            prompt_version=CV_JOB_PROMPT_VERSION,
+        )
+        with ai_operation("cv_job"):
+            return cv_analysis_cache.get_or_compute(
+                key,
+                lambda: self._routed_analysis(cv_text, job_description),
+                cacheable=lambda result: "raw_output" not in result,
+            )
+
+    def analyze_cvs_batch(
+        self, cv_texts: List[str], job_description: str, output_tokens_per_cv: int = 400
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Score several CVs against one job description in a single prompt.
+        Returns ``{position: item}`` for the CVs the model answered with a
+        usable ``match_score`` (clamped to 0-100); each item also carries the
+        model's ``confidence``, ``missing_skills`` and ``suggestions`` as
+        given. CVs the answer leaves out are simply missing, so the caller
+        can score them one by one. Raises when the call fails or the answer
+        is not a JSON array. Not cached here: batch answers differ from
+        single-prompt ones and must be cached under their own key.
+        """
+        blocks = "\n\n".join(
+            f"=== RESUME {n} ===\n{text}" for n, text in enumerate(cv_texts, start=1)
+        )
+        prompt = f"""
+Job Description:
+{job_description}
+
+Resumes:
+{blocks}
+
+Task:
+- Analyze each resume separately against the job description.
+- Give each a match score out of 100 and your confidence in it out of 100.
+- Highlight missing skills or experiences and suggest improvements.
+
+Return strictly a JSON array with one object per resume, in order:
+[{{"resume": 1, "match_score": XX, "confidence": XX, "missing_skills": ["..."], "suggestions": ["..."]}}]
+"""
+        text = self._labelled("cv_batch")._call_generation(
+            prompt,
+            temperature=0,
+            max_output_tokens=min(output_tokens_per_cv * len(cv_texts), 4096),
+            system_prompt="You are an AI recruitment assistant. Always return results in the requested format.",
+            top_p=0.9,
+        ) or ""
+        start, end = text.find("["), text.rfind("]")
+        items = json.loads(text[start:end + 1]) if start != -1 and end > start else None
+        if not isinstance(items, list):
+            raise ValueError("Batched analysis did not return a JSON array")
+
+        answers: Dict[int, Dict[str, Any]] = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            try:
+                position = int(item.get("resume", position + 1)) - 1
+                match_score = max(0, min(100, int(round(float(item["match_score"])))))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not 0 <= position < len(cv_texts) or position in answers:
+                continue
+            answers[position] = {**item, "match_score": match_score}
+        return answers
+
+    def _with_model(self, model: str) -> "AIService":
+        clone = copy.copy(self)
+        clone.model = model
+        return clone
+
+    def _labelled(self, operation: str) -> "AIService":
+        """This service, with ``operation`` as its metrics label unless one is set already."""
+        if self.operation:
+            return self
+        clone = copy.copy(self)
+        clone.operation = operation
+        return clone
+
+    def _routed_analysis(self, cv_text: str, job_description: str) -> Dict[str, Any]:
+        cv_text, job_description, compaction = PromptCompactor.compact_pair(cv_text, job_description)
+        result = cv_scoring_router.run(
+            lambda model: self._with_model(model)._analyze_cv_vs_job(cv_text, job_description),
+            is_valid=lambda parsed: "raw_output" not in parsed,
+            fallback_model=self.model,
+        )
+        result["compaction"] = compaction
+        return result
+
+    def _analyze_cv_vs_job(self, cv_text: str, job_description: str) -> Dict[str, Any]:
         prompt = f"""
 You are a hiring assistant specializing in parsing resumes and comparing them to job descriptions.
 Please analyze the candidate CV below and the job description below.
@@ -113,6 +541,7 @@ Task:
  - a list "missing_skills".
  - a list "suggestions".
  - a list "interview_questions".
+ - a numeric "confidence" (0-1) in your match_score.
 
 Return the response strictly as JSON.
 """
@@ -125,7 +554,9 @@ Return the response strictly as JSON.
             match = re.search(r"(\{.*\})", out, flags=re.DOTALL)
             json_text = match.group(1) if match else out
             parsed = json.loads(json_text)
+            ai_metrics.record_parse(True, self.model)
         except Exception:
+            ai_metrics.record_parse(False, self.model)
             logger.exception("Failed to parse JSON, returning raw text")
             parsed = {
                 "match_score": 0,
@@ -142,6 +573,13 @@ Return the response strictly as JSON.
         except Exception:
             parsed["match_score"] = 0
 
+        if "confidence" in parsed:
+            try:
+                confidence = float(parsed["confidence"])
+                parsed["confidence"] = round(confidence / 100 if confidence > 1 else confidence, 3)
+            except (TypeError, ValueError):
+                parsed["confidence"] = 0.0
+
         for key in ("missing_skills", "suggestions", "interview_questions"):
             if key not in parsed or not isinstance(parsed[key], list):
                 parsed[key] = []
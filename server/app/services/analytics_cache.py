@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import redis_client
+from app.models import Application, AssessmentResult, Candidate, Interview, Requisition, User
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_CACHE_TTL = int(os.environ.get("ANALYTICS_CACHE_TTL", 600))  # seconds; bound for writes the hooks miss
+ANALYTICS_CACHE_LOCK_TTL = int(os.environ.get("ANALYTICS_CACHE_LOCK_TTL", 30))  # seconds
+ANALYTICS_CACHE_WAIT = float(os.environ.get("ANALYTICS_CACHE_WAIT", 10))  # seconds a follower waits for the leader
+POLL_INTERVAL = 0.05  # seconds, doubled up to POLL_MAX
+POLL_MAX = 0.5
+
+# Tables whose writes change analytics results. A write bumps that table's
+# version; a cached response is keyed by the versions of the tables it reads.
+TRACKED_MODELS = (Application, Interview, AssessmentResult, Candidate, Requisition, User)
+TRACKED_TABLES = tuple(model.__tablename__ for model in TRACKED_MODELS)
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class AnalyticsCache:
+    """
+    Response cache for the analytics endpoints with write-driven invalidation.
+
+    Keys combine the endpoint, its query string and the current version of
+    each table the endpoint reads, so a committed write to one of them makes
+    older entries unreachable (they expire on their own). Versions are bumped after
+    commit from mapper events; writes that bypass the ORM unit of work
+    (bulk updates, raw SQL) must call ``bump`` themselves. On a miss only
+    the worker holding ``{key}:lock`` recomputes; others poll for its
+    result and only compute themselves if it does not arrive in time.
+    """
+
+    def __init__(self, namespace: str = "analytics_cache", ttl: int = ANALYTICS_CACHE_TTL):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "waited_hits": 0, "bypassed": 0}
+
+    def _record(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _version_key(self, table: str) -> str:
+        return f"{self.namespace}:version:{table}"
+
+    # ---------------- Versions ----------------
+    def versions(self, tables: Iterable[str] = TRACKED_TABLES) -> Dict[str, str]:
+        tables = sorted(tables)
+        values = redis_client.mget([self._version_key(table) for table in tables])
+        return {table: value or "0" for table, value in zip(tables, values)}
+
+    def bump(self, tables: Iterable[str]) -> None:
+        tables = sorted(set(tables))
+        if not tables:
+            return
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for table in tables:
+                pipe.incr(self._version_key(table))
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Analytics cache version bump failed for %s: %s", tables, e)
+
+    def make_key(self, endpoint: str, args: Dict[str, Any], tables: Iterable[str] = TRACKED_TABLES) -> str:
+        versions = self.versions(tables)
+        raw = json.dumps({"endpoint": endpoint, "args": args, "versions": versions}, sort_keys=True)
+        return f"{self.namespace}:{endpoint}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    # ---------------- Lookup ----------------
+    def get_or_compute(
+        self, key: str, compute: Callable[[], Optional[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Return the cached entry for ``key`` or ``compute()`` it once across
+        workers. ``compute`` returns ``None`` for results that must not be
+        cached; those are recomputed by every caller.
+        """
+        token = uuid.uuid4().hex
+        lock_key = f"{key}:lock"
+        give_up = time.monotonic() + ANALYTICS_CACHE_WAIT
+        interval = POLL_INTERVAL
+        waited = False
+
+        while True:
+            try:
+                cached = redis_client.get(key)
+                if cached is not None:
+                    self._record("waited_hits" if waited else "hits")
+                    return {**json.loads(cached), "cache": "HIT"}
+                acquired = redis_client.set(lock_key, token, nx=True, ex=ANALYTICS_CACHE_LOCK_TTL)
+            except redis.RedisError as e:
+                logger.warning("Analytics cache unavailable, computing directly: %s", e)
+                self._record("bypassed")
+                return {**(compute() or {}), "cache": "BYPASS"}
+
+            if acquired or time.monotonic() + interval >= give_up:
+                break
+            waited = True
+            time.sleep(interval)
+            interval = min(interval * 2, POLL_MAX)
+
+        self._record("misses")
+        try:
+            entry = compute()
+            if entry is not None:
+                try:
+                    redis_client.set(key, json.dumps(entry), ex=self.ttl)
+                except redis.RedisError as e:
+                    logger.warning("Analytics cache write failed: %s", e)
+            return {**(entry or {}), "cache": "MISS"}
+        finally:
+            if acquired:
+                try:
+                    redis_client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+                except redis.RedisError as e:
+                    logger.warning("Analytics cache lock release failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats["hits"] + stats["waited_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["waited_hits"]) / served, 4) if served else 0
+        try:
+            stats["versions"] = self.versions()
+        except redis.RedisError:
+            stats["versions"] = None
+        stats["ttl"] = self.ttl
+        return stats
+
+    # ---------------- Invalidation hooks ----------------
+    @staticmethod
+    def _mark_dirty(mapper, connection, target) -> None:
+        session = Session.object_session(target)
+        if session is not None:
+            session.info.setdefault("analytics_dirty", set()).add(mapper.local_table.name)
+
+    def _after_commit(self, session) -> None:
+        self.bump(session.info.pop("analytics_dirty", ()))
+
+    @staticmethod
+    def _after_rollback(session) -> None:
+        session.info.pop("analytics_dirty", None)
+
+    def register(self) -> None:
+        """Attach the mapper and session listeners (idempotent)."""
+        for model in TRACKED_MODELS:
+            for name in ("after_insert", "after_update", "after_delete"):
+                if not event.contains(model, name, AnalyticsCache._mark_dirty):
+                    event.listen(model, name, AnalyticsCache._mark_dirty)
+        if not event.contains(Session, "after_commit", self._after_commit):
+            event.listen(Session, "after_commit", self._after_commit)
+        if not event.contains(Session, "after_rollback", AnalyticsCache._after_rollback):
+            event.listen(Session, "after_rollback", AnalyticsCache._after_rollback)
+
+
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,208 @@
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, case, inspect, text
+
+from app.extensions import db
+from app.models import AnalyticsDailyRollup, Application, AssessmentResult, Interview
+
+logger = logging.getLogger(__name__)
+
+ASSESSMENT_PASS_MARK = 50  # percentage_score counted as a pass
+
+# Bucket key: (day, requisition_id, application_id, status). requisition_id
+# is resolved from application_id in SQL for rows that only reference the
+# application, so no relationship is loaded during a flush.
+Bucket = Tuple[Any, Optional[int], Optional[int], str]
+
+
+def _application_bucket(values: Dict[str, Any]) -> Bucket:
+    return values["created_at"], values["requisition_id"], None, values["status"] or ""
+
+
+def _assessment_bucket(values: Dict[str, Any]) -> Bucket:
+    passed = (values["percentage_score"] or 0) >= ASSESSMENT_PASS_MARK
+    return values["created_at"], None, values["application_id"], "passed" if passed else "failed"
+
+
+def _interview_bucket(values: Dict[str, Any]) -> Bucket:
+    return values["created_at"], None, values["application_id"], values["status"] or ""
+
+
+# model -> (metric, columns the bucket depends on, bucket function)
+ROLLUP_SOURCES: Dict[type, Tuple[str, Tuple[str, ...], Callable[[Dict[str, Any]], Bucket]]] = {
+    Application: ("applications", ("created_at", "requisition_id", "status"), _application_bucket),
+    AssessmentResult: ("assessments", ("created_at", "application_id", "percentage_score"), _assessment_bucket),
+    Interview: ("interviews", ("created_at", "application_id", "status"), _interview_bucket),
+}
+
+_UPSERT = text("""
+    INSERT INTO analytics_daily_rollups (metric, day, requisition_id, status, count)
+    VALUES (
+        :metric, :day,
+        COALESCE(:requisition_id, (SELECT requisition_id FROM applications WHERE id = :application_id), 0),
+        :status, :delta
+    )
+    ON CONFLICT (metric, day, requisition_id, status)
+    DO UPDATE SET count = analytics_daily_rollups.count + EXCLUDED.count
+""")
+
+# One INSERT ... SELECT per metric; mirrors the bucket functions above.
+_BACKFILL = {
+    "applications": """
+        SELECT created_at::date AS day, COALESCE(requisition_id, 0) AS requisition_id,
+               COALESCE(status, '') AS status, COUNT(*) AS count
+        FROM applications
+        WHERE created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+    """,
+    "assessments": """
+        SELECT ar.created_at::date AS day, COALESCE(a.requisition_id, 0) AS requisition_id,
+               CASE WHEN COALESCE(ar.percentage_score, 0) >= :pass_mark THEN 'passed' ELSE 'failed' END AS status,
+               COUNT(*) AS count
+        FROM assessment_results ar
+        LEFT JOIN applications a ON a.id = ar.application_id
+        WHERE ar.created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+    """,
+    "interviews": """
+        SELECT i.created_at::date AS day, COALESCE(a.requisition_id, 0) AS requisition_id,
+               COALESCE(i.status, '') AS status, COUNT(*) AS count
+        FROM interviews i
+        LEFT JOIN applications a ON a.id = i.application_id
+        WHERE i.created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+    """,
+}
+
+
+class AnalyticsRollupService:
+    """
+    Daily rollups behind the analytics time series.
+
+    Mapper events add +1 to the (day, requisition, status) bucket of every
+    inserted application, assessment result and interview, move the count
+    when a row's bucket changes (status, score, requisition, date) and
+    subtract it on delete. The upserts run on the flushing connection, so
+    they commit or roll back with the change itself. ``backfill`` rebuilds
+    everything from history.
+    """
+
+    # ---------------- Incremental maintenance ----------------
+    @staticmethod
+    def _values(target, columns: Tuple[str, ...], before: bool = False) -> Dict[str, Any]:
+        state = inspect(target)
+        values = {}
+        for column in columns:
+            history = state.attrs[column].history
+            values[column] = history.deleted[0] if before and history.deleted else getattr(target, column)
+        values["created_at"] = (values["created_at"] or datetime.utcnow()).date()
+        return values
+
+    @staticmethod
+    def _apply(connection, metric: str, bucket: Bucket, delta: int) -> None:
+        day, requisition_id, application_id, status = bucket
+        connection.execute(_UPSERT, {
+            "metric": metric,
+            "day": day,
+            "requisition_id": requisition_id,
+            "application_id": application_id,
+            "status": status,
+            "delta": delta,
+        })
+
+    @staticmethod
+    def _after_insert(mapper, connection, target) -> None:
+        metric, columns, bucket = ROLLUP_SOURCES[mapper.class_]
+        AnalyticsRollupService._apply(connection, metric, bucket(AnalyticsRollupService._values(target, columns)), 1)
+
+    @staticmethod
+    def _after_update(mapper, connection, target) -> None:
+        metric, columns, bucket = ROLLUP_SOURCES[mapper.class_]
+        old = bucket(AnalyticsRollupService._values(target, columns, before=True))
+        new = bucket(AnalyticsRollupService._values(target, columns))
+        if old != new:
+            AnalyticsRollupService._apply(connection, metric, old, -1)
+            AnalyticsRollupService._apply(connection, metric, new, 1)
+
+    @staticmethod
+    def _after_delete(mapper, connection, target) -> None:
+        metric, columns, bucket = ROLLUP_SOURCES[mapper.class_]
+        old = bucket(AnalyticsRollupService._values(target, columns, before=True))
+        AnalyticsRollupService._apply(connection, metric, old, -1)
+
+    @staticmethod
+    def _keep_old_value(target, value, oldvalue, initiator) -> None:
+        pass
+
+    @staticmethod
+    def register() -> None:
+        """Attach the mapper listeners (idempotent)."""
+        hooks = (
+            ("after_insert", AnalyticsRollupService._after_insert),
+            ("after_update", AnalyticsRollupService._after_update),
+            ("after_delete", AnalyticsRollupService._after_delete),
+        )
+        for model, (_, columns, _) in ROLLUP_SOURCES.items():
+            for name, handler in hooks:
+                if not event.contains(model, name, handler):
+                    event.listen(model, name, handler)
+            # active_history loads the previous value even when the column
+            # was not loaded before being set, so after_update can see it
+            for column in columns:
+                attribute = getattr(model, column)
+                if not event.contains(attribute, "set", AnalyticsRollupService._keep_old_value):
+                    event.listen(attribute, "set", AnalyticsRollupService._keep_old_value, active_history=True)
+
+    # ---------------- Backfill ----------------
+    @staticmethod
+    def backfill() -> Dict[str, int]:
+        """
+        Rebuild every rollup from the source tables in one transaction.
+        The table lock makes concurrent writers wait, so no increment is
+        lost or counted twice. Returns the number of rollup rows per metric.
+        """
+        written = {}
+        try:
+            db.session.execute(text("LOCK TABLE analytics_daily_rollups IN EXCLUSIVE MODE"))
+            db.session.execute(text("DELETE FROM analytics_daily_rollups"))
+            for metric, select in _BACKFILL.items():
+                result = db.session.execute(
+                    text(
+                        "INSERT INTO analytics_daily_rollups (metric, day, requisition_id, status, count) "
+                        f"SELECT CAST(:metric AS VARCHAR), day, requisition_id, status, count FROM ({select}) AS grouped"
+                    ),
+                    {"metric": metric, "pass_mark": ASSESSMENT_PASS_MARK},
+                )
+                written[metric] = result.rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        logger.info("Analytics rollups rebuilt: %s", written)
+        return written
+
+    # ---------------- Reads ----------------
+    @staticmethod
+    def monthly(metric: str, flag_status: Optional[str] = None) -> List[Any]:
+        """
+        Monthly totals for ``metric`` as rows of (month, total, flagged),
+        ``flagged`` counting the rows whose status is ``flag_status``.
+        """
+        month = func.date_trunc("month", AnalyticsDailyRollup.day)
+        total = func.sum(AnalyticsDailyRollup.count)
+        return (
+            db.session.query(
+                month.label("month"),
+                total.label("total"),
+                func.sum(
+                    case((AnalyticsDailyRollup.status == flag_status, AnalyticsDailyRollup.count), else_=0)
+                ).label("flagged"),
+            )
+            .filter(AnalyticsDailyRollup.metric == metric)
+            .group_by(month)
+            .having(total > 0)
+            .order_by(month)
+            .all()
+        )
@@ -1,54 +1,212 @@
-import re
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-from app.models import Requisition
-from cloudinary.uploader import upload as cloudinary_upload
+import re
+import time
+import logging
+from app.services.ai_cache import cv_analysis_cache
+from app.services.ai_metrics import ai_metrics, ai_operation
+from app.services.ai_service import AIService
+from app.services.model_router import cv_scoring_router
+from app.services.prompt_compactor import PromptCompactor
+from app.services.requisition_profile_service import RequisitionProfileService
 
-load_dotenv()
+ANALYSIS_MODEL = "openrouter/auto"
+# Bump whenever the prompt below changes so cached results are not reused.
+ANALYSIS_PROMPT_VERSION = "hybrid-v4"
+# Answers from the batched prompt (AIService.analyze_cvs_batch) are cached
+# under their own tag so they are never served to single-resume requests.
+ANALYSIS_BATCH_PROMPT_VERSION = "hybrid-batch-v1"
+ANALYSIS_BATCH_SIZE = int(os.environ.get("AI_ANALYSIS_BATCH_SIZE", 5))  # resumes per prompt
+BATCH_OUTPUT_TOKENS_PER_RESUME = 400
 
-# OpenRouter API configuration
-api_key = os.getenv("OPENROUTER_API_KEY")
-openai_client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=api_key,
-    default_headers={"HTTP-Referer": "http://localhost:5000"}  # replace with your frontend URL
-)
+logger = logging.getLogger(__name__)
 
 class HybridResumeAnalyzer:
     @staticmethod
-    def upload_cv(file):
+    def analyse_resume(resume_content, job_id):
         """
-        Upload resume file to Cloudinary and return secure URL.
+        Analyse resume against the requisition's compiled profile.
+        Returns structured data: match_score, missing_skills, suggestions
         """
+        with ai_operation("hybrid.analyse_resume"):
+            # Compiled once per requisition change (Redis, then the DB row)
+            profile = RequisitionProfileService.get(job_id)
+            if not profile:
+                return HybridResumeAnalyzer._job_not_found()
+
+            result = cv_analysis_cache.get_or_compute(
+                HybridResumeAnalyzer._cache_key(resume_content, profile),
+                lambda: HybridResumeAnalyzer._routed_analysis(resume_content, profile),
+                cacheable=HybridResumeAnalyzer._cacheable,
+            )
+            return HybridResumeAnalyzer._with_profile(result, profile)
+
+    @staticmethod
+    def analyse_resumes(resume_contents, job_id, batch_size=ANALYSIS_BATCH_SIZE):
+        """
+        Analyse several resumes for one requisition, ``batch_size`` per
+        prompt. Returns one result per resume, in order, shaped like
+        ``analyse_resume``. Items the batched answer does not cover (or that
+        fail to parse) fall back to a single-resume call.
+        """
+        with ai_operation("hybrid.analyse_resumes"):
+            return HybridResumeAnalyzer._analyse_resumes(resume_contents, job_id, batch_size)
+
+    # ---------------- Helpers ----------------
+    @staticmethod
+    def _analyse_resumes(resume_contents, job_id, batch_size):
+        profile = RequisitionProfileService.get(job_id)
+        if not profile:
+            return [HybridResumeAnalyzer._job_not_found() for _ in resume_contents]
+
+        results = [None] * len(resume_contents)
+        keys = [HybridResumeAnalyzer._cache_key(text, profile) for text in resume_contents]
+        batch_keys = [
+            HybridResumeAnalyzer._cache_key(text, profile, ANALYSIS_BATCH_PROMPT_VERSION) for text in resume_contents
+        ]
+        pending = []
+        for index in range(len(resume_contents)):
+            cached = cv_analysis_cache.get(keys[index])
+            if cached is None:
+                cached = cv_analysis_cache.get(batch_keys[index])
+            if cached is not None:
+                results[index] = cached
+            else:
+                pending.append(index)
+
+        for start in range(0, len(pending), max(1, batch_size)):
+            chunk = pending[start:start + max(1, batch_size)]
+            compacted = [
+                PromptCompactor.compact_cv(resume_contents[i], profile.get("summary_tokens", 0)) for i in chunk
+            ]
+            answers = {}
+            if len(chunk) > 1:
+                answers = HybridResumeAnalyzer._run_batch([text for text, _ in compacted], profile["prompt_prefix"])
+
+            for position, index in enumerate(chunk):
+                text, compaction = compacted[position]
+                result = cv_scoring_router.run(
+                    lambda model: HybridResumeAnalyzer._run_analysis(text, profile["prompt_prefix"], model),
+                    is_valid=HybridResumeAnalyzer._is_valid,
+                    fallback_model=ANALYSIS_MODEL,
+                    first_result=answers.get(position),
+                )
+                from_batch = result is answers.get(position)
+                result["compaction"] = compaction
+                if HybridResumeAnalyzer._cacheable(result):
+                    cv_analysis_cache.set(batch_keys[index] if from_batch else keys[index], result)
+                results[index] = result
+
+        return [HybridResumeAnalyzer._with_profile(result, profile) for result in results]
+
+    @staticmethod
+    def _job_not_found():
+        return {
+            "match_score": 0,
+            "missing_skills": [],
+            "suggestions": [],
+            "raw_text": "Job not found"
+        }
+
+    @staticmethod
+    def _cache_key(resume_content, profile, prompt_version=ANALYSIS_PROMPT_VERSION):
+        return cv_analysis_cache.make_key(
+            cv_text=resume_content,
+            job_description=profile["prompt_prefix"],
+            model=cv_scoring_router.cache_tag(ANALYSIS_MODEL),
+            prompt_version=prompt_version,
+        )
+
+    @staticmethod
+    def _is_valid(result):
+        return bool(re.search(r"match score", result.get("raw_text", ""), re.IGNORECASE))
+
+    @staticmethod
+    def _cacheable(result):
+        return not result["raw_text"].startswith("Error during analysis")
+
+    @staticmethod
+    def _with_profile(result, profile):
+        result = dict(result)
+        result["interview_questions"] = profile.get("interview_questions", [])
+        result["profile_revision"] = profile.get("revision")
+        return result
+
+    @staticmethod
+    def _routed_analysis(resume_content, profile):
+        """
+        Score on the fast model first; escalate to the strong model when the
+        answer is unparseable, borderline or low-confidence.
+        """
+        resume_content, compaction = PromptCompactor.compact_cv(resume_content, profile.get("summary_tokens", 0))
+        job_description = profile["prompt_prefix"]
+        result = cv_scoring_router.run(
+            lambda model: HybridResumeAnalyzer._run_analysis(resume_content, job_description, model),
+            is_valid=HybridResumeAnalyzer._is_valid,
+            fallback_model=ANALYSIS_MODEL,
+        )
+        result["compaction"] = compaction
+        return result
+
+    @staticmethod
+    def _run_batch(resume_contents, job_description):
+        """
+        Score several resumes in one prompt (AIService.analyze_cvs_batch).
+        Returns ``{position: result}`` for the items the model answered in a
+        usable form; anything missing is left for the caller to retry on its own.
+        """
+        model = cv_scoring_router.first_model(ANALYSIS_MODEL)
+        started = time.monotonic()
         try:
-            result = cloudinary_upload(
-                file,
-                resource_type="raw",
-                folder="candidate_cvs"
+            items = AIService(model=model, operation="hybrid.batch").analyze_cvs_batch(
+                resume_contents, job_description, output_tokens_per_cv=BATCH_OUTPUT_TOKENS_PER_RESUME
             )
-            return result.get("secure_url")
         except Exception as e:
-            print("Cloudinary Upload Error:", e)
-            return None
+            logger.warning("Batched resume analysis failed, falling back to single calls: %s", e)
+            ai_metrics.record_parse(False, model)
+            return {}
+        finally:
+            if cv_scoring_router.enabled:
+                cv_scoring_router.record_latency(cv_scoring_router.tiers[0][0], time.monotonic() - started)
+
+        answers = {
+            position: HybridResumeAnalyzer._batch_item(item, item["match_score"], len(resume_contents))
+            for position, item in items.items()
+        }
+        ai_metrics.record_parse(len(answers) == len(resume_contents), model)
+        logger.info("Batched resume analysis answered %d/%d items", len(answers), len(resume_contents))
+        return answers
 
     @staticmethod
-    def analyse_resume(resume_content, job_id):
+    def _batch_item(item, match_score, batch_size):
+        """Shape one element of a batched answer like a single-resume result."""
+        missing_skills = [str(s).strip() for s in item.get("missing_skills") or [] if str(s).strip()]
+        suggestions = [str(s).strip() for s in item.get("suggestions") or [] if str(s).strip()]
+        try:
+            confidence = float(item["confidence"])
+            confidence = confidence / 100 if confidence > 1 else confidence
+        except (KeyError, TypeError, ValueError):
+            confidence = None
+
+        raw_text = "\n".join(
+            [f"Match Score: {match_score}/100"]
+            + ([f"Confidence: {int(round(confidence * 100))}/100"] if confidence is not None else [])
+            + ["Missing Skills:"] + [f"- {s}" for s in missing_skills]
+            + ["Suggestions:"] + [f"- {s}" for s in suggestions]
+        )
+        return {
+            "match_score": match_score,
+            "missing_skills": missing_skills,
+            "suggestions": suggestions,
+            "raw_text": raw_text,
+            "confidence": confidence,
+            "batch_size": batch_size,
+        }
+
+    @staticmethod
+    def _run_analysis(resume_content, job_description, model=ANALYSIS_MODEL):
         """
-        Analyse resume against job description from the Requisition table.
-        Returns structured data: match_score, missing_skills, suggestions
+        Prompt the model and parse its plain-text answer.
         """
-        # Fetch job from DB
-        job = Requisition.query.get(job_id)
-        if not job:
-            return {
-                "match_score": 0,
-                "missing_skills": [],
-                "suggestions": [],
-                "raw_text": "Job not found"
-            }
-
-        job_description = job.description or ""
 
         # Construct prompt
         prompt = f"""
@@ -66,6 +224,7 @@ Task:
 
 Return in format:
 Match Score: XX/100
+Confidence: XX/100
 Missing Skills:
 - skill 1
 - skill 2
@@ -75,28 +234,25 @@ Suggestions:
 """
 
         try:
-            # Call OpenRouter AI
-            response = openai_client.chat.completions.create(
-                model="openrouter/auto",
-                messages=[
-                    {"role": "system", "content": "You are an AI recruitment assistant. Always return results in the requested format."},
-                    {"role": "user", "content": prompt}
-                ],
+            # Call OpenRouter AI through the shared, concurrency-bounded pool
+            text = AIService(model=model)._call_generation(
+                prompt,
                 temperature=0,  # deterministic output
+                max_output_tokens=1024,
+                system_prompt="You are an AI recruitment assistant. Always return results in the requested format.",
                 top_p=0.9,
-                max_tokens=1024
-            )
-
-            text = response.choices[0].message.content or ""
-            
-            # --- DEBUG ---
-            print("AI Output:\n", text)
+            ) or ""
+            logger.debug("Resume analysis output (%s, %d chars): %s", model, len(text), text[:2000])
 
             # --- Parsing ---
             # Match score (flexible)
             score_match = re.search(r"(\d{1,3})\s*(?:/100|%|out of 100)?", text)
             match_score = int(score_match.group(1)) if score_match else 0
 
+            # Model's confidence in the score (0-1), used for tier escalation
+            confidence_match = re.search(r"Confidence:\s*(\d{1,3})", text, re.IGNORECASE)
+            confidence = int(confidence_match.group(1)) / 100 if confidence_match else None
+
             # Missing skills (handle bullets or plain lines)
             missing_skills_match = re.search(r"Missing Skills:\s*(.*?)(?:Suggestions:|$)", text, re.DOTALL | re.IGNORECASE)
             missing_skills = []
@@ -111,12 +267,15 @@ Suggestions:
                 suggestions_text = suggestions_match.group(1)
                 suggestions = [line.strip("•*- ").strip() for line in suggestions_text.strip().splitlines() if line.strip()]
 
-            return {
+            result = {
                 "match_score": match_score,
                 "missing_skills": missing_skills,
                 "suggestions": suggestions,
-                "raw_text": text
+                "raw_text": text,
+                "confidence": confidence
             }
+            ai_metrics.record_parse(HybridResumeAnalyzer._is_valid(result), model)
+            return result
 
         except Exception as e:
             return {
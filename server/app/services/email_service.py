@@ -1,9 +1,14 @@
+import os
 import logging
 from threading import Thread
 from flask import render_template, current_app
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 
+# Emails go out on a background thread, after the request has returned, so they
+# get their own bound instead of the request deadline.
+SENDGRID_TIMEOUT = float(os.environ.get("SENDGRID_TIMEOUT", 10))  # seconds per API call
+
 
 class EmailService:
     """Async SendGrid email service with HTML templates + fallback plain text."""
@@ -121,6 +126,7 @@ class EmailService:
                         raise ValueError("Missing SendGrid API key or sender.")
 
                     sg = SendGridAPIClient(api_key)
+                    sg.client.timeout = SENDGRID_TIMEOUT
                     for recipient in recipients:
                         message = Mail(
                             from_email=sender,
@@ -0,0 +1,218 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import redis
+
+from app.extensions import redis_client
+from app.services.ai_scheduler import INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_RPM = int(os.environ.get("OPENROUTER_RPM", 120))  # requests per minute, all workers
+OPENROUTER_TPM = int(os.environ.get("OPENROUTER_TPM", 200000))  # tokens per minute, all workers
+AI_RATE_LIMIT_MAX_WAIT = float(os.environ.get("AI_RATE_LIMIT_MAX_WAIT", 10))  # seconds; 0 = fail fast
+# Share of both buckets only interactive calls may draw down
+AI_INTERACTIVE_BUDGET_RESERVE = float(os.environ.get("AI_INTERACTIVE_BUDGET_RESERVE", 0.2))
+RATE_LIMIT_POLL_MIN = 0.05  # seconds
+
+# Two token buckets (requests, tokens) refilled continuously at their
+# per-minute rates. Takes from both or neither, and only if at least
+# ``reserve`` of each bucket is left afterwards. Uses the Redis clock so all
+# workers agree on time.
+#
+# KEYS[1] = bucket hash
+# ARGV = rpm, tpm, tokens requested, reserve (fraction of each bucket held back)
+# Returns {granted (0/1), wait_ms, requests_left, tokens_left}
+_ACQUIRE_SCRIPT = """
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'ts')
+local req_left = tonumber(state[1]) or rpm
+local tok_left = tonumber(state[2]) or tpm
+local ts = tonumber(state[3]) or now
+
+local elapsed = math.max(0, now - ts)
+req_left = math.min(rpm, req_left + elapsed * rpm / 60000)
+tok_left = math.min(tpm, tok_left + elapsed * tpm / 60000)
+
+local req_floor = math.min(rpm * reserve, rpm - 1)
+local tok_floor = tpm * reserve
+
+-- A single call larger than the budget it may use can never fit; let it
+-- through once the bucket is full instead of blocking forever.
+local need_tokens = math.min(cost, tpm - tok_floor)
+local granted = 0
+local wait_ms = 0
+if req_left >= 1 + req_floor and tok_left >= need_tokens + tok_floor then
+    req_left = req_left - 1
+    tok_left = tok_left - need_tokens
+    granted = 1
+else
+    local req_wait = 0
+    if req_left < 1 + req_floor then req_wait = (1 + req_floor - req_left) * 60000 / rpm end
+    local tok_wait = 0
+    if tok_left < need_tokens + tok_floor then
+        tok_wait = (need_tokens + tok_floor - tok_left) * 60000 / tpm
+    end
+    wait_ms = math.ceil(math.max(req_wait, tok_wait))
+end
+
+redis.call('HSET', KEYS[1], 'requests', req_left, 'tokens', tok_left, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], 120000)
+return {granted, wait_ms, tostring(req_left), tostring(tok_left)}
+"""
+
+
+class RateLimitExceeded(RuntimeError):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMRateLimiter:
+    """
+    Cluster-wide request and token budget for outbound LLM calls, shared by
+    every worker through Redis. ``acquire`` waits (up to ``max_wait`` or the
+    caller's deadline) for room in both buckets, or raises
+    ``RateLimitExceeded`` straight away when waiting is not allowed. The
+    last ``interactive_reserve`` of each bucket is kept for interactive
+    calls, so batch work cannot spend the budget chat needs. If Redis is
+    unreachable calls are let through.
+    """
+
+    def __init__(
+        self,
+        name: str = "openrouter",
+        rpm: int = OPENROUTER_RPM,
+        tpm: int = OPENROUTER_TPM,
+        max_wait: float = AI_RATE_LIMIT_MAX_WAIT,
+        interactive_reserve: float = AI_INTERACTIVE_BUDGET_RESERVE,
+    ):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.interactive_reserve = max(0.0, min(interactive_reserve, 0.9))
+        self._script = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "granted": 0,
+            "throttled": 0,
+            "rejected": 0,
+            "unavailable": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+        self._utilization = {"requests": 0.0, "tokens": 0.0}
+
+    @property
+    def _bucket_key(self) -> str:
+        return f"ai_ratelimit:{self.name}"
+
+    @property
+    def _usage_key(self) -> str:
+        return f"ai_ratelimit:{self.name}:usage"
+
+    def _record(self, **deltas) -> None:
+        with self._lock:
+            for key, value in deltas.items():
+                if key == "wait_seconds_max":
+                    self._stats[key] = max(self._stats[key], value)
+                else:
+                    self._stats[key] += value
+
+    def _try(self, tokens: int, reserve: float):
+        if self._script is None:
+            self._script = redis_client.register_script(_ACQUIRE_SCRIPT)
+        granted, wait_ms, req_left, tok_left = self._script(
+            keys=[self._bucket_key], args=[self.rpm, self.tpm, max(0, int(tokens)), reserve]
+        )
+        utilization = {
+            "requests": round(1 - float(req_left) / self.rpm, 4),
+            "tokens": round(1 - float(tok_left) / self.tpm, 4),
+        }
+        with self._lock:
+            self._utilization = utilization
+        return bool(int(granted)), int(wait_ms) / 1000, utilization
+
+    def _publish(self, utilization: Dict[str, float]) -> None:
+        redis_client.hset(self._usage_key, mapping={
+            "requests": utilization["requests"],
+            "tokens": utilization["tokens"],
+            "updated_at": time.time(),
+        })
+
+    def acquire(
+        self, tokens: int, deadline: Optional[float] = None, wait: bool = True, priority: Optional[str] = None
+    ) -> float:
+        """
+        Take one request and ``tokens`` tokens from the shared budget.
+        ``deadline`` is a ``time.monotonic()`` value that caps the wait.
+        Calls whose ``priority`` is not interactive leave the reserve alone.
+        Returns the seconds spent waiting.
+        """
+        reserve = 0.0 if priority == INTERACTIVE else self.interactive_reserve
+        started = time.monotonic()
+        give_up = started + (self.max_wait if wait else 0)
+        if deadline is not None:
+            give_up = min(give_up, deadline)
+        throttled = False
+
+        while True:
+            try:
+                granted, retry_after, utilization = self._try(tokens, reserve)
+            except redis.RedisError as e:
+                logger.warning("LLM rate limiter unavailable, letting call through: %s", e)
+                self._record(unavailable=1)
+                return 0.0
+
+            if granted:
+                waited = time.monotonic() - started
+                self._record(granted=1, wait_seconds_total=waited, wait_seconds_max=waited)
+                try:
+                    self._publish(utilization)
+                except redis.RedisError:
+                    pass
+                return waited
+
+            if not throttled:
+                throttled = True
+                self._record(throttled=1)
+            sleep_for = max(RATE_LIMIT_POLL_MIN, retry_after)
+            if time.monotonic() + sleep_for > give_up:
+                self._record(rejected=1)
+                raise RateLimitExceeded(
+                    f"LLM rate limit reached ({self.rpm} req/min, {self.tpm} tokens/min)",
+                    retry_after=retry_after,
+                )
+            time.sleep(sleep_for)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["utilization"] = dict(self._utilization)
+        try:
+            cluster = redis_client.hgetall(self._usage_key)
+            stats["cluster_utilization"] = {
+                key: float(value) for key, value in cluster.items() if key in ("requests", "tokens")
+            }
+        except redis.RedisError:
+            stats["cluster_utilization"] = None
+        stats.update({
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "max_wait": self.max_wait,
+            "interactive_reserve": self.interactive_reserve,
+        })
+        return stats
+
+
+openrouter_limiter = LLMRateLimiter()
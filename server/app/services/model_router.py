@@ -0,0 +1,187 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+AI_MODEL_ROUTING = os.environ.get("AI_MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+AI_FAST_MODEL = os.environ.get("AI_FAST_MODEL", "openai/gpt-4o-mini")
+AI_STRONG_MODEL = os.environ.get("AI_STRONG_MODEL", "openai/gpt-4o")
+SHORTLIST_THRESHOLD = float(os.environ.get("AI_SHORTLIST_THRESHOLD", 60))  # match_score 0-100
+ESCALATION_MARGIN = float(os.environ.get("AI_ESCALATION_MARGIN", 10))  # +/- around the threshold
+MIN_CONFIDENCE = float(os.environ.get("AI_MIN_CONFIDENCE", 0.6))  # 0-1
+LATENCY_SAMPLES = 500  # per tier, for percentiles
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return round(ordered[index], 3)
+
+
+class ModelRouter:
+    """
+    Runs CV scoring on a fast, cheap model first and escalates to a stronger
+    model only when the fast answer cannot be trusted: the output did not
+    parse, the score is within ``margin`` of the shortlist threshold, or the
+    model reported low confidence.
+    """
+
+    def __init__(
+        self,
+        tiers: Optional[List[Tuple[str, str]]] = None,
+        threshold: float = SHORTLIST_THRESHOLD,
+        margin: float = ESCALATION_MARGIN,
+        min_confidence: float = MIN_CONFIDENCE,
+        enabled: bool = AI_MODEL_ROUTING,
+    ):
+        self.tiers = tiers or [("fast", AI_FAST_MODEL), ("strong", AI_STRONG_MODEL)]
+        self.threshold = threshold
+        self.margin = margin
+        self.min_confidence = min_confidence
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._latency = {name: deque(maxlen=LATENCY_SAMPLES) for name, _ in self.tiers}
+        self._calls = {name: 0 for name, _ in self.tiers}
+        self._escalations: Dict[str, int] = {}
+        self._routed = 0
+
+    def cache_tag(self, fallback_model: str) -> str:
+        """Model identifier for cache keys; changes whenever the tiers do."""
+        if not self.enabled:
+            return fallback_model
+        return "routed:" + ">".join(model for _, model in self.tiers)
+
+    def escalation_reason(self, result: Dict[str, Any], is_valid: Callable[[Dict[str, Any]], bool]) -> Optional[str]:
+        if not is_valid(result):
+            return "parse_failure"
+        try:
+            score = float(result.get("match_score", 0))
+        except (TypeError, ValueError):
+            return "parse_failure"
+        if abs(score - self.threshold) <= self.margin:
+            return "near_threshold"
+        confidence = result.get("confidence")
+        try:
+            if confidence is not None and float(confidence) < self.min_confidence:
+                return "low_confidence"
+        except (TypeError, ValueError):
+            return "low_confidence"
+        return None
+
+    def first_model(self, fallback_model: str) -> str:
+        """Model that answers first (e.g. for batched prompts)."""
+        return self.tiers[0][1] if self.enabled else fallback_model
+
+    def run(
+        self,
+        attempt: Callable[[str], Dict[str, Any]],
+        is_valid: Callable[[Dict[str, Any]], bool],
+        fallback_model: str,
+        first_result: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call ``attempt(model)`` tier by tier until a result needs no
+        escalation (or the last tier answered). Adds a ``routing`` entry to
+        the returned result. ``first_result`` is an answer the first tier
+        already gave (from a batched prompt); it is checked instead of
+        calling the first tier again.
+        """
+        if not self.enabled:
+            if first_result is not None and is_valid(first_result):
+                return first_result
+            return attempt(fallback_model)
+
+        escalated_from = reason = None
+        result: Dict[str, Any] = {}
+        for index, (tier, model) in enumerate(self.tiers):
+            last = index == len(self.tiers) - 1
+            if index == 0 and first_result is not None:
+                result = first_result
+                next_reason = None if last else self.escalation_reason(result, is_valid)
+            else:
+                result, next_reason = self._attempt_tier(attempt, is_valid, tier, model, last)
+
+            if next_reason is None:
+                result["routing"] = {
+                    "tier": tier,
+                    "model": model,
+                    "escalated_from": escalated_from,
+                    "reason": reason,
+                }
+                self._record_outcome(reason)
+                return result
+
+            escalated_from, reason = tier, next_reason
+            logger.info("Escalating CV scoring from %s: %s", tier, reason)
+
+        return result
+
+    def _attempt_tier(
+        self,
+        attempt: Callable[[str], Dict[str, Any]],
+        is_valid: Callable[[Dict[str, Any]], bool],
+        tier: str,
+        model: str,
+        last: bool,
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Run one tier; returns (result, escalation reason or None)."""
+        started = time.monotonic()
+        try:
+            result = attempt(model)
+        except Exception as e:
+            if last:
+                raise
+            logger.warning("Tier %s (%s) failed, escalating: %s", tier, model, e)
+            return {}, "error"
+        finally:
+            self.record_latency(tier, time.monotonic() - started)
+        return result, None if last else self.escalation_reason(result, is_valid)
+
+    # ---------------- Metrics ----------------
+    def record_latency(self, tier: str, seconds: float) -> None:
+        with self._lock:
+            self._calls[tier] += 1
+            self._latency[tier].append(seconds)
+
+    def _record_outcome(self, reason: Optional[str]) -> None:
+        with self._lock:
+            self._routed += 1
+            if reason:
+                self._escalations[reason] = self._escalations.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {
+                name: {
+                    "model": model,
+                    "calls": self._calls[name],
+                    "latency_p50": _percentile(list(self._latency[name]), 50),
+                    "latency_p95": _percentile(list(self._latency[name]), 95),
+                }
+                for name, model in self.tiers
+            }
+            escalations = dict(self._escalations)
+            routed = self._routed
+
+        escalated = sum(escalations.values())
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "margin": self.margin,
+            "min_confidence": self.min_confidence,
+            "routed": routed,
+            "escalated": escalated,
+            "escalation_rate": round(escalated / routed, 4) if routed else 0,
+            "escalations_by_reason": escalations,
+            "tiers": tiers,
+        }
+
+
+# Shared by AIService.analyze_cv_vs_job and HybridResumeAnalyzer.analyse_resume
+cv_scoring_router = ModelRouter()
@@ -1,10 +1,12 @@
-from pdfminer.high_level import extract_text
 import os
 
+from app.services.text_extraction_service import TextExtractionService
+
+
 class PDFService:
     @staticmethod
     def extract_text_from_pdf(file_path: str) -> str:
         if not os.path.exists(file_path):
             raise FileNotFoundError("PDF file not found")
-        text = extract_text(file_path)
+        text = TextExtractionService.extract_file(file_path, kind="pdf")
         return text.strip()
@@ -0,0 +1,161 @@
+import os
+import re
+import math
+import logging
+from collections import Counter
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRESCREEN_TOP_K = int(os.environ.get("PRESCREEN_TOP_K", 50))
+PRESCREEN_THRESHOLD = float(os.environ.get("PRESCREEN_THRESHOLD", 35))  # 0-100
+PRESCREEN_SKILL_WEIGHT = float(os.environ.get("PRESCREEN_SKILL_WEIGHT", 0.5))
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our the their this
+to we will with you your who what which work working years year experience ability
+""".split())
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    tokens = (t.rstrip(".") for t in TOKEN_RE.findall((text or "").lower()))
+    return [t for t in tokens if t and t not in STOPWORDS]
+
+
+def requisition_document(job) -> str:
+    """Flatten the parts of a requisition that describe the candidate we want."""
+    parts = [job.title or "", job.description or "", job.job_summary or ""]
+    for field in (job.required_skills, job.qualifications, job.responsibilities):
+        if isinstance(field, list):
+            parts.extend(str(item) for item in field)
+    return "\n".join(parts)
+
+
+def normalize_skills(skills: Sequence) -> List[str]:
+    normalized = []
+    for skill in skills or []:
+        name = skill.get("name") if isinstance(skill, dict) else skill
+        phrase = " ".join(tokenize(str(name or "")))
+        if phrase and phrase not in normalized:
+            normalized.append(phrase)
+    return normalized
+
+
+class PrescreenService:
+    """
+    Local, vectorized CV-to-requisition scoring used to decide which
+    applications are worth an LLM call.
+
+    Scores combine TF-IDF cosine similarity with the fraction of required
+    skills found in the CV, both computed for the whole pool at once.
+    """
+
+    @staticmethod
+    def score(
+        job_text: str,
+        required_skills: Sequence,
+        cv_texts: Sequence[str],
+        skill_weight: float = PRESCREEN_SKILL_WEIGHT,
+    ) -> Tuple[np.ndarray, List[List[str]]]:
+        """
+        Return (scores 0-100, missing skills per CV) for ``cv_texts`` against
+        one requisition.
+        """
+        n = len(cv_texts)
+        if n == 0:
+            return np.zeros(0), []
+
+        cv_counts = [Counter(tokenize(text)) for text in cv_texts]
+        job_counts = Counter(tokenize(job_text))
+        vocab = {term: i for i, term in enumerate(job_counts)}
+
+        # Document frequency over the pool plus the job itself (smoothed idf)
+        df = Counter()
+        for counts in cv_counts:
+            df.update(counts.keys())
+        df.update(job_counts.keys())
+        docs = n + 1
+
+        def idf(term: str) -> float:
+            return math.log((1 + docs) / (1 + df[term])) + 1
+
+        # Only job terms contribute to the dot product, so the matrix is
+        # N x |job vocabulary|; full CV norms are computed separately.
+        job_vec = np.zeros(len(vocab))
+        for term, i in vocab.items():
+            job_vec[i] = job_counts[term] * idf(term)
+
+        matrix = np.zeros((n, len(vocab)))
+        cv_norms = np.zeros(n)
+        for row, counts in enumerate(cv_counts):
+            sq = 0.0
+            for term, tf in counts.items():
+                weight = tf * idf(term)
+                sq += weight * weight
+                col = vocab.get(term)
+                if col is not None:
+                    matrix[row, col] = weight
+            cv_norms[row] = math.sqrt(sq)
+
+        job_norm = np.linalg.norm(job_vec)
+        denom = cv_norms * job_norm
+        similarity = np.divide(matrix @ job_vec, denom, out=np.zeros(n), where=denom > 0)
+
+        skills = normalize_skills(required_skills)
+        missing: List[List[str]] = [[] for _ in range(n)]
+        if skills:
+            padded = [f" {' '.join(tokenize(text))} " for text in cv_texts]
+            presence = np.array(
+                [[f" {skill} " in doc for skill in skills] for doc in padded], dtype=float
+            )
+            overlap = presence.mean(axis=1)
+            scores = (1 - skill_weight) * similarity + skill_weight * overlap
+            for row, col in zip(*np.nonzero(presence == 0)):
+                missing[row].append(skills[col])
+        else:
+            scores = similarity
+
+        return np.round(np.clip(scores, 0, 1) * 100, 2), missing
+
+    @staticmethod
+    def select_for_llm(
+        scores: np.ndarray,
+        top_k: int = PRESCREEN_TOP_K,
+        threshold: float = PRESCREEN_THRESHOLD,
+    ) -> np.ndarray:
+        """Boolean mask of rows in the top ``top_k`` or scoring at least ``threshold``."""
+        selected = scores >= threshold
+        if top_k > 0 and len(scores):
+            top = np.argsort(-scores, kind="stable")[:top_k]
+            selected[top] = True
+        return selected
+
+    @staticmethod
+    def rank_requisition(job, rows: Sequence[Tuple[int, str]], **kwargs) -> List[Dict[str, Any]]:
+        """
+        Score ``(application_id, cv_text)`` rows for ``job`` and return them
+        ranked, each flagged with whether it should go to the LLM.
+        """
+        top_k = kwargs.pop("top_k", PRESCREEN_TOP_K)
+        threshold = kwargs.pop("threshold", PRESCREEN_THRESHOLD)
+
+        ids = [row[0] for row in rows]
+        scores, missing = PrescreenService.score(
+            requisition_document(job), job.required_skills or [], [row[1] or "" for row in rows], **kwargs
+        )
+        selected = PrescreenService.select_for_llm(scores, top_k=top_k, threshold=threshold)
+
+        ranked = [
+            {
+                "application_id": app_id,
+                "prescreen_score": float(score),
+                "missing_skills": skills,
+                "send_to_llm": bool(flag),
+            }
+            for app_id, score, skills, flag in zip(ids, scores, missing, selected)
+        ]
+        ranked.sort(key=lambda r: r["prescreen_score"], reverse=True)
+        return ranked
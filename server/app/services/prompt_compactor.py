@@ -0,0 +1,205 @@
+import os
+import re
+import math
+import logging
+import textwrap
+from collections import Counter
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+CV_TOKEN_BUDGET = int(os.environ.get("AI_CV_TOKEN_BUDGET", 1500))
+JOB_TOKEN_BUDGET = int(os.environ.get("AI_JOB_TOKEN_BUDGET", 700))
+CHARS_PER_TOKEN = 4  # rough average for English text with GPT-style tokenizers
+MAX_LINE_CHARS = 300
+
+# Section headings commonly found in CVs, in the order they are kept when the
+# budget is tight (earlier = more important for matching against a job).
+SECTION_PRIORITY = [
+    "skills",
+    "experience",
+    "summary",
+    "education",
+    "certifications",
+    "projects",
+    "languages",
+    "other",
+    "interests",
+    "references",
+]
+SECTION_ALIASES = {
+    "skills": ["skills", "technical skills", "core competencies", "competencies", "key skills"],
+    "experience": ["experience", "work experience", "professional experience", "employment history",
+                   "work history", "employment"],
+    "summary": ["summary", "profile", "professional summary", "about me", "objective", "career objective"],
+    "education": ["education", "qualifications", "academic background"],
+    "certifications": ["certifications", "certificates", "licenses"],
+    "projects": ["projects", "key projects"],
+    "languages": ["languages"],
+    "interests": ["interests", "hobbies", "hobbies and interests"],
+    "references": ["references", "referees"],
+}
+# Sections that are plain lists, where a repeated short line adds nothing
+LIST_SECTIONS = {"skills", "languages", "certifications", "interests"}
+_HEADING_LOOKUP = {alias: name for name, aliases in SECTION_ALIASES.items() for alias in aliases}
+_PAGE_MARKER_RE = re.compile(r"^(page\s*)?\d+(\s*(of|/)\s*\d+)?$", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^[-*\u2022\u00b7\u2013\u25aa\u25cf\u25e6]")
+LONG_LINE_CHARS = 80
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+class PromptCompactor:
+    """
+    Shrinks CV and job-description text before it is put into a prompt:
+    whitespace is normalized, page headers/footers, page numbers and
+    copy-pasted long lines are dropped, short repeats are dropped inside
+    list sections only (the same bullet under two jobs is kept), and the
+    text is trimmed to a token budget, keeping the sections that matter
+    most for matching.
+    """
+
+    @staticmethod
+    def _clean_lines(text: str) -> List[str]:
+        lines = []
+        for raw in (text or "").splitlines():
+            line = re.sub(r"[ \t\u00a0]+", " ", raw).strip()
+            # Very long lines (text extracted without line breaks) are wrapped
+            # so the budget trimmer can cut them at a reasonable granularity.
+            lines.extend(textwrap.wrap(line, MAX_LINE_CHARS) if len(line) > MAX_LINE_CHARS else [line])
+        counts = Counter(line.lower() for line in lines if line)
+
+        cleaned, seen = [], set()
+        for line in lines:
+            if not line:
+                if cleaned and cleaned[-1]:
+                    cleaned.append("")
+                continue
+            key = line.lower()
+            if _PAGE_MARKER_RE.match(line):
+                continue
+            # Non-bullet lines seen on three or more pages are headers/footers;
+            # long lines seen before are pasted twice. Short repeats can carry
+            # context (the same bullet under two jobs) and are kept here.
+            if key in seen and (
+                (counts[key] > 2 and not _BULLET_RE.match(line)) or len(line) >= LONG_LINE_CHARS
+            ):
+                continue
+            seen.add(key)
+            cleaned.append(line)
+        while cleaned and not cleaned[-1]:
+            cleaned.pop()
+        return cleaned
+
+    @staticmethod
+    def _split_sections(lines: List[str]) -> List[Tuple[str, List[str]]]:
+        sections: List[Tuple[str, List[str]]] = [("summary", [])]
+        for line in lines:
+            heading = _HEADING_LOOKUP.get(line.lower().rstrip(":").strip())
+            if heading and len(line) < 40:
+                sections.append((heading, [line]))
+            else:
+                sections[-1][1].append(line)
+        return [(name, body) for name, body in sections if any(body)]
+
+    @staticmethod
+    def _dedupe_lists(sections: List[Tuple[str, List[str]]]) -> List[Tuple[str, List[str]]]:
+        """Drop repeated lines within each list section (e.g. "Python" twice under Skills)."""
+        deduped = []
+        for name, body in sections:
+            if name in LIST_SECTIONS:
+                seen = set()
+                kept = []
+                for line in body:
+                    key = line.lower()
+                    if line and key in seen:
+                        continue
+                    seen.add(key)
+                    kept.append(line)
+                body = kept
+            deduped.append((name, body))
+        return deduped
+
+    @staticmethod
+    def _trim(sections: List[Tuple[str, List[str]]], budget: int) -> List[Tuple[str, List[str]]]:
+        """
+        Fill ``budget`` tokens by section priority; output keeps the original
+        order. A first pass caps each section at 60% of the budget so one long
+        work history cannot crowd out everything else; a second pass hands the
+        leftover budget back in priority order.
+        """
+        remaining = budget * CHARS_PER_TOKEN
+        section_cap = int(remaining * 0.6)
+        kept = [[] for _ in sections]
+
+        def rank(index: int) -> int:
+            name = sections[index][0]
+            return SECTION_PRIORITY.index(name) if name in SECTION_PRIORITY else len(SECTION_PRIORITY)
+
+        order = sorted(range(len(sections)), key=rank)
+        for cap in (section_cap, None):
+            for index in order:
+                used = sum(len(line) + 1 for line in kept[index])
+                for line in sections[index][1][len(kept[index]):]:
+                    cost = len(line) + 1
+                    if cost > remaining or (cap is not None and used + cost > cap):
+                        break
+                    kept[index].append(line)
+                    remaining -= cost
+                    used += cost
+
+        return [(sections[i][0], kept[i]) for i in range(len(sections)) if kept[i]]
+
+    @staticmethod
+    def compact(text: str, budget: int, sectioned: bool = True) -> Dict[str, Any]:
+        """
+        Return ``{"text", "original_tokens", "tokens", "removed_tokens"}``
+        for ``text`` trimmed to roughly ``budget`` tokens.
+        """
+        original_tokens = estimate_tokens(text)
+        lines = PromptCompactor._clean_lines(text)
+        if sectioned:
+            sections = PromptCompactor._dedupe_lists(PromptCompactor._split_sections(lines))
+            lines = [line for _, body in sections for line in body]
+        else:
+            sections = [("other", lines)]
+        if estimate_tokens("\n".join(lines)) > budget:
+            sections = PromptCompactor._trim(sections, budget)
+
+        compacted = "\n".join(line for _, body in sections for line in body).strip()
+        tokens = estimate_tokens(compacted)
+        return {
+            "text": compacted,
+            "original_tokens": original_tokens,
+            "tokens": tokens,
+            "removed_tokens": max(0, original_tokens - tokens),
+        }
+
+    @staticmethod
+    def compact_pair(cv_text: str, job_description: str) -> Tuple[str, str, Dict[str, int]]:
+        """Compact a CV and job description for one prompt and report the savings."""
+        cv = PromptCompactor.compact(cv_text, CV_TOKEN_BUDGET)
+        job = PromptCompactor.compact(job_description, JOB_TOKEN_BUDGET, sectioned=False)
+        stats = {
+            "cv_tokens": cv["tokens"],
+            "job_tokens": job["tokens"],
+            "removed_tokens": cv["removed_tokens"] + job["removed_tokens"],
+        }
+        logger.info(
+            "Compacted prompt inputs: CV %d->%d tokens, job %d->%d tokens",
+            cv["original_tokens"], cv["tokens"], job["original_tokens"], job["tokens"],
+        )
+        return cv["text"], job["text"], stats
+
+    @staticmethod
+    def compact_cv(cv_text: str, job_tokens: int = 0) -> Tuple[str, Dict[str, int]]:
+        """Compact only the CV, for prompts whose job side was compiled ahead of time."""
+        cv = PromptCompactor.compact(cv_text, CV_TOKEN_BUDGET)
+        stats = {
+            "cv_tokens": cv["tokens"],
+            "job_tokens": job_tokens,
+            "removed_tokens": cv["removed_tokens"],
+        }
+        return cv["text"], stats
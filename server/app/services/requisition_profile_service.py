@@ -0,0 +1,225 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+import redis
+from flask import current_app
+
+from app.extensions import db, redis_client
+from app.models import Requisition
+from app.services.ai_metrics import ai_metrics, ai_operation
+from app.services.ai_scheduler import BATCH
+from app.services.ai_service import AIService
+from app.services.prescreen_service import requisition_document, normalize_skills
+from app.services.prompt_compactor import PromptCompactor, JOB_TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# Bump when the compiled profile layout or prompt prefix changes; stored
+# profiles with an older version are recompiled on next use.
+PROFILE_VERSION = 1
+PROFILE_CACHE_TTL = int(os.environ.get("REQ_PROFILE_CACHE_TTL", 24 * 3600))  # seconds
+PROFILE_QUESTION_COUNT = 8
+QUESTIONS_PROMPT_VERSION = "req-questions-v1"
+
+
+class RequisitionProfileService:
+    """
+    Compiles the job side of CV analysis once per requisition change instead
+    of once per applicant: normalized required skills, a compact summary
+    within the job token budget, the prompt prefix built from it, and
+    interview questions. The profile is stored on ``Requisition.profile`` and
+    mirrored to Redis so analyses do not need to decode and recompile it.
+    """
+
+    @staticmethod
+    def _cache_key(job_id: int) -> str:
+        return f"req_profile:{job_id}"
+
+    @staticmethod
+    def source_fingerprint(job: Requisition) -> str:
+        """Hash of every field the profile is compiled from."""
+        source = {
+            "title": job.title,
+            "description": job.description,
+            "job_summary": job.job_summary,
+            "required_skills": job.required_skills,
+            "qualifications": job.qualifications,
+            "responsibilities": job.responsibilities,
+            "min_experience": job.min_experience,
+        }
+        return hashlib.sha256(json.dumps(source, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_current(job: Requisition, profile: Optional[Dict[str, Any]]) -> bool:
+        return bool(
+            profile
+            and profile.get("version") == PROFILE_VERSION
+            and profile.get("fingerprint") == RequisitionProfileService.source_fingerprint(job)
+        )
+
+    @staticmethod
+    def _template_questions(skills: List[str], title: str) -> List[str]:
+        questions = [
+            f"Describe a project where you used {skill} and the outcome you delivered."
+            for skill in skills[:PROFILE_QUESTION_COUNT - 2]
+        ]
+        questions.append(f"What interests you about the {title} role?")
+        questions.append("Tell us about a challenging problem you solved recently and how you approached it.")
+        return questions
+
+    @staticmethod
+    def _prompt_prefix(job: Requisition, skills: List[str], summary: str) -> str:
+        lines = [f"Job Title: {job.title}"]
+        if skills:
+            lines.append(f"Required Skills: {', '.join(skills)}")
+        if job.min_experience:
+            lines.append(f"Minimum Experience: {job.min_experience:g} years")
+        lines.append("")
+        lines.append(summary)
+        return "\n".join(lines).strip()
+
+    # ---------------- Compile ----------------
+    @staticmethod
+    def compile(job: Requisition) -> Dict[str, Any]:
+        """
+        Build a fresh profile for ``job`` and assign it to ``job.profile``.
+        The caller commits. Questions start from templates and are replaced by
+        model-written ones in the background (see ``refresh_questions_async``).
+        """
+        skills = normalize_skills(job.required_skills or [])
+        compacted = PromptCompactor.compact(requisition_document(job), JOB_TOKEN_BUDGET, sectioned=False)
+        previous = job.profile or {}
+
+        profile = {
+            "version": PROFILE_VERSION,
+            "revision": int(previous.get("revision", 0)) + 1,
+            "fingerprint": RequisitionProfileService.source_fingerprint(job),
+            "compiled_at": datetime.utcnow().isoformat(),
+            "skills": skills,
+            "summary": compacted["text"],
+            "summary_tokens": compacted["tokens"],
+            "prompt_prefix": RequisitionProfileService._prompt_prefix(job, skills, compacted["text"]),
+            "interview_questions": RequisitionProfileService._template_questions(skills, job.title or "this"),
+            "questions_source": "template",
+        }
+        job.profile = profile
+        return profile
+
+    @staticmethod
+    def publish(job_id: int, profile: Dict[str, Any]) -> None:
+        """Mirror a committed profile to Redis."""
+        try:
+            redis_client.set(
+                RequisitionProfileService._cache_key(job_id), json.dumps(profile), ex=PROFILE_CACHE_TTL
+            )
+        except redis.RedisError as e:
+            logger.warning("Requisition profile cache write failed: %s", e)
+
+    @staticmethod
+    def _persist(job_id: int, profile: Dict[str, Any]) -> None:
+        """
+        Store ``profile`` in its own transaction so compiling on read never
+        commits (or is rolled back with) the caller's unit of work.
+        """
+        with db.engine.begin() as conn:
+            conn.execute(
+                Requisition.__table__.update()
+                .where(Requisition.__table__.c.id == job_id)
+                .values(profile=profile)
+            )
+
+    @staticmethod
+    def get(job_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Return the compiled profile for ``job_id`` (Redis first, then the
+        requisition row), recompiling it when missing or outdated. A cached
+        profile is only used while its fingerprint matches the live row.
+        """
+        job = Requisition.query.get(job_id)
+        if not job:
+            return None
+
+        try:
+            cached = redis_client.get(RequisitionProfileService._cache_key(job_id))
+            if cached:
+                profile = json.loads(cached)
+                if RequisitionProfileService.is_current(job, profile):
+                    return profile
+        except (redis.RedisError, ValueError) as e:
+            logger.warning("Requisition profile cache read failed: %s", e)
+
+        profile = job.profile
+        if not RequisitionProfileService.is_current(job, profile):
+            profile = RequisitionProfileService.compile(job)
+            RequisitionProfileService._persist(job_id, profile)
+        RequisitionProfileService.publish(job_id, profile)
+        return profile
+
+    # ---------------- Interview Questions ----------------
+    @staticmethod
+    def _generate_questions(profile: Dict[str, Any]) -> List[str]:
+        prompt = f"""
+{profile["prompt_prefix"]}
+
+Task:
+Write {PROFILE_QUESTION_COUNT} interview questions for candidates applying to the job above.
+Cover the required skills and the main responsibilities.
+
+Return the response strictly as a JSON array of strings.
+"""
+        with ai_operation("profile.questions"):
+            out = AIService(priority=BATCH)._call_generation(prompt, temperature=0.2, max_output_tokens=600)
+            start, end = out.find("["), out.rfind("]")
+            try:
+                questions = json.loads(out[start:end + 1]) if start != -1 and end > start else []
+            except ValueError:
+                ai_metrics.record_parse(False)
+                raise
+            ai_metrics.record_parse(isinstance(questions, list) and bool(questions))
+        return [str(q).strip() for q in questions if str(q).strip()][:PROFILE_QUESTION_COUNT]
+
+    @staticmethod
+    def refresh_questions(job_id: int, revision: int) -> None:
+        """Replace template questions with model-written ones if the profile is unchanged."""
+        job = Requisition.query.get(job_id)
+        if not job or not job.profile or job.profile.get("revision") != revision:
+            return
+        try:
+            questions = RequisitionProfileService._generate_questions(job.profile)
+        except Exception as e:
+            logger.warning("Interview question generation failed for job %s: %s", job_id, e)
+            return
+        if not questions:
+            return
+
+        db.session.refresh(job)
+        if not job.profile or job.profile.get("revision") != revision:
+            return
+        # Reassign so the JSON column is flagged as modified
+        job.profile = {
+            **job.profile,
+            "interview_questions": questions,
+            "questions_source": QUESTIONS_PROMPT_VERSION,
+        }
+        db.session.commit()
+        RequisitionProfileService.publish(job_id, job.profile)
+
+    @staticmethod
+    def refresh_questions_async(job_id: int, revision: int) -> None:
+        app = current_app._get_current_object()
+
+        def target():
+            with app.app_context():
+                try:
+                    RequisitionProfileService.refresh_questions(job_id, revision)
+                except Exception:
+                    logger.exception("Profile question refresh failed for job %s", job_id)
+                finally:
+                    db.session.remove()
+
+        threading.Thread(target=target, name=f"req-profile-{job_id}", daemon=True).start()
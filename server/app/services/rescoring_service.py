@@ -0,0 +1,304 @@
+import os
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple
+
+import requests
+from flask import current_app
+
+from app.extensions import db, redis_client
+from app.models import Application, Candidate, Requisition
+from app.services.ai_scheduler import ai_priority, BATCH
+from app.services.analytics_cache import analytics_cache
+from app.services.cv_parser_service import HybridResumeAnalyzer, ANALYSIS_BATCH_SIZE
+from app.services.text_extraction_service import TextExtractionService
+from app.services.prescreen_service import PrescreenService, PRESCREEN_TOP_K, PRESCREEN_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+RESCORE_CONCURRENCY = int(os.environ.get("RESCORE_CONCURRENCY", 4))
+RESCORE_BATCH_SIZE = int(os.environ.get("RESCORE_BATCH_SIZE", 25))
+RESCORE_LOCK_TTL = 15 * 60  # seconds, refreshed after every batch
+RESUME_DOWNLOAD_TIMEOUT = 30  # seconds
+
+# Delete / extend the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_REFRESH_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RescoringInProgress(Exception):
+    pass
+
+
+class RescoringService:
+    """
+    Re-score every application of a requisition with HybridResumeAnalyzer.
+
+    Applications are analysed in prompt batches of ``ANALYSIS_BATCH_SIZE``
+    fanned out over a bounded thread pool. Completed application ids are
+    checkpointed in Redis after each bulk write, so an interrupted run picks up
+    where it stopped unless ``restart`` is requested.
+    """
+
+    # ---------------- Keys ----------------
+    @staticmethod
+    def _status_key(job_id: int) -> str:
+        return f"rescore:{job_id}"
+
+    @staticmethod
+    def _done_key(job_id: int) -> str:
+        return f"rescore:{job_id}:done"
+
+    @staticmethod
+    def _lock_key(job_id: int) -> str:
+        return f"rescore:{job_id}:lock"
+
+    @staticmethod
+    def _update(job_id: int, **fields) -> None:
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        redis_client.hset(RescoringService._status_key(job_id), mapping={
+            k: "" if v is None else str(v) for k, v in fields.items()
+        })
+
+    @staticmethod
+    def get_status(job_id: int) -> Dict[str, Any]:
+        status = redis_client.hgetall(RescoringService._status_key(job_id))
+        if not status:
+            return {"job_id": job_id, "status": "idle"}
+        for field in ("total", "done", "failed", "skipped", "prescreened", "concurrency"):
+            if field in status:
+                status[field] = int(status[field] or 0)
+        status["job_id"] = job_id
+        return status
+
+    @staticmethod
+    def is_running(job_id: int) -> bool:
+        return bool(redis_client.exists(RescoringService._lock_key(job_id)))
+
+    # ---------------- Helpers ----------------
+    @staticmethod
+    def _pending_applications(job_id: int, restart: bool) -> Tuple[List[Tuple[int, str, str]], int]:
+        """Return (application_id, cv_text, resume_url) rows still to score, plus the total."""
+        rows = (
+            db.session.query(Application.id, Candidate.cv_text, Application.resume_url)
+            .join(Candidate, Candidate.id == Application.candidate_id)
+            .filter(Application.requisition_id == job_id, Application.is_draft.isnot(True))
+            .order_by(Application.id)
+            .all()
+        )
+        done = set() if restart else {int(i) for i in redis_client.smembers(RescoringService._done_key(job_id))}
+        return [r for r in rows if r.id not in done], len(rows)
+
+    @staticmethod
+    def _resume_text(cv_text: Optional[str], resume_url: Optional[str]) -> str:
+        if cv_text:
+            return cv_text
+        if not resume_url:
+            return ""
+        resp = requests.get(resume_url, timeout=RESUME_DOWNLOAD_TIMEOUT)
+        resp.raise_for_status()
+        return TextExtractionService.extract(resp.content, resume_url.split("?")[0])
+
+    @staticmethod
+    def _score_batch(app, job_id: int, rows: List) -> List[Dict[str, Any]]:
+        """
+        Score a group of applications with one batched analysis call. Each
+        outcome is a result row, ``{"id", "skipped": True}`` or
+        ``{"id", "error"}``.
+        """
+        with app.app_context(), ai_priority(BATCH):
+            try:
+                outcomes, texts, scored = [], [], []
+                for row in rows:
+                    try:
+                        text = RescoringService._resume_text(row.cv_text, row.resume_url)
+                    except Exception as e:
+                        outcomes.append({"id": row.id, "error": str(e)})
+                        continue
+                    if not text:
+                        outcomes.append({"id": row.id, "skipped": True})
+                        continue
+                    texts.append(text)
+                    scored.append(row.id)
+
+                results = HybridResumeAnalyzer.analyse_resumes(texts, job_id) if texts else []
+                for application_id, result in zip(scored, results):
+                    if result.get("raw_text", "").startswith("Error during analysis"):
+                        # Keep the previous score rather than overwriting it with the fallback 0
+                        outcomes.append({"id": application_id, "error": result["raw_text"]})
+                        continue
+                    outcomes.append({
+                        "id": application_id,
+                        "cv_score": result.get("match_score", 0),
+                        "cv_parser_result": result,
+                        "recommendation": result.get("recommendation", ""),
+                    })
+                return outcomes
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def _flush(job_id: int, rows: List[Dict[str, Any]], checkpoint: bool = True) -> None:
+        """
+        Write one batch of results with a single UPDATE round and, unless
+        ``checkpoint`` is false, mark the ids done so a resumed run skips them.
+        """
+        if not rows:
+            return
+        db.session.bulk_update_mappings(Application, rows)
+        db.session.commit()
+        # Bulk updates skip the mapper events that invalidate analytics responses
+        analytics_cache.bump([Application.__tablename__])
+        if checkpoint:
+            redis_client.sadd(RescoringService._done_key(job_id), *[r["id"] for r in rows])
+
+    @staticmethod
+    def _refresh_lock(job_id: int, token: str) -> None:
+        redis_client.eval(_REFRESH_SCRIPT, 1, RescoringService._lock_key(job_id), token, RESCORE_LOCK_TTL)
+
+    @staticmethod
+    def _prescreen(job_id: int, pending: List, top_k: int, threshold: float) -> Tuple[List, List[Dict[str, Any]]]:
+        """
+        Split ``pending`` into rows that still need the LLM and result rows
+        for applications scored locally. Local rows only set
+        ``prescreen_score``; the LLM ``cv_score`` and parser result are left
+        as they are. Applications without stored CV text cannot be
+        pre-screened and always go to the LLM.
+        """
+        job = Requisition.query.get(job_id)
+        with_text = [row for row in pending if row.cv_text]
+        if not job or not with_text:
+            return pending, []
+
+        ranked = PrescreenService.rank_requisition(
+            job, [(row.id, row.cv_text) for row in with_text], top_k=top_k, threshold=threshold
+        )
+        to_llm = {r["application_id"] for r in ranked if r["send_to_llm"]}
+        local_rows = [
+            {"id": r["application_id"], "prescreen_score": r["prescreen_score"]}
+            for r in ranked if not r["send_to_llm"]
+        ]
+        return [row for row in pending if not row.cv_text or row.id in to_llm], local_rows
+
+    # ---------------- Public API ----------------
+    @staticmethod
+    def run(
+        job_id: int,
+        concurrency: int = RESCORE_CONCURRENCY,
+        batch_size: int = RESCORE_BATCH_SIZE,
+        restart: bool = False,
+        prescreen: bool = False,
+        top_k: int = PRESCREEN_TOP_K,
+        threshold: float = PRESCREEN_THRESHOLD,
+    ) -> Dict[str, Any]:
+        """
+        Re-score all applications for ``job_id``. Must be called inside an app context.
+        With ``prescreen`` only the local top ``top_k`` / above ``threshold``
+        applications are sent to the LLM; the rest keep their local score.
+        """
+        token = uuid.uuid4().hex
+        if not redis_client.set(RescoringService._lock_key(job_id), token, nx=True, ex=RESCORE_LOCK_TTL):
+            raise RescoringInProgress(f"Re-scoring already running for job {job_id}")
+
+        app = current_app._get_current_object()
+        try:
+            if restart:
+                redis_client.delete(RescoringService._done_key(job_id))
+            pending, total = RescoringService._pending_applications(job_id, restart)
+            done = total - len(pending)
+            failed = skipped = 0
+            RescoringService._update(
+                job_id, status="running", total=total, done=done, failed=0, skipped=0,
+                prescreened=0, concurrency=concurrency, started_at=datetime.utcnow().isoformat(), error=None,
+            )
+
+            if prescreen:
+                pending, local_rows = RescoringService._prescreen(job_id, pending, top_k, threshold)
+                for i in range(0, len(local_rows), batch_size):
+                    # Not checkpointed: a resumed run without prescreen must still send these to the LLM
+                    RescoringService._flush(job_id, local_rows[i:i + batch_size], checkpoint=False)
+                done += len(local_rows)
+                RescoringService._update(job_id, done=done, prescreened=len(local_rows))
+                RescoringService._refresh_lock(job_id, token)
+
+            batch: List[Dict[str, Any]] = []
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"rescore-{job_id}") as pool:
+                futures = {
+                    pool.submit(RescoringService._score_batch, app, job_id, chunk): [row.id for row in chunk]
+                    for chunk in (pending[i:i + ANALYSIS_BATCH_SIZE] for i in range(0, len(pending), ANALYSIS_BATCH_SIZE))
+                }
+                for future in as_completed(futures):
+                    RescoringService._refresh_lock(job_id, token)
+                    try:
+                        outcomes = future.result()
+                    except Exception as e:
+                        failed += len(futures[future])
+                        logger.error("Re-score failed for applications %s: %s", futures[future], e)
+                        continue
+
+                    for outcome in outcomes:
+                        if "error" in outcome:
+                            failed += 1
+                            logger.error("Re-score failed for application %s: %s", outcome["id"], outcome["error"])
+                            continue
+
+                        if outcome.pop("skipped", False):
+                            skipped += 1
+                            redis_client.sadd(RescoringService._done_key(job_id), outcome["id"])
+                            continue
+
+                        batch.append(outcome)
+                        if len(batch) >= batch_size:
+                            RescoringService._flush(job_id, batch)
+                            done += len(batch)
+                            batch = []
+                            RescoringService._update(job_id, done=done, failed=failed, skipped=skipped)
+
+            RescoringService._flush(job_id, batch)
+            done += len(batch)
+            status = "completed" if not failed else "completed_with_errors"
+            RescoringService._update(
+                job_id, status=status, done=done, failed=failed, skipped=skipped,
+                finished_at=datetime.utcnow().isoformat(),
+            )
+            if not failed:
+                redis_client.delete(RescoringService._done_key(job_id))
+            return RescoringService.get_status(job_id)
+
+        except Exception as e:
+            db.session.rollback()
+            RescoringService._update(job_id, status="interrupted", error=str(e))
+            raise
+        finally:
+            redis_client.eval(_RELEASE_SCRIPT, 1, RescoringService._lock_key(job_id), token)
+
+    @staticmethod
+    def start_async(job_id: int, **kwargs) -> None:
+        """Run ``run`` in a background thread with its own app context."""
+        app = current_app._get_current_object()
+
+        def target():
+            with app.app_context():
+                try:
+                    RescoringService.run(job_id, **kwargs)
+                except RescoringInProgress:
+                    pass
+                except Exception:
+                    logger.exception("Background re-scoring failed for job %s", job_id)
+                finally:
+                    db.session.remove()
+
+        threading.Thread(target=target, name=f"rescore-{job_id}", daemon=True).start()
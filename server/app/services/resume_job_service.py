@@ -0,0 +1,358 @@
+import io
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import redis
+from werkzeug.utils import secure_filename
+
+from app.extensions import db, redis_client, redis_binary_client
+from app.models import Application, User, Notification
+from app.services.ai_scheduler import ai_priority, BATCH
+from app.services.cv_parser_service import HybridResumeAnalyzer, ANALYSIS_BATCH_SIZE
+from app.services.upload_dedupe_service import UploadDedupeService
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "resume_jobs:queue"
+PROCESSING_KEY = "resume_jobs:processing"
+JOB_TTL = int(os.environ.get("RESUME_JOB_TTL", 24 * 3600))  # seconds
+STALE_AFTER = int(os.environ.get("RESUME_JOB_STALE_AFTER", 15 * 60))  # seconds
+RESUME_WORKER_BATCH = int(os.environ.get("RESUME_WORKER_BATCH", ANALYSIS_BATCH_SIZE))  # jobs per pop
+
+
+class ResumeJobError(Exception):
+    pass
+
+
+class ResumeJobPending(ResumeJobError):
+    def __init__(self, job_id: str):
+        super().__init__(f"Resume job {job_id} is already in progress")
+        self.job_id = job_id
+
+
+class ResumeJobService:
+    """
+    Redis-backed queue that moves resume upload, text extraction and AI
+    analysis off the request thread. Jobs are stored as hashes under
+    ``resume_jobs:<id>`` and processed by ``run_worker``.
+    """
+
+    # ---------------- Keys ----------------
+    @staticmethod
+    def _job_key(job_id: str) -> str:
+        return f"resume_jobs:{job_id}"
+
+    @staticmethod
+    def _file_key(job_id: str) -> str:
+        return f"resume_jobs:{job_id}:file"
+
+    @staticmethod
+    def _application_key(application_id: int) -> str:
+        return f"resume_jobs:application:{application_id}"
+
+    @staticmethod
+    def _update(job_id: str, **fields) -> None:
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        redis_client.hset(ResumeJobService._job_key(job_id), mapping={
+            k: "" if v is None else str(v) for k, v in fields.items()
+        })
+
+    # ---------------- Producer ----------------
+    @staticmethod
+    def enqueue(application: Application, file, user_id: int, resume_text: str = "") -> str:
+        """
+        Store the uploaded file in Redis and queue it for processing. The
+        bytes travel through Redis rather than local disk because workers
+        may run on another machine. Returns the job id.
+        """
+        pending = redis_client.get(ResumeJobService._application_key(application.id))
+        if pending:
+            status = redis_client.hget(ResumeJobService._job_key(pending), "status")
+            if status in ("queued", "processing"):
+                raise ResumeJobPending(pending)
+
+        job_id = uuid.uuid4().hex
+        filename = secure_filename(file.filename or "") or "resume"
+        stream = getattr(file, "stream", file)
+        stream.seek(0)
+        redis_binary_client.set(ResumeJobService._file_key(job_id), stream.read(), ex=JOB_TTL)
+
+        now = datetime.utcnow().isoformat()
+        pipe = redis_client.pipeline()
+        pipe.hset(ResumeJobService._job_key(job_id), mapping={
+            "job_id": job_id,
+            "application_id": application.id,
+            "user_id": user_id,
+            "filename": filename,
+            "resume_text": resume_text or "",
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
+        pipe.expire(ResumeJobService._job_key(job_id), JOB_TTL)
+        pipe.set(ResumeJobService._application_key(application.id), job_id, ex=JOB_TTL)
+        pipe.lpush(QUEUE_KEY, job_id)
+        pipe.execute()
+        return job_id
+
+    @staticmethod
+    def get_status(job_id: str) -> Optional[Dict[str, Any]]:
+        job = redis_client.hgetall(ResumeJobService._job_key(job_id))
+        if not job:
+            return None
+        cv_parser_result = None
+        if job.get("status") == "completed":
+            application = Application.query.get(int(job["application_id"]))
+            cv_parser_result = application.cv_parser_result if application else None
+        return {
+            "job_id": job_id,
+            "application_id": int(job["application_id"]),
+            "user_id": int(job["user_id"]),
+            "status": job.get("status"),
+            "stage": job.get("stage"),
+            "progress": int(job.get("progress") or 0),
+            "error": job.get("error") or None,
+            "cv_parser_result": cv_parser_result,
+            "created_at": job.get("created_at"),
+            "updated_at": job.get("updated_at"),
+        }
+
+    # ---------------- Processing ----------------
+    @staticmethod
+    def _prepare(
+        file,
+        filename: str,
+        resume_text: str = "",
+        on_progress: Callable[[str, int], None] = lambda stage, progress: None,
+    ) -> Tuple[str, str]:
+        """Upload the resume and extract its text. Returns (resume_url, resume_text)."""
+        on_progress("uploading", 10)
+        try:
+            upload = UploadDedupeService.upload(file, extract_as=None if resume_text else filename)
+        except Exception as e:
+            logger.error("Resume upload failed: %s", e)
+            raise ResumeJobError("Failed to upload resume")
+        resume_url = upload["url"]
+        if not resume_url:
+            raise ResumeJobError("Failed to upload resume")
+        return resume_url, resume_text or upload["text"]
+
+    @staticmethod
+    def _save(
+        application: Application,
+        resume_url: str,
+        resume_text: str,
+        parser_result: Dict[str, Any],
+        on_progress: Callable[[str, int], None] = lambda stage, progress: None,
+    ) -> None:
+        """Store the analysis on the application and notify admins."""
+        job = application.requisition
+        candidate = application.candidate
+
+        on_progress("saving", 90)
+        if resume_text:
+            candidate.cv_text = resume_text  # reused when the requisition is re-scored
+        application.resume_url = resume_url
+        application.cv_score = parser_result.get("match_score", 0)
+        application.cv_parser_result = parser_result
+        application.recommendation = parser_result.get("recommendation", "")
+        db.session.commit()
+
+        admins = User.query.filter_by(role="admin").all()
+        for admin in admins:
+            notif = Notification(
+                user_id=admin.id,
+                message=f"{candidate.full_name} submitted resume for {job.title}."
+            )
+            db.session.add(notif)
+        db.session.commit()
+
+    @staticmethod
+    def process_resume(
+        application: Application,
+        file,
+        filename: str,
+        resume_text: str = "",
+        on_progress: Callable[[str, int], None] = lambda stage, progress: None,
+    ) -> Dict[str, Any]:
+        """
+        Upload, extract and analyse a resume, then save the results on the
+        application and notify admins. Used by the synchronous route.
+        Returns the parser result.
+        """
+        resume_url, resume_text = ResumeJobService._prepare(file, filename, resume_text, on_progress)
+
+        on_progress("analysing", 60)
+        parser_result = HybridResumeAnalyzer.analyse_resume(resume_text, application.requisition_id)
+
+        ResumeJobService._save(application, resume_url, resume_text, parser_result, on_progress)
+        return parser_result
+
+    @staticmethod
+    def _fail(job_id: str, error: Exception) -> None:
+        db.session.rollback()
+        logger.error("Resume job %s failed: %s", job_id, error, exc_info=True)
+        ResumeJobService._update(job_id, status="failed", stage="failed", error=str(error))
+
+    @staticmethod
+    def _fail_unfinished(job_ids: List[str], error: Exception) -> None:
+        """Mark jobs that are not completed or failed yet as failed."""
+        for job_id in job_ids:
+            try:
+                status = redis_client.hget(ResumeJobService._job_key(job_id), "status")
+                if status not in ("completed", "failed"):
+                    ResumeJobService._update(job_id, status="failed", stage="failed", error=str(error))
+            except redis.RedisError as e:
+                logger.warning("Could not mark resume job %s failed: %s", job_id, e)
+
+    @staticmethod
+    def process(job_id: str) -> None:
+        """Run a single queued job. Must be called inside an app context."""
+        ResumeJobService.process_batch([job_id])
+
+    @staticmethod
+    def process_batch(job_ids: List[str]) -> None:
+        """
+        Run several queued jobs. Uploads and extraction happen per job; jobs
+        for the same requisition share batched analysis prompts. Must be
+        called inside an app context.
+        """
+        prepared = defaultdict(list)  # requisition id -> [(job_id, application, url, text)]
+        try:
+            for job_id in job_ids:
+                job = redis_client.hgetall(ResumeJobService._job_key(job_id))
+                if not job:
+                    logger.warning("Resume job %s expired before processing", job_id)
+                    continue
+
+                def on_progress(stage: str, progress: int, job_id: str = job_id) -> None:
+                    ResumeJobService._update(job_id, status="processing", stage=stage, progress=progress)
+
+                try:
+                    application = Application.query.get(int(job["application_id"]))
+                    if not application:
+                        raise ResumeJobError("Application not found")
+                    content = redis_binary_client.get(ResumeJobService._file_key(job_id))
+                    if content is None:
+                        raise ResumeJobError("Uploaded file expired before processing")
+                    resume_url, resume_text = ResumeJobService._prepare(
+                        io.BytesIO(content),
+                        job.get("filename", ""),
+                        resume_text=job.get("resume_text", ""),
+                        on_progress=on_progress,
+                    )
+                    prepared[application.requisition_id].append((job_id, application, resume_url, resume_text))
+                except Exception as e:
+                    ResumeJobService._fail(job_id, e)
+
+            for requisition_id, items in prepared.items():
+                for job_id, *_ in items:
+                    ResumeJobService._update(job_id, status="processing", stage="analysing", progress=60)
+                try:
+                    # Queued jobs must not compete with chat and interactive analysis
+                    with ai_priority(BATCH):
+                        results = HybridResumeAnalyzer.analyse_resumes([item[3] for item in items], requisition_id)
+                except Exception as e:
+                    for job_id, *_ in items:
+                        ResumeJobService._fail(job_id, e)
+                    continue
+
+                for (job_id, application, resume_url, resume_text), parser_result in zip(items, results):
+                    try:
+                        ResumeJobService._save(
+                            application, resume_url, resume_text, parser_result,
+                            on_progress=lambda stage, progress, job_id=job_id: ResumeJobService._update(
+                                job_id, status="processing", stage=stage, progress=progress
+                            ),
+                        )
+                        ResumeJobService._update(job_id, status="completed", stage="completed", progress=100)
+                    except Exception as e:
+                        ResumeJobService._fail(job_id, e)
+        finally:
+            db.session.remove()
+            try:
+                redis_binary_client.delete(*[ResumeJobService._file_key(job_id) for job_id in job_ids])
+            except redis.RedisError as e:
+                logger.warning("Could not delete stored resume files: %s", e)
+
+    @staticmethod
+    def requeue_stalled() -> int:
+        """Return jobs left in the processing list by a crashed worker to the queue."""
+        requeued = 0
+        for job_id in redis_client.lrange(PROCESSING_KEY, 0, -1):
+            updated_at = redis_client.hget(ResumeJobService._job_key(job_id), "updated_at")
+            if updated_at:
+                age = (datetime.utcnow() - datetime.fromisoformat(updated_at)).total_seconds()
+                if age < STALE_AFTER:
+                    continue
+            if redis_client.lrem(PROCESSING_KEY, 1, job_id):
+                if updated_at:
+                    redis_client.rpush(QUEUE_KEY, job_id)
+                requeued += 1
+        return requeued
+
+    @staticmethod
+    def run_worker(app, stop_event: Optional[threading.Event] = None, poll_timeout: int = 5) -> None:
+        """Block on the queue and process jobs until ``stop_event`` is set."""
+        stop_event = stop_event or threading.Event()
+        with app.app_context():
+            try:
+                ResumeJobService.requeue_stalled()
+            except redis.RedisError as e:
+                logger.warning("Could not requeue stalled resume jobs: %s", e)
+
+            while not stop_event.is_set():
+                try:
+                    job_id = redis_client.brpoplpush(QUEUE_KEY, PROCESSING_KEY, timeout=poll_timeout)
+                except redis.RedisError as e:
+                    logger.error("Resume queue unavailable: %s", e)
+                    time.sleep(poll_timeout)
+                    continue
+                if not job_id:
+                    continue
+
+                # Pick up whatever else is already waiting so it can share analysis prompts
+                job_ids = [job_id]
+                try:
+                    while len(job_ids) < RESUME_WORKER_BATCH:
+                        extra = redis_client.rpoplpush(QUEUE_KEY, PROCESSING_KEY)
+                        if not extra:
+                            break
+                        job_ids.append(extra)
+                except redis.RedisError as e:
+                    logger.warning("Could not drain resume queue: %s", e)
+
+                try:
+                    ResumeJobService.process_batch(job_ids)
+                except Exception as e:
+                    # Keep the thread alive; whatever the batch did not finish is failed
+                    logger.error("Resume worker batch %s failed: %s", job_ids, e, exc_info=True)
+                    ResumeJobService._fail_unfinished(job_ids, e)
+                finally:
+                    try:
+                        for processed in job_ids:
+                            redis_client.lrem(PROCESSING_KEY, 1, processed)
+                    except redis.RedisError as e:
+                        # requeue_stalled picks these up once they go stale
+                        logger.warning("Could not clear processed resume jobs: %s", e)
+
+    @staticmethod
+    def start_workers(app, count: int) -> threading.Event:
+        """Start ``count`` daemon worker threads; set the returned event to stop them."""
+        stop_event = threading.Event()
+        for i in range(count):
+            threading.Thread(
+                target=ResumeJobService.run_worker,
+                args=(app, stop_event),
+                name=f"resume-worker-{i}",
+                daemon=True,
+            ).start()
+        return stop_event
@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import time
+import zlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import redis
+
+from app.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.environ.get("CHAT_SEMANTIC_CACHE", "true").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("CHAT_SEMANTIC_CACHE_THRESHOLD", 0.85))  # cosine 0-1
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("CHAT_SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+SEMANTIC_CACHE_TTL = int(os.environ.get("CHAT_SEMANTIC_CACHE_TTL", 7 * 24 * 3600))  # seconds
+VECTOR_DIM = 1024
+MAX_MESSAGE_CHARS = 500  # longer messages are too specific to be worth caching
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def embed(text: str, dim: int = VECTOR_DIM) -> np.ndarray:
+    """
+    Hashing-trick embedding: words, word bigrams and character trigrams are
+    hashed into ``dim`` signed buckets and the vector is L2-normalized.
+    Cheap, deterministic across processes, and tolerant of small rewordings
+    and typos.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    words = _WORD_RE.findall((text or "").lower())
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    for feature in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        weight = 0.5 if feature.startswith("#") else 1.0
+        vec[h % dim] += weight if (h >> 31) & 1 else -weight
+
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class SemanticChatCache:
+    """
+    Near-duplicate cache for chat answers.
+
+    Entries (message, reply) live in a Redis list shared by all workers; each
+    process keeps the embeddings in a NumPy matrix and catches up with new
+    entries on lookup. A lookup is a single matrix-vector product; the best
+    match is returned when its cosine similarity reaches ``threshold``.
+    Purging bumps a generation counter so every process drops its index.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "chat_semcache",
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: int = SEMANTIC_CACHE_TTL,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+    ):
+        self.namespace = namespace
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+        self._entries: List[Dict[str, Any]] = []
+        self._loaded = 0
+        self._generation: Optional[str] = None
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "similarity_total": 0.0}
+
+    @property
+    def _entries_key(self) -> str:
+        return f"{self.namespace}:entries"
+
+    @property
+    def _generation_key(self) -> str:
+        return f"{self.namespace}:generation"
+
+    @property
+    def _stats_key(self) -> str:
+        return f"{self.namespace}:stats"
+
+    def _incr(self, field: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[field] += amount
+        try:
+            if isinstance(amount, float):
+                redis_client.hincrbyfloat(self._stats_key, field, amount)
+            else:
+                redis_client.hincrby(self._stats_key, field, amount)
+        except redis.RedisError:
+            pass
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        return " ".join((message or "").lower().split())
+
+    def _sync(self) -> None:
+        """Pull entries added by other workers; rebuild after a purge or trim."""
+        pipe = redis_client.pipeline()
+        pipe.get(self._generation_key)
+        pipe.llen(self._entries_key)
+        generation, length = pipe.execute()
+
+        with self._lock:
+            if generation != self._generation or length < self._loaded:
+                self._matrix = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+                self._entries = []
+                self._loaded = 0
+                self._generation = generation
+            start = self._loaded
+
+        if length <= start:
+            return
+        raw = redis_client.lrange(self._entries_key, start, length - 1)
+        entries, vectors = [], []
+        for item in raw:
+            try:
+                entry = json.loads(item)
+            except ValueError:
+                entry = {"message": "", "reply": "", "created_at": 0}
+            entries.append(entry)
+            vectors.append(embed(entry["message"]))
+
+        with self._lock:
+            if self._loaded != start or self._generation != generation:
+                return  # another thread synced meanwhile
+            self._entries.extend(entries)
+            self._matrix = np.vstack([self._matrix, np.array(vectors, dtype=np.float32)])
+            self._loaded = start + len(entries)
+
+    # ---------------- Public API ----------------
+    def lookup(self, message: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"reply", "similarity", "matched"}`` for a close enough cached question."""
+        message = self.normalize(message)
+        if not self.enabled or not message or len(message) > MAX_MESSAGE_CHARS:
+            return None
+        try:
+            self._sync()
+        except redis.RedisError as e:
+            logger.warning("Semantic cache unavailable: %s", e)
+            return None
+
+        query = embed(message)
+        with self._lock:
+            if not len(self._entries):
+                best, similarity = None, 0.0
+            else:
+                scores = self._matrix @ query
+                # Expired entries cannot match
+                cutoff = time.time() - self.ttl
+                for index in np.argsort(-scores)[:5]:
+                    if self._entries[index].get("created_at", 0) >= cutoff:
+                        best, similarity = self._entries[index], float(scores[index])
+                        break
+                else:
+                    best, similarity = None, 0.0
+
+        if best is None or similarity < self.threshold:
+            self._incr("misses")
+            return None
+        self._incr("hits")
+        self._incr("similarity_total", float(similarity))
+        return {"reply": best["reply"], "similarity": round(similarity, 4), "matched": best["message"]}
+
+    def store(self, message: str, reply: str) -> None:
+        message = self.normalize(message)
+        if not self.enabled or not message or not reply or len(message) > MAX_MESSAGE_CHARS:
+            return
+        entry = json.dumps({"message": message, "reply": reply, "created_at": time.time()})
+        try:
+            length = redis_client.rpush(self._entries_key, entry)
+            if length > self.max_entries:
+                # Keep the newest half; the generation bump makes every
+                # process rebuild its index from the trimmed list.
+                pipe = redis_client.pipeline()
+                pipe.ltrim(self._entries_key, -(self.max_entries // 2), -1)
+                pipe.incr(self._generation_key)
+                pipe.execute()
+            self._incr("stores")
+        except redis.RedisError as e:
+            logger.warning("Semantic cache write failed: %s", e)
+
+    def purge(self) -> int:
+        """Drop every cached answer in all workers. Returns the number removed."""
+        pipe = redis_client.pipeline()
+        pipe.llen(self._entries_key)
+        pipe.delete(self._entries_key)
+        pipe.incr(self._generation_key)
+        removed = pipe.execute()[0]
+        with self._lock:
+            self._matrix = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+            self._entries = []
+            self._loaded = 0
+            self._generation = None
+        return int(removed or 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            process = dict(self._stats)
+            process["entries_loaded"] = len(self._entries)
+
+        def summarize(counters: Dict[str, float]) -> Dict[str, Any]:
+            hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+            total = hits + misses
+            return {
+                "hits": int(hits),
+                "misses": int(misses),
+                "stores": int(counters.get("stores", 0)),
+                "hit_rate": round(hits / total, 4) if total else 0,
+                "avg_hit_similarity": round(counters.get("similarity_total", 0) / hits, 4) if hits else 0,
+            }
+
+        result = {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "process": {**summarize(process), "entries_loaded": process["entries_loaded"]},
+        }
+        try:
+            cluster = {k: float(v) for k, v in redis_client.hgetall(self._stats_key).items()}
+            result["cluster"] = {**summarize(cluster), "entries": redis_client.llen(self._entries_key)}
+        except redis.RedisError:
+            result["cluster"] = None
+        return result
+
+
+chat_semantic_cache = SemanticChatCache()
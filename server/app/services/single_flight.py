@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import redis
+
+from app.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+FLIGHT_LOCK_TTL = float(os.environ.get("AI_FLIGHT_LOCK_TTL", 120))  # seconds
+FLIGHT_RESULT_TTL = int(os.environ.get("AI_FLIGHT_RESULT_TTL", 30))  # seconds
+FLIGHT_POLL_INTERVAL = 0.1  # seconds, doubled up to FLIGHT_POLL_MAX
+FLIGHT_POLL_MAX = 0.5
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def fingerprint(payload: Dict[str, Any]) -> str:
+    """Stable hash of a request payload (model, messages, sampling params)."""
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls so only one reaches upstream.
+
+    Within a process, followers wait on the leader's Event. Across processes
+    the leader holds ``{namespace}:{fp}:lock`` in Redis and publishes its
+    result to ``{namespace}:{fp}:result`` for a short time; followers in other
+    workers poll for that result. If the leader fails or its lock expires the
+    next caller takes over. Without Redis only in-process coalescing applies.
+    """
+
+    def __init__(self, namespace: str = "ai_flight"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._stats = {"leaders": 0, "local_followers": 0, "remote_followers": 0, "takeovers": 0}
+
+    def _record(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _lock_key(self, fp: str) -> str:
+        return f"{self.namespace}:{fp}:lock"
+
+    def _result_key(self, fp: str) -> str:
+        return f"{self.namespace}:{fp}:result"
+
+    # ---------------- Public API ----------------
+    def do(self, fp: str, fn: Callable[[], str], timeout: float = FLIGHT_LOCK_TTL) -> str:
+        """Return ``fn()``, sharing the result with identical calls in flight."""
+        with self._lock:
+            call = self._calls.get(fp)
+            leader = call is None
+            if leader:
+                call = self._calls[fp] = _Call()
+
+        if not leader:
+            self._record("local_followers")
+            if not call.done.wait(timeout):
+                raise RuntimeError("Timed out waiting for an identical AI request")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(fp, fn, timeout)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(fp, None)
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        followers = stats["local_followers"] + stats["remote_followers"]
+        total = stats["leaders"] + followers
+        stats["coalesced_rate"] = round(followers / total, 4) if total else 0
+        return stats
+
+    # ---------------- Cross-process ----------------
+    def _do_shared(self, fp: str, fn: Callable[[], str], timeout: float) -> str:
+        token = uuid.uuid4().hex
+        lock_key, result_key = self._lock_key(fp), self._result_key(fp)
+        give_up = time.monotonic() + timeout
+        interval = FLIGHT_POLL_INTERVAL
+        waited = False
+
+        while True:
+            try:
+                cached = redis_client.get(result_key)
+                if cached is not None:
+                    self._record("remote_followers")
+                    return cached
+                acquired = redis_client.set(lock_key, token, nx=True, px=int(FLIGHT_LOCK_TTL * 1000))
+            except redis.RedisError as e:
+                logger.warning("Single-flight lock unavailable, calling directly: %s", e)
+                self._record("leaders")
+                return fn()
+
+            if acquired:
+                break
+            if time.monotonic() + interval >= give_up:
+                raise RuntimeError("Timed out waiting for an identical AI request")
+            waited = True
+            time.sleep(interval)
+            interval = min(interval * 2, FLIGHT_POLL_MAX)
+
+        self._record("leaders")
+        if waited:
+            # A previous leader went away without publishing a result
+            self._record("takeovers")
+        try:
+            result = fn()
+            try:
+                redis_client.set(result_key, result, ex=FLIGHT_RESULT_TTL)
+            except redis.RedisError as e:
+                logger.warning("Single-flight result publish failed: %s", e)
+            return result
+        finally:
+            try:
+                redis_client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            except redis.RedisError as e:
+                logger.warning("Single-flight lock release failed: %s", e)
+
+
+ai_flight = SingleFlight()
@@ -0,0 +1,128 @@
+import io
+import os
+import hashlib
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import fitz
+import redis
+from docx import Document
+
+from app.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+EXTRACT_CACHE_TTL = int(os.environ.get("EXTRACT_CACHE_TTL", 30 * 24 * 3600))  # seconds
+EXTRACT_PARALLEL_MIN_PAGES = int(os.environ.get("EXTRACT_PARALLEL_MIN_PAGES", 16))
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        return _pool
+
+
+def _extract_pdf_pages(file_bytes: bytes, start: int, stop: int) -> List[str]:
+    """Extract pages ``start``..``stop - 1``; runs in a worker process."""
+    with fitz.open(stream=file_bytes, filetype="pdf") as pdf_doc:
+        return [pdf_doc[i].get_text() for i in range(start, stop)]
+
+
+class TextExtractionService:
+    """
+    Single entry point for turning uploaded CVs (PDF via PyMuPDF, DOCX via
+    python-docx) into plain text. Results are cached in Redis by the file's
+    SHA-256, so the same file is only ever parsed once.
+    """
+
+    SUPPORTED = {"pdf", "docx"}
+
+    @staticmethod
+    def sha256(file_bytes: bytes) -> str:
+        return hashlib.sha256(file_bytes).hexdigest()
+
+    @staticmethod
+    def _cache_key(digest: str) -> str:
+        return f"extract:text:{digest}"
+
+    @staticmethod
+    def file_type(filename: str) -> str:
+        return filename.rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+
+    @staticmethod
+    def cached(digest: str) -> Optional[str]:
+        """Text already extracted from the file with this SHA-256, if any."""
+        try:
+            return redis_client.get(TextExtractionService._cache_key(digest))
+        except redis.RedisError as e:
+            logger.warning("Extraction cache read failed: %s", e)
+            return None
+
+    @staticmethod
+    def extract(file_bytes: bytes, filename: str, digest: Optional[str] = None, kind: Optional[str] = None) -> str:
+        """
+        Return the text of a PDF or DOCX file ("" for other types).
+        ``digest`` may be passed when the caller already hashed the bytes;
+        ``kind`` overrides the type taken from the filename's extension.
+        """
+        kind = kind or TextExtractionService.file_type(filename)
+        if kind not in TextExtractionService.SUPPORTED or not file_bytes:
+            return ""
+
+        digest = digest or TextExtractionService.sha256(file_bytes)
+        cached = TextExtractionService.cached(digest)
+        if cached is not None:
+            return cached
+
+        if kind == "pdf":
+            text = TextExtractionService._extract_pdf(file_bytes)
+        else:
+            text = TextExtractionService._extract_docx(file_bytes)
+
+        try:
+            redis_client.set(TextExtractionService._cache_key(digest), text, ex=EXTRACT_CACHE_TTL)
+        except redis.RedisError as e:
+            logger.warning("Extraction cache write failed: %s", e)
+        return text
+
+    @staticmethod
+    def extract_file(file_path: str, kind: Optional[str] = None) -> str:
+        with open(file_path, "rb") as f:
+            return TextExtractionService.extract(f.read(), file_path, kind=kind)
+
+    @staticmethod
+    def _extract_pdf(file_bytes: bytes) -> str:
+        with fitz.open(stream=file_bytes, filetype="pdf") as pdf_doc:
+            page_count = pdf_doc.page_count
+            if page_count < EXTRACT_PARALLEL_MIN_PAGES or EXTRACT_WORKERS < 2:
+                return "".join(page.get_text() for page in pdf_doc)
+
+        # Large documents: split into contiguous page ranges, one per worker
+        chunk = -(-page_count // EXTRACT_WORKERS)
+        ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+        try:
+            pool = _get_pool()
+            futures = [pool.submit(_extract_pdf_pages, file_bytes, start, stop) for start, stop in ranges]
+            return "".join(text for future in futures for text in future.result())
+        except Exception as e:
+            logger.warning("Parallel PDF extraction failed, falling back to sequential: %s", e)
+            return "".join(_extract_pdf_pages(file_bytes, 0, page_count))
+
+    @staticmethod
+    def _extract_docx(file_bytes: bytes) -> str:
+        document = Document(io.BytesIO(file_bytes))
+        parts = [p.text for p in document.paragraphs if p.text.strip()]
+        for table in document.tables:
+            for row in table.rows:
+                cells = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+                if cells:
+                    parts.append(" | ".join(cells))
+        return "\n".join(parts)
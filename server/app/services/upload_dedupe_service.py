@@ -0,0 +1,119 @@
+import os
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Any, IO, Optional, Tuple
+
+import redis
+from cloudinary.uploader import upload as cloudinary_upload
+
+from app.extensions import redis_client
+from app.services.text_extraction_service import TextExtractionService
+from app.utils.deadlines import timeout_for
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_MEMORY = 2 * 1024 * 1024  # larger uploads spill to a temp file
+UPLOAD_INDEX_TTL = int(os.environ.get("UPLOAD_INDEX_TTL", 180 * 24 * 3600))  # seconds
+CLOUDINARY_TIMEOUT = float(os.environ.get("CLOUDINARY_TIMEOUT", 60))  # seconds, capped by the request deadline
+
+
+class UploadDedupeService:
+    """
+    Content-addressed index of files already stored in Cloudinary.
+
+    Incoming files are hashed while they are copied off the request stream;
+    when the SHA-256 is already known the stored URL is reused and the upload
+    is skipped. The same digest keys the extracted-text cache, so a repeat
+    upload also skips extraction. The file is never held in memory as a
+    whole except when its text has to be extracted.
+    """
+
+    @staticmethod
+    def _index_key(folder: str, digest: str) -> str:
+        return f"upload:{folder}:{digest}"
+
+    @staticmethod
+    def spool(stream: IO[bytes], dest: Optional[IO[bytes]] = None) -> Tuple[IO[bytes], str, int]:
+        """
+        Copy ``stream`` into ``dest`` (a spooled temp file by default) in
+        chunks, hashing as it goes. Returns (dest rewound when possible, sha256, size).
+        """
+        dest = dest if dest is not None else tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        digest = hashlib.sha256()
+        size = 0
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            dest.write(chunk)
+            size += len(chunk)
+        if dest.readable():
+            dest.seek(0)
+        return dest, digest.hexdigest(), size
+
+    @staticmethod
+    def lookup(folder: str, digest: str) -> Optional[str]:
+        try:
+            return redis_client.get(UploadDedupeService._index_key(folder, digest))
+        except redis.RedisError as e:
+            logger.warning("Upload index read failed: %s", e)
+            return None
+
+    @staticmethod
+    def remember(folder: str, digest: str, url: str) -> None:
+        try:
+            redis_client.set(UploadDedupeService._index_key(folder, digest), url, ex=UPLOAD_INDEX_TTL)
+        except redis.RedisError as e:
+            logger.warning("Upload index write failed: %s", e)
+
+    @staticmethod
+    def upload(
+        file, folder: str = "candidate_cvs", resource_type: str = "raw", extract_as: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Store ``file`` (a werkzeug FileStorage, file object or path) unless an
+        identical file was stored before. With ``extract_as`` (the filename
+        that decides the parser) the file's text is extracted too, or taken
+        from the extraction cache. Returns
+        ``{"url", "digest", "size", "reused", "text"}``; ``text`` is None
+        without ``extract_as`` and "" when extraction fails.
+        """
+        if isinstance(file, str):
+            with open(file, "rb") as source:
+                spooled, digest, size = UploadDedupeService.spool(source)
+        else:
+            stream = getattr(file, "stream", file)
+            stream.seek(0)
+            spooled, digest, size = UploadDedupeService.spool(stream)
+
+        text = None
+        with spooled:
+            url = UploadDedupeService.lookup(folder, digest)
+            reused = bool(url)
+            if not url:
+                result = cloudinary_upload(
+                    spooled, resource_type=resource_type, folder=folder,
+                    timeout=timeout_for(CLOUDINARY_TIMEOUT),
+                )
+                url = result.get("secure_url")
+                if url:
+                    UploadDedupeService.remember(folder, digest, url)
+
+            if extract_as is not None:
+                text = TextExtractionService.cached(digest)
+                if text is None:
+                    # The parsers need the whole document in memory
+                    spooled.seek(0)
+                    try:
+                        text = TextExtractionService.extract(spooled.read(), extract_as, digest=digest)
+                    except Exception as e:
+                        # The file is already stored; a bad document must not fail the upload
+                        logger.warning("Text extraction failed for sha256 %s: %s", digest, e)
+                        text = ""
+
+        if reused:
+            logger.info("Reusing stored upload %s for sha256 %s", url, digest)
+        return {"url": url, "digest": digest, "size": size, "reused": reused, "text": text}
@@ -0,0 +1,77 @@
+import os
+import time
+from typing import Optional
+
+from flask import g, has_request_context, request
+
+# Total time budget (seconds) for one request, by route class
+ROUTE_DEADLINES = {
+    "ai": float(os.getenv("DEADLINE_AI", 60)),
+    "upload": float(os.getenv("DEADLINE_UPLOAD", 90)),
+    "auth": float(os.getenv("DEADLINE_AUTH", 15)),
+    "default": float(os.getenv("DEADLINE_DEFAULT", 30)),
+}
+
+_ENDPOINT_CLASSES = {
+    "candidate_bp.upload_resume": "upload",
+    "candidate_bp.upload_document": "upload",
+    "candidate_bp.upload_profile_picture": "upload",
+}
+_BLUEPRINT_CLASSES = {
+    "ai_bp": "ai",
+    "sso_bp": "auth",
+    "mfa": "auth",
+}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def route_class() -> str:
+    endpoint = request.endpoint or ""
+    if endpoint in _ENDPOINT_CLASSES:
+        return _ENDPOINT_CLASSES[endpoint]
+    if request.blueprint in _BLUEPRINT_CLASSES:
+        return _BLUEPRINT_CLASSES[request.blueprint]
+    if request.path.startswith("/api/auth"):
+        return "auth"
+    return "default"
+
+
+def start_request_deadline() -> None:
+    """before_request hook: store the absolute deadline (monotonic) on ``g``."""
+    g.deadline_class = route_class()
+    g.deadline = time.monotonic() + ROUTE_DEADLINES[g.deadline_class]
+
+
+def init_request_deadlines(app) -> None:
+    app.before_request(start_request_deadline)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left for the current request, or None outside a request."""
+    if not has_request_context() or getattr(g, "deadline", None) is None:
+        return None
+    return max(0.0, g.deadline - time.monotonic())
+
+
+def deadline_after(seconds: float) -> float:
+    """Absolute monotonic deadline: ``seconds`` from now, capped by the request deadline."""
+    local = time.monotonic() + seconds
+    left = remaining()
+    return local if left is None else min(local, time.monotonic() + left)
+
+
+def timeout_for(cap: float, minimum: float = 1.0) -> float:
+    """
+    Timeout for one outbound call: ``cap`` or whatever is left of the
+    request budget, whichever is smaller. Raises ``DeadlineExceeded`` when
+    less than ``minimum`` seconds remain, so the call is not started at all.
+    """
+    left = remaining()
+    if left is None:
+        return cap
+    if left < minimum:
+        raise DeadlineExceeded(f"Request deadline exceeded ({g.deadline_class})")
+    return min(cap, left)
@@ -3,6 +3,7 @@ from flask import jsonify, request, current_app
 from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity, decode_token
 from app.models import User
 import logging
+import time
 
 def role_required(*roles):
     allowed_roles = []
@@ -90,3 +91,99 @@ def role_required(*roles):
 
         return decorator
     return wrapper
+
+
+def _observe_first_chunk(chunks, controller, started):
+    """Yield ``chunks``, reporting the latency to ``controller`` when the first one is ready."""
+    observed = False
+    try:
+        for chunk in chunks:
+            if not observed:
+                controller.observe(started)
+                observed = True
+            yield chunk
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def ai_admission(route_class):
+    """
+    Admission control for AI-backed routes: rejects with 429/503 and a
+    Retry-After header when AI work is backed up (see AdmissionController).
+    Streamed responses hold their slot until the stream closes but count
+    only their time to first byte towards the latency SLO.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if request.method == "OPTIONS":
+                return fn(*args, **kwargs)
+
+            from app.services.admission_control import ai_admission as controller, AdmissionRejected
+
+            try:
+                ticket = controller.admit(route_class)
+            except AdmissionRejected as e:
+                response = jsonify({"error": str(e), "retry_after": e.retry_after})
+                response.status_code = e.status
+                response.headers["Retry-After"] = str(e.retry_after)
+                return response
+
+            started = time.monotonic()
+            try:
+                response = current_app.make_response(fn(*args, **kwargs))
+            except Exception:
+                controller.release(route_class, ticket, started)
+                raise
+            if response.is_streamed:
+                # The SLO tracks time to first byte; a long stream is not a slow provider
+                response.response = _observe_first_chunk(response.response, controller, started)
+                response.call_on_close(lambda: controller.release(route_class, ticket, None))
+            else:
+                controller.release(route_class, ticket, started)
+            return response
+
+        return decorator
+    return wrapper
+
+
+def analytics_cached(*tables):
+    """
+    Cache a GET analytics response until one of ``tables`` (default: every
+    tracked table) is written to, sharing one recomputation across workers
+    (see AnalyticsCache). Place it below ``role_required``.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            if request.method != "GET":
+                return fn(*args, **kwargs)
+
+            import redis
+            from app.services.analytics_cache import analytics_cache, TRACKED_TABLES
+
+            query = {k: v for k, v in request.args.lists() if k != "access_token"}
+            try:
+                key = analytics_cache.make_key(request.endpoint, {"args": query, "view": kwargs}, tables or TRACKED_TABLES)
+            except redis.RedisError as e:
+                logging.warning(f"Analytics cache unavailable: {e}")
+                return fn(*args, **kwargs)
+
+            computed = {}
+
+            def compute():
+                response = computed["response"] = current_app.make_response(fn(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return None
+                return {"body": response.get_data(as_text=True), "mimetype": response.mimetype}
+
+            entry = analytics_cache.get_or_compute(key, compute)
+            response = computed.get("response") or current_app.response_class(
+                entry["body"], mimetype=entry["mimetype"]
+            )
+            response.headers["X-Cache"] = entry["cache"]
+            return response
+
+        return decorator
+    return wrapper
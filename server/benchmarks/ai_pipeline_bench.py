@@ -0,0 +1,238 @@
+"""
+Throughput/latency benchmark for the AI call paths, run against the local
+OpenRouter stand-in (benchmarks/fake_openrouter.py) instead of the real API.
+
+Usage:
+    python benchmarks/ai_pipeline_bench.py [--scenarios chat,stream,gemini,hybrid,hybrid_batch]
+        [--concurrency 1,4,8,16] [--requests 64] [--latency 800] [--jitter 300]
+        [--error-rate 0.02] [--malformed-rate 0.05] [--repeat-inputs 0] [--json]
+
+By default a fake server is started in-process and OPENROUTER_URL is
+pointed at it; pass --url to use one that is already running. Each
+scenario is run at every concurrency level and reports p50/p95 latency,
+throughput and the parse-failure rate:
+
+    chat          AIService.chat
+    stream        AIService.stream_chat (also time to first token)
+    gemini        analyse_resume_gemini (AIService.analyze_cv_vs_job)
+    hybrid        HybridResumeAnalyzer.analyse_resume
+    hybrid_batch  HybridResumeAnalyzer.analyse_resumes (--batch-size CVs per call)
+
+The hybrid scenarios look up a fixed in-memory requisition profile instead
+of the database. Inputs are unique per request, per concurrency level and
+per invocation, so result caches never answer across runs; with
+--repeat-inputs N each run only uses N distinct inputs, so cache and
+request coalescing show up in the numbers. Redis (REDIS_URL) is used when
+reachable.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fake_openrouter import start_server  # noqa: E402
+
+JOB_DESCRIPTION = """Senior Backend Engineer
+We are looking for a backend engineer to design and run Python services.
+Required skills: Python, Flask, PostgreSQL, Redis, Docker, REST APIs.
+Responsibilities: build APIs, tune database queries, review code, mentor juniors.
+Minimum 5 years of experience."""
+
+CV_TEMPLATE = """Candidate {n}
+Summary
+Backend developer with {years} years of experience building web services.
+Skills
+Python, Flask, SQLAlchemy, PostgreSQL, Docker, Git
+Experience
+Software Engineer at Company {n} ({years} years) - built REST APIs and data pipelines.
+Education
+BSc Computer Science
+Reference {ref}"""
+
+BENCH_JOB_ID = 0
+RUN_NONCE = uuid.uuid4().hex[:8]  # keeps inputs unique across invocations sharing a Redis
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def input_ref(n, args, run_id):
+    """Label of input ``n`` within run ``run_id``; repeats only inside one run."""
+    n = n % args.repeat_inputs if args.repeat_inputs else n
+    return f"{RUN_NONCE}-{run_id}-{n}"
+
+
+def cv_text(n, args, run_id):
+    m = n % args.repeat_inputs if args.repeat_inputs else n
+    return CV_TEMPLATE.format(n=m, years=3 + m % 8, ref=input_ref(n, args, run_id))
+
+
+def use_fixed_profile():
+    """Serve BENCH_JOB_ID's profile from memory so no database is needed."""
+    from app.services.prompt_compactor import PromptCompactor, JOB_TOKEN_BUDGET
+    from app.services.requisition_profile_service import RequisitionProfileService
+    compacted = PromptCompactor.compact(JOB_DESCRIPTION, JOB_TOKEN_BUDGET, sectioned=False)
+    profile = {
+        "revision": 1,
+        "prompt_prefix": compacted["text"],
+        "summary_tokens": compacted["tokens"],
+        "interview_questions": [],
+    }
+    RequisitionProfileService.get = staticmethod(lambda job_id: profile if job_id == BENCH_JOB_ID else None)
+
+
+def _failed(result):
+    return result["raw_text"].startswith("Error during analysis")
+
+
+# Each scenario returns (parse_ok, items) for one request; exceptions count as errors
+def scenario_chat(i, args, run_id):
+    from app.services.ai_service import AIService
+    AIService().chat(f"How should I prepare for interview {input_ref(i, args, run_id)}?")
+    return True, 1
+
+
+def scenario_stream(i, args, run_id, first_token=None):
+    from app.services.ai_service import AIService
+    started = time.perf_counter()
+    for n, _ in enumerate(AIService().stream_chat(f"Tell me about the role {input_ref(i, args, run_id)}")):
+        if n == 0 and first_token is not None:
+            first_token.append(time.perf_counter() - started)
+    return True, 1
+
+
+def scenario_gemini(i, args, run_id):
+    from app.services.ai_parser_service import analyse_resume_gemini
+    result = analyse_resume_gemini(cv_text(i, args, run_id), JOB_DESCRIPTION)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return "raw_output" not in result, 1
+
+
+def scenario_hybrid(i, args, run_id):
+    from app.services.cv_parser_service import HybridResumeAnalyzer
+    result = HybridResumeAnalyzer.analyse_resume(cv_text(i, args, run_id), BENCH_JOB_ID)
+    if _failed(result):
+        raise RuntimeError(result["raw_text"])
+    return HybridResumeAnalyzer._is_valid(result), 1
+
+
+def scenario_hybrid_batch(i, args, run_id):
+    from app.services.cv_parser_service import HybridResumeAnalyzer
+    texts = [cv_text(i * args.batch_size + k, args, run_id) for k in range(args.batch_size)]
+    results = HybridResumeAnalyzer.analyse_resumes(texts, BENCH_JOB_ID, batch_size=args.batch_size)
+    if all(_failed(result) for result in results):
+        raise RuntimeError(results[0]["raw_text"])
+    return all(HybridResumeAnalyzer._is_valid(result) for result in results), len(texts)
+
+
+SCENARIOS = {
+    "chat": scenario_chat,
+    "stream": scenario_stream,
+    "gemini": scenario_gemini,
+    "hybrid": scenario_hybrid,
+    "hybrid_batch": scenario_hybrid_batch,
+}
+
+
+def run(name, concurrency, args, run_id):
+    fn = SCENARIOS[name]
+    latencies, first_tokens = [], []
+    errors = parse_failures = items = 0
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            if name == "stream":
+                ok, count = fn(i, args, run_id, first_tokens)
+            else:
+                ok, count = fn(i, args, run_id)
+            return time.perf_counter() - started, ok, count, None
+        except Exception as e:
+            return time.perf_counter() - started, False, 0, e
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, ok, count, error in pool.map(one, range(args.requests)):
+            latencies.append(elapsed)
+            if error is not None:
+                errors += 1
+            elif not ok:
+                parse_failures += 1
+            items += count
+    wall = time.perf_counter() - wall_started
+
+    completed = args.requests - errors
+    row = {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": args.requests,
+        "p50": round(statistics.median(latencies), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "throughput_rps": round(args.requests / wall, 2),
+        "items_per_s": round(items / wall, 2),
+        "errors": errors,
+        "parse_failure_rate": round(parse_failures / completed, 4) if completed else 0,
+    }
+    if first_tokens:
+        row["ttft_p50"] = round(statistics.median(first_tokens), 3)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="chat,stream,gemini,hybrid,hybrid_batch")
+    parser.add_argument("--concurrency", default="1,4,8,16")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--repeat-inputs", type=int, default=0)
+    parser.add_argument("--url", default=None, help="Use an already running fake server")
+    parser.add_argument("--latency", type=float, default=800)
+    parser.add_argument("--jitter", type=float, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        _, url = start_server(
+            latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, malformed_rate=args.malformed_rate,
+        )
+    # Must be set before app.services.ai_service is imported
+    os.environ["OPENROUTER_URL"] = url
+    os.environ.setdefault("OPENROUTER_API_KEY", "fake-key")
+    use_fixed_profile()
+
+    rows = []
+    for name in args.scenarios.split(","):
+        if name not in SCENARIOS:
+            sys.exit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            rows.append(run(name, concurrency, args, run_id=len(rows)))
+            if not args.json:
+                r = rows[-1]
+                print(
+                    f"{r['scenario']:<13} c={r['concurrency']:<3} p50={r['p50']:.3f}s p95={r['p95']:.3f}s "
+                    f"{r['throughput_rps']:>7.2f} req/s {r['items_per_s']:>7.2f} items/s "
+                    f"errors={r['errors']} parse_fail={r['parse_failure_rate']:.2%}"
+                    + (f" ttft_p50={r['ttft_p50']:.3f}s" if "ttft_p50" in r else "")
+                )
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark for CV text extraction backends.
+
+Usage:
+    python benchmarks/extraction_bench.py path/to/cv_corpus [--repeat 3]
+
+Times PyMuPDF (sequential and page-parallel), pdfplumber and pdfminer on
+every PDF in the corpus directory and prints total/mean/p95 seconds per
+backend plus the extracted character count, so the backends can be
+compared for both speed and output size.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+import pdfplumber
+from pdfminer.high_level import extract_text as pdfminer_extract_text
+
+
+def _pymupdf_pages(data, start, stop):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def pymupdf(data, pool=None):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return "".join(page.get_text() for page in doc)
+
+
+def pymupdf_parallel(data, pool=None):
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        count = doc.page_count
+    chunk = -(-count // pool._max_workers)
+    futures = [pool.submit(_pymupdf_pages, data, s, min(s + chunk, count)) for s in range(0, count, chunk)]
+    return "".join(text for f in futures for text in f.result())
+
+
+def plumber(data, pool=None):
+    import io
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return "".join(page.extract_text() or "" for page in pdf.pages)
+
+
+def pdfminer(data, pool=None):
+    import io
+    return pdfminer_extract_text(io.BytesIO(data))
+
+
+BACKENDS = {
+    "pymupdf": pymupdf,
+    "pymupdf_parallel": pymupdf_parallel,
+    "pdfplumber": plumber,
+    "pdfminer": pdfminer,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="Directory containing PDF files")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated subset to run")
+    args = parser.parse_args()
+
+    files = sorted(
+        os.path.join(args.corpus, name) for name in os.listdir(args.corpus) if name.lower().endswith(".pdf")
+    )
+    if not files:
+        sys.exit(f"No PDFs found in {args.corpus}")
+    corpus = [open(path, "rb").read() for path in files]
+    print(f"{len(corpus)} PDFs, {sum(map(len, corpus)) / 1e6:.1f} MB, repeat={args.repeat}\n")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pymupdf_parallel(corpus[0], pool)  # warm up worker processes
+        print(f"{'backend':<18}{'total s':>10}{'mean ms':>10}{'p95 ms':>10}{'chars':>12}")
+        for name in args.backends.split(","):
+            fn = BACKENDS[name]
+            timings, chars = [], 0
+            for _ in range(args.repeat):
+                for data in corpus:
+                    started = time.perf_counter()
+                    try:
+                        chars = len(fn(data, pool))
+                    except Exception as e:
+                        print(f"  {name} failed: {e}")
+                    timings.append(time.perf_counter() - started)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(
+                f"{name:<18}{sum(timings):>10.2f}{statistics.mean(timings) * 1000:>10.1f}"
+                f"{p95 * 1000:>10.1f}{chars:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Local stand-in for the OpenRouter chat-completions API.
+
+Usage:
+    python benchmarks/fake_openrouter.py [--port 8099] [--latency 800] [--jitter 300]
+        [--error-rate 0.02] [--malformed-rate 0.05] [--mode auto|json|text]
+
+Then point the app at it:
+    OPENROUTER_URL=http://127.0.0.1:8099/api/v1/chat/completions OPENROUTER_API_KEY=fake
+
+Every request sleeps for ``latency`` +/- ``jitter`` milliseconds, fails with
+a 429/500/503 at ``error-rate``, and returns unparseable text at
+``malformed-rate``. Replies are canned: in ``auto`` mode the prompt decides
+the shape (a JSON array for batched resume prompts, a JSON object for
+"strictly as JSON" prompts, the "Match Score: XX/100" text format
+otherwise). ``stream: true`` requests get Server-Sent Events, one word per
+chunk, spread over the latency. Responses carry a ``usage`` block with
+rough token counts.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+
+
+class FakeConfig:
+    def __init__(self, latency=800, jitter=300, error_rate=0.0, malformed_rate=0.0, mode="auto", seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.mode = mode
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def roll(self):
+        with self.lock:
+            self.requests += 1
+            return self.random.random(), self.random.random(), self.random.uniform(-1, 1)
+
+
+def _score(prompt, salt=""):
+    # Deterministic per prompt so repeated inputs get the same answer
+    return 20 + zlib.crc32((prompt + salt).encode("utf-8")) % 75
+
+
+def canned_reply(prompt, mode):
+    batch = len(re.findall(r"=== RESUME \d+ ===", prompt))
+    if mode == "json" or (mode == "auto" and batch):
+        items = [
+            {
+                "resume": n,
+                "match_score": _score(prompt, str(n)),
+                "confidence": 80,
+                "missing_skills": ["Kubernetes", "GraphQL"],
+                "suggestions": ["Quantify project outcomes"],
+            }
+            for n in range(1, max(batch, 1) + 1)
+        ]
+        return json.dumps(items if batch else items[0])
+    if mode == "auto" and "strictly as JSON" in prompt:
+        return json.dumps({
+            "match_score": _score(prompt),
+            "confidence": 0.8,
+            "missing_skills": ["Kubernetes", "GraphQL"],
+            "suggestions": ["Quantify project outcomes"],
+            "interview_questions": ["Walk us through a system you designed."],
+        })
+    if mode == "auto" and "Match Score" not in prompt:
+        return "Thanks for your question. Here is a short, helpful answer from the local test server."
+    return (
+        f"Match Score: {_score(prompt)}/100\n"
+        "Confidence: 80/100\n"
+        "Missing Skills:\n- Kubernetes\n- GraphQL\n"
+        "Suggestions:\n- Quantify project outcomes\n- Add a skills summary"
+    )
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._json(400, {"error": {"message": "invalid JSON"}})
+
+            error_roll, malformed_roll, jitter_roll = config.roll()
+            delay = max(0.0, (config.latency + jitter_roll * config.jitter) / 1000)
+            prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+
+            if error_roll < config.error_rate:
+                time.sleep(delay / 4)
+                status = random.choice([429, 500, 503])
+                return self._json(status, {"error": {"code": status, "message": "injected failure"}})
+
+            reply = canned_reply(prompt, config.mode)
+            if malformed_roll < config.malformed_rate:
+                reply = "Sorry, I could not produce the requested format."
+            usage = {
+                "prompt_tokens": len(prompt) // CHARS_PER_TOKEN,
+                "completion_tokens": len(reply) // CHARS_PER_TOKEN,
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+            if payload.get("stream"):
+                return self._stream(payload, reply, delay, usage)
+
+            time.sleep(delay)
+            self._json(200, {
+                "id": f"gen-{uuid.uuid4().hex[:12]}",
+                "model": payload.get("model", "fake/model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        def _stream(self, payload, reply, delay, usage):
+            words = reply.split(" ")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            # First token after ~1/3 of the latency, the rest spread evenly
+            time.sleep(delay / 3)
+            per_word = (delay * 2 / 3) / max(1, len(words))
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            for i, word in enumerate(words):
+                chunk = {
+                    "model": payload.get("model", "fake/model"),
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(per_word)
+            final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    return Handler
+
+
+def start_server(port=0, **kwargs):
+    """Start the fake server on a background thread; returns (server, url)."""
+    config = FakeConfig(**kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openrouter", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+    return server, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=800, help="Mean response time in ms")
+    parser.add_argument("--jitter", type=float, default=300, help="+/- ms added uniformly")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--mode", choices=["auto", "json", "text"], default="auto")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server, url = start_server(
+        args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate, mode=args.mode, seed=args.seed,
+    )
+    print(f"Fake OpenRouter listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""add ix_interviews_application_scheduled
+
+Revision ID: 55ade898ffce
+Revises: f3c11d80da20
+Create Date: 2026-10-17 00:25:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '55ade898ffce'
+down_revision = 'f3c11d80da20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction and does not block writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_interviews_application_scheduled', 'interviews', ['application_id', 'scheduled_time'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_interviews_application_scheduled', table_name='interviews', postgresql_concurrently=True)
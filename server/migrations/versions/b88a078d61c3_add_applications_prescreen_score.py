@@ -0,0 +1,24 @@
+"""add applications.prescreen_score
+
+Revision ID: b88a078d61c3
+Revises: a4219dd29883
+Create Date: 2026-10-16 23:55:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b88a078d61c3'
+down_revision = 'a4219dd29883'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('applications', sa.Column('prescreen_score', sa.Float(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('applications', 'prescreen_score')
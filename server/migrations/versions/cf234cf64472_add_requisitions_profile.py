@@ -0,0 +1,25 @@
+"""add requisitions.profile
+
+Revision ID: cf234cf64472
+Revises: b88a078d61c3
+Create Date: 2026-10-17 00:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cf234cf64472'
+down_revision = 'b88a078d61c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Compiled job side of CV analysis; filled lazily by RequisitionProfileService
+    op.add_column('requisitions', sa.Column('profile', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('requisitions', 'profile')
@@ -0,0 +1,34 @@
+"""add analytics indexes on applications and assessment_results
+
+Revision ID: f3c11d80da20
+Revises: cf234cf64472
+Create Date: 2026-10-17 00:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c11d80da20'
+down_revision = 'cf234cf64472'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_applications_requisition_created', 'applications', ['requisition_id', 'created_at']),
+    ('ix_applications_candidate_requisition', 'applications', ['candidate_id', 'requisition_id', 'created_at']),
+    ('ix_assessment_results_application_created', 'assessment_results', ['application_id', 'created_at']),
+)
+
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction and does not block writes
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)